@@ -0,0 +1,30 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from app.core.executor import run_upload
+from app.core.http_cache import IMMUTABLE_CACHE_CONTROL
+from app.services.blob_store import blob_store, parse_blob_name
+
+router = APIRouter()
+
+@router.get("/blobs/{name}")
+async def get_blob(name: str, request: Request):
+    """
+    블롭 저장소의 이미지를 반환합니다. 브라우저/CDN이 영구 캐시할 수 있도록 immutable 헤더를 붙입니다.
+    """
+    parsed = parse_blob_name(name)
+    if not parsed:
+        raise HTTPException(status_code=404, detail="Blob not found")
+    digest, mime_type = parsed
+
+    headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL, "ETag": f'"{digest}"'}
+    if request.headers.get("if-none-match") == headers["ETag"] and await run_upload(blob_store.exists, name):
+        return Response(status_code=304, headers=headers)
+
+    content = await run_upload(blob_store.read_mapped, name)
+    if content is not None:
+        return Response(content=content, media_type=mime_type, headers=headers)
+
+    path = blob_store.path_for(name)
+    if not await run_upload(blob_store.exists, name):
+        raise HTTPException(status_code=404, detail="Blob not found")
+    return FileResponse(path, media_type=mime_type, headers=headers)
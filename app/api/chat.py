@@ -1,117 +1,193 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-import google.generativeai as genai
-from app.core.config import settings
+import logging
+from typing import Any, List, Optional, Tuple
 from app.schemas.chat import ChatRequest, ChatResponse
 from app.core.database import get_db
+from app.core.executor import run_db, run_llm, iterate_llm_stream
+from app.core.metrics import record_error, record_llm_usage
+from app.core.sse import format_sse, SSE_HEADERS
+from app.services.chat_memory import ConversationWindow, build_conversation_window, fold_into_summary
+from app.services.coach_model import ModelLease, acquire_coach_model
+from app.services.chat_log import chat_log_writer
 from app import models
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
-# Gemini API 설정
-genai.configure(api_key=settings.GOOGLE_API_KEY)
+# 모델이 미션 완료를 알릴 때 응답 끝에 붙이는 태그
+MISSION_COMPLETE_TAG = "[MISSION_COMPLETE]"
+
+def _start_chat_session(target_roadmap: models.Roadmap, history: List[dict]) -> Tuple[ModelLease, Any]:
+    """
+    로드맵의 목표/수준을 반영한 코치 페르소나로 Gemini 채팅 세션을 시작합니다.
+    (모델 사용권, 채팅 세션)을 반환하며, 응답을 다 받은 뒤 사용권을 반납해야 합니다.
+    """
+    # 페르소나 프롬프트와 모델 객체는 캐시에서 재사용하고, 세션만 요청마다 새로 만듭니다.
+    lease = acquire_coach_model(target_roadmap)
+
+    # 채팅 세션 시작 (서버에서 재구성한 히스토리 로드)
+    try:
+        return lease, lease.model.start_chat(history=history)
+    except Exception:
+        lease.release()
+        raise
+
+def _get_roadmap(db: Session, roadmap_id: int) -> Optional[models.Roadmap]:
+    return db.query(models.Roadmap).filter(models.Roadmap.id == roadmap_id).first()
+
+def _load_chat_context(db: Session, roadmap_id: int) -> Optional[Tuple[models.Roadmap, ConversationWindow]]:
+    """
+    로드맵과 대화 윈도우(저장된 요약 + 토큰 예산 내 최근 메시지)를 읽고 읽기 트랜잭션을 끝냅니다.
+    LLM 응답을 기다리는 동안 요청 세션이 풀 커넥션을 잡고 있지 않도록 합니다. (메시지 저장은 쓰기 큐가 담당)
+    """
+    roadmap = _get_roadmap(db, roadmap_id)
+    if roadmap is None:
+        return None
+    window = build_conversation_window(db, roadmap_id)
+    # 세션 밖(이벤트 루프, LLM 스레드)에서 속성을 읽을 수 있도록 분리합니다.
+    db.expunge(roadmap)
+    db.rollback()
+    return roadmap, window
 
 @router.post("/chat", response_model=ChatResponse)
-async def chat_with_ai(request: ChatRequest, db: Session = Depends(get_db)):
+async def chat_with_ai(request: ChatRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     """
     사용자와 AI 간의 채팅을 처리하고 DB에 저장합니다.
     """
+    lease = None
     try:
         # 1. 로드맵 ID 검증 및 조회 (시스템 프롬프트 구성을 위해 가장 먼저 수행)
         if not request.roadmap_id:
             raise HTTPException(status_code=400, detail="Roadmap ID is required for chat logging.")
 
-        target_roadmap = db.query(models.Roadmap).filter(models.Roadmap.id == request.roadmap_id).first()
-        if not target_roadmap:
+        # 2. 대화 내역 재구성 (저장된 요약 + 토큰 예산 내 최근 메시지)
+        # 이전 턴의 메시지가 아직 쓰기 큐에 있으면 커밋된 뒤에 읽습니다.
+        await chat_log_writer.sync(request.roadmap_id)
+        context = await run_db(_load_chat_context, db, request.roadmap_id)
+        if not context:
             raise HTTPException(status_code=404, detail="Roadmap not found")
+        target_roadmap, window = context
+        roadmap_id = target_roadmap.id
 
-        # 2. 동적 시스템 프롬프트 구성 (Dynamic Persona)
-        # 사용자의 목표(Goal)와 수준(Level)을 반영하여 AI의 역할을 정의합니다.
-        system_instruction = f"""
-        당신은 'Grow'라는 친절하고 꼼꼼한 **AI 퍼스널 코치**입니다.
-        현재 사용자는 **"{target_roadmap.goal}"** (수준: {target_roadmap.level})라는 목표를 달성하기 위해 학습 중입니다.
-        당신의 임무는 사용자가 이 목표를 완수할 때까지 단계별로 안내하고 격려하는 것입니다.
-
-        [핵심 원칙]
-        1. **목표 지향적 대화:** 모든 답변은 **"{target_roadmap.goal}"**과 관련된 내용이어야 합니다. 
-           - 사용자가 관련 없는 질문을 하면, 정중하게 답변하되 다시 원래 학습 목표로 주의를 환기시키세요.
-        2. **맞춤형 눈높이 교육:** 사용자의 수준({target_roadmap.level})에 맞춰 설명의 난이도를 조절하세요.
-        3. **커리큘럼 준수:** 사용자가 업로드한 자료나 생성된 커리큘럼의 흐름을 따르세요.
-
-        [UI 및 환경 인지]
-        - 사용자는 웹 브라우저 환경에 있습니다.
-        - 화면 왼쪽 사이드바에 '학습 로드맵'이 있으며, 각 미션 제목 옆에는 [ ] 모양의 체크박스가 있습니다.
-        - **중요:** 사용자가 미션을 완수했다고 판단되면, 응답의 마지막에 반드시 **`[MISSION_COMPLETE]`** 태그를 붙여주세요.
-        - 시스템이 이 태그를 감지하여 **자동으로 미션을 완료 처리**하고 체크박스를 채워줍니다.
-        - 따라서 사용자에게는 "미션을 완료하셨군요! 체크박스는 제가 처리해 드렸습니다."와 같이 안내하세요.
-
-        [학습 진행 및 검증 가이드라인 (이원화)]
-        학습 주제의 성격에 따라 검증 방식을 다르게 적용하세요.
-
-        1. **실습형 미션 (결과물 생성)**
-           - 사용자가 "완료했다"고 하면, 바로 넘어가지 말고 **증거**를 확인하세요.
-           - 예: "작성한 결과물을 보여주시겠어요?", "어떻게 구현했는지 설명해 주시겠어요?" (이미지 업로드 가능)
-           - 결과가 올바르면 칭찬과 함께 "완료 처리해 드릴게요"라고 안내하고, 응답의 마지막에 반드시 **`[MISSION_COMPLETE]`** 태그를 붙여주세요.
-
-        2. **지식/이론형 미션 (개념 이해)**
-           - 사용자가 이해했다고 하면, **퀴즈 세션**을 제안하고 시작하세요.
-           - **규칙:** 총 3~5문제를 출제하되, **반드시 한 번에 한 문제씩** 내세요.
-           - 각 문제에 대해 정답/오답 및 해설을 즉시 제공하세요.
-           - **통과 기준:** 퀴즈를 모두 통과해야 합니다.
-           - **성공 시:** "축하합니다! 완벽하게 이해하셨네요. 미션을 완료 처리해 드리겠습니다."라고 안내하고, 응답의 마지막에 반드시 **`[MISSION_COMPLETE]`** 태그를 붙여주세요.
-
-        [대화 스타일]
-        - 항상 한국어 '해요체'를 사용하세요. (친근하지만 정중하게)
-        - 답변은 5-7문장 내외로 간결하게 유지하여 가독성을 높이세요.
-        - 설명이 끝날 때마다 "준비되셨으면 다음으로 넘어갈까요?" 또는 "궁금한 점이 있으신가요?"와 같이 사용자의 반응을 유도하는 질문을 하세요.
-        """
-
-        # 생성 설정 (답변 길이 및 창의성 제어)
-        generation_config = genai.types.GenerationConfig(
-            max_output_tokens=1000,
-            temperature=0.7,
-        )
-
-        model = genai.GenerativeModel(
-            'gemini-2.5-flash',
-            system_instruction=system_instruction,
-            generation_config=generation_config
-        )
-        
-        # 히스토리 변환 (Pydantic model -> Dictionary list for Gemini)
-        history_for_gemini = []
-        if request.history:
-            for msg in request.history:
-                # Gemini API expects 'user' and 'model' roles
-                history_for_gemini.append({"role": msg.role, "parts": [msg.text]})
-            
-        # 채팅 세션 시작 (히스토리가 있으면 로드)
-        chat = model.start_chat(history=history_for_gemini)
-
-        # 사용자 메시지 DB 저장
-        user_msg = models.ChatHistory(
-            roadmap_id=target_roadmap.id,
-            role="user",
-            text=request.message
-        )
-        db.add(user_msg)
-        db.commit()
+        # 3. 페르소나가 반영된 채팅 세션 시작
+        # 캐시 미스 시 컨텍스트 캐시 생성 등 네트워크 호출이 있을 수 있으므로 LLM 스레드풀에서 실행합니다.
+        lease, chat = await run_llm(_start_chat_session, target_roadmap, window.history)
+
+        # 사용자 메시지 DB 저장 (쓰기 큐에서 모아 커밋)
+        await chat_log_writer.append_message(roadmap_id, "user", request.message)
         
         # 메시지 전송 및 응답 수신
-        response = chat.send_message(request.message)
+        response = await run_llm(chat.send_message, request.message)
+        record_llm_usage("chat", response)
 
         # 모델 응답 DB 저장
-        model_msg = models.ChatHistory(
-            roadmap_id=target_roadmap.id,
-            role="model",
-            text=response.text
-        )
-        db.add(model_msg)
-        db.commit()
+        await chat_log_writer.append_message(roadmap_id, "model", response.text)
+
+        # 윈도우에서 밀려난 메시지는 응답 후 요약에 접어 넣습니다.
+        background_tasks.add_task(fold_into_summary, roadmap_id, window.overflow_until_id)
         
         # 프론트엔드가 기대하는 형식(role, text)으로 반환
         return ChatResponse(role="model", text=response.text)
 
     except Exception as e:
-        print(f"Error in chat: {str(e)}")
+        logger.error(f"Error in chat: {e}")
         raise HTTPException(status_code=500, detail=f"Chat Error: {str(e)}")
+    finally:
+        if lease:
+            lease.release()
+
+def _split_partial_tag(text: str):
+    """
+    청크 경계에서 잘린 `[MISSION_COMPLETE]` 태그가 화면에 노출되지 않도록,
+    태그의 앞부분일 수 있는 꼬리를 분리합니다. (전송 가능한 부분, 보류할 부분)
+    """
+    for size in range(min(len(text), len(MISSION_COMPLETE_TAG) - 1), 0, -1):
+        if MISSION_COMPLETE_TAG.startswith(text[-size:]):
+            return text[:-size], text[-size:]
+    return text, ""
+
+@router.post("/chat/stream")
+async def chat_with_ai_stream(request: ChatRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    """
+    `/chat`의 스트리밍 버전입니다. Gemini의 응답 청크를 Server-Sent Events로 즉시 전달하고,
+    스트림이 끝나면 완성된 응답을 DB에 저장한 뒤 `done` 이벤트로 미션 완료 여부를 알려줍니다.
+    """
+    if not request.roadmap_id:
+        raise HTTPException(status_code=400, detail="Roadmap ID is required for chat logging.")
+
+    await chat_log_writer.sync(request.roadmap_id)
+    context = await run_db(_load_chat_context, db, request.roadmap_id)
+    if not context:
+        raise HTTPException(status_code=404, detail="Roadmap not found")
+    target_roadmap, window = context
+    roadmap_id = target_roadmap.id
+
+    lease = None
+    try:
+        lease, chat = await run_llm(_start_chat_session, target_roadmap, window.history)
+
+        # 사용자 메시지 DB 저장 (쓰기 큐에서 모아 커밋)
+        await chat_log_writer.append_message(roadmap_id, "user", request.message)
+    except Exception as e:
+        if lease:
+            lease.release()
+        logger.error(f"Error in chat stream: {e}")
+        raise HTTPException(status_code=500, detail=f"Chat Error: {str(e)}")
+
+    async def event_stream():
+        chunks = []
+        pending = ""
+        try:
+            response = await run_llm(chat.send_message, request.message, stream=True)
+            async for chunk in iterate_llm_stream(response):
+                try:
+                    chunk_text = chunk.text
+                except ValueError:
+                    # 텍스트 파트가 없는 청크 (예: 종료 사유만 담긴 청크)
+                    continue
+                chunks.append(chunk_text)
+
+                pending = (pending + chunk_text).replace(MISSION_COMPLETE_TAG, "")
+                sendable, pending = _split_partial_tag(pending)
+                if sendable:
+                    yield format_sse({"text": sendable})
+
+            if pending:
+                yield format_sse({"text": pending})
+
+            full_text = "".join(chunks)
+            record_llm_usage("chat", response)
+            mission_complete = MISSION_COMPLETE_TAG in full_text
+
+            # 스트림 종료 후 모델 응답 DB 저장
+            await chat_log_writer.append_message(roadmap_id, "model", full_text)
+
+            yield format_sse(
+                {
+                    "role": "model",
+                    "text": full_text.replace(MISSION_COMPLETE_TAG, "").strip(),
+                    "mission_complete": mission_complete,
+                },
+                event="done",
+            )
+        except Exception as e:
+            # 응답 상태(200)가 이미 전송되었으므로 오류 수는 따로 기록합니다.
+            logger.error(f"Error in chat stream: {e}")
+            record_error("chat_stream")
+            yield format_sse({"detail": f"Chat Error: {str(e)}"}, event="error")
+        finally:
+            lease.release()
+
+    # 스트림이 끝난 뒤 실행됩니다. (스트림이 시작되기 전에 연결이 끊긴 경우에도 사용권을 반납)
+    background_tasks.add_task(lease.release)
+    background_tasks.add_task(fold_into_summary, roadmap_id, window.overflow_until_id)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+        background=background_tasks,
+    )
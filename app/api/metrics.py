@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+from app.core.metrics import CONTENT_TYPE, registry
+
+router = APIRouter()
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """
+    Prometheus 텍스트 형식으로 메트릭을 반환합니다.
+    """
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
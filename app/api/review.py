@@ -1,49 +1,104 @@
-from fastapi import APIRouter, HTTPException
-import google.generativeai as genai
+from fastapi import APIRouter, HTTPException, File, Form, UploadFile
+import logging
 import base64
+import binascii
 from app.core.config import settings
+from app.core.executor import run_llm, run_upload
+from app.core.llm import load_genai
+from app.core.metrics import record_llm_usage
 from app.schemas.review import ReviewRequest, ReviewResponse
+from app.services.image_preprocess import (
+    ImageTooLargeError,
+    InvalidImageError,
+    DecodedImage,
+    decode_review_image,
+    encode_review_image,
+    read_limited,
+)
+from app.services.review_cache import review_cache
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Gemini API 설정
-genai.configure(api_key=settings.GOOGLE_API_KEY)
+DEFAULT_REVIEW_PROMPT = "이 이미지를 분석하고 학습에 도움이 되는 피드백을 주세요."
+
+async def _decode_image(raw: bytes, mime_type: str) -> DecodedImage:
+    try:
+        return await run_upload(decode_review_image, raw, mime_type)
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidImageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def _review(prompt: str, image: DecodedImage) -> ReviewResponse:
+    # 프롬프트 구성
+    prompt_text = prompt if prompt else DEFAULT_REVIEW_PROMPT
+
+    # 같은(또는 거의 같은) 이미지를 같은 프롬프트로 다시 보낸 경우 비전 모델 호출 없이 응답합니다.
+    cached_text = await review_cache.get(prompt_text, image.perceptual_hash)
+    if cached_text is not None:
+        return ReviewResponse(text=cached_text)
+
+    # 캐시에 없을 때만 재인코딩합니다.
+    prepared = await run_upload(encode_review_image, image)
+
+    try:
+        genai = await load_genai()
+        model = genai.GenerativeModel('gemini-2.5-flash')
+
+        # 콘텐츠 생성 (멀티모달 요청: [프롬프트, 이미지])
+        response = await run_llm(model.generate_content, [prompt_text, prepared.as_part()])
+        text = response.text
+        record_llm_usage("review", response)
+    except Exception as e:
+        logger.error(f"Error in review: {e}")
+        raise HTTPException(status_code=500, detail=f"Vision Analysis Error: {str(e)}")
+
+    await review_cache.put(prompt_text, image.perceptual_hash, text)
+    return ReviewResponse(text=text)
 
 @router.post("/review", response_model=ReviewResponse)
 async def review_image(request: ReviewRequest):
     """
     사용자가 업로드한 이미지를 AI가 분석하여 피드백을 제공합니다.
+    (Base64 JSON 요청. 새 클라이언트는 multipart 업로드인 /review/upload를 사용합니다.)
     """
+    # Base64 문자열에서 실제 데이터 부분만 추출 (혹시 헤더가 포함되어 있다면)
+    # 예: "data:image/png;base64,iVBOR..." -> "iVBOR..."
+    if "," in request.base64Image:
+        image_data_str = request.base64Image.split(",")[1]
+    else:
+        image_data_str = request.base64Image
+
+    # 디코딩 전에 크기를 확인합니다. (Base64는 원본보다 약 4/3배 큼)
+    if len(image_data_str) * 3 // 4 > settings.REVIEW_IMAGE_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Image exceeds {settings.REVIEW_IMAGE_MAX_BYTES} bytes.")
+
+    # Base64 디코딩
     try:
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        
-        # Base64 문자열에서 실제 데이터 부분만 추출 (혹시 헤더가 포함되어 있다면)
-        # 예: "data:image/png;base64,iVBOR..." -> "iVBOR..."
-        if "," in request.base64Image:
-            image_data_str = request.base64Image.split(",")[1]
-        else:
-            image_data_str = request.base64Image
-            
-        # Base64 디코딩
-        try:
-            image_bytes = base64.b64decode(image_data_str)
-        except Exception as decode_err:
-             raise HTTPException(status_code=400, detail=f"Invalid Base64 image data: {str(decode_err)}")
-
-        # Gemini Vision 모델 호출을 위한 이미지 파트 구성
-        image_part = {
-            "mime_type": request.mimeType,
-            "data": image_bytes
-        }
-        
-        # 프롬프트 구성
-        prompt_text = request.prompt if request.prompt else "이 이미지를 분석하고 학습에 도움이 되는 피드백을 주세요."
-        
-        # 콘텐츠 생성 (멀티모달 요청: [프롬프트, 이미지])
-        response = model.generate_content([prompt_text, image_part])
-        
-        return ReviewResponse(text=response.text)
+        image_bytes = base64.b64decode(image_data_str)
+    except (binascii.Error, ValueError) as decode_err:
+        raise HTTPException(status_code=400, detail=f"Invalid Base64 image data: {str(decode_err)}")
 
-    except Exception as e:
-        print(f"Error in review: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Vision Analysis Error: {str(e)}")
\ No newline at end of file
+    image = await _decode_image(image_bytes, request.mimeType)
+    return await _review(request.prompt, image)
+
+@router.post("/review/upload", response_model=ReviewResponse)
+async def review_image_upload(
+    image: UploadFile = File(...),
+    prompt: str = Form(""),
+):
+    """
+    multipart/form-data로 업로드된 이미지 원본 바이트를 받아 AI 피드백을 제공합니다.
+    Base64 인코딩 오버헤드 없이 전송되며, 서버에서 축소/재인코딩 후 비전 모델에 전달합니다.
+    """
+    try:
+        raw = await run_upload(read_limited, image.file, settings.REVIEW_IMAGE_MAX_BYTES)
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    finally:
+        await image.close()
+
+    decoded = await _decode_image(raw, image.content_type or "application/octet-stream")
+    return await _review(prompt, decoded)
@@ -1,47 +1,185 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import String, tuple_, type_coerce
 from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import get_db
+from typing import List, Optional, Tuple
+import base64
+import binascii
+import json
+from datetime import datetime
+from app.core.database import IS_SQLITE, get_db
+from app.core.executor import run_db
+from app.core.http_cache import cache_headers, is_not_modified, make_etag
+from app.core.metrics import span
 from app import models
-from app.schemas.roadmap import RoadmapWithHistory, ChatMessage, RoadmapSummary
+from app.schemas.roadmap import RoadmapWithHistory, ChatMessage, ChatHistoryPage, RoadmapSummary
 from app.schemas.plan import WeekPlan, Mission as MissionSchema
+from app.services.chat_archive import load_archived_messages
+from app.services.chat_log import chat_log_writer
+from app.services.progress import load_week_progress, mark_mission_complete
+from app.services.roadmap_cache import get_roadmap_list_stamp, get_roadmap_stamp, roadmap_read_cache
 
 router = APIRouter()
 
-@router.get("/roadmaps", response_model=List[RoadmapSummary])
-async def get_all_roadmaps(db: Session = Depends(get_db)):
+# 로드맵 목록 페이지 크기
+ROADMAP_PAGE_DEFAULT = 100
+ROADMAP_PAGE_MAX = 200
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# 로드맵 상세/대화 내역 페이지 크기
+CHAT_PAGE_DEFAULT = 30
+CHAT_PAGE_MAX = 100
+
+def encode_roadmap_cursor(created_at_raw: str, roadmap_id: int) -> str:
+    payload = json.dumps([created_at_raw, roadmap_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+def decode_roadmap_cursor(cursor: str) -> Tuple[str, int]:
+    """
+    목록 커서를 (created_at 원본 값, id)로 해석합니다. 형식이 잘못되면 ValueError를 발생시킵니다.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at_raw, roadmap_id = json.loads(base64.urlsafe_b64decode(padded))
+        return str(created_at_raw), int(roadmap_id)
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+def _list_roadmap_summaries(
+    db: Session,
+    limit: int,
+    cursor: Optional[str] = None,
+    goal: Optional[str] = None,
+    level: Optional[str] = None,
+) -> Tuple[List[RoadmapSummary], Optional[str]]:
     """
-    저장된 모든 로드맵의 목록과 진행률을 반환합니다.
+    최신순 로드맵 한 페이지와 다음 페이지 커서를 반환합니다.
+    진행률은 Roadmap에 비정규화된 카운터를 읽으므로 미션 행을 조회하지 않습니다.
     """
-    roadmaps = db.query(models.Roadmap).order_by(models.Roadmap.created_at.desc()).all()
-    result = []
-    for r in roadmaps:
-        total = len(r.missions)
-        completed = len([m for m in r.missions if m.is_completed])
-        result.append(RoadmapSummary(
+    Roadmap = models.Roadmap
+    # SQLite는 created_at을 문자열로 저장하므로 커서에 저장된 값을 그대로 담아 비교합니다. (저장 형식과 파라미터 형식 차이 방지)
+    # 그 외 DB는 timestamp 값을 ISO 형식으로 담아 비교합니다.
+    created_at_raw = type_coerce(Roadmap.created_at, String) if IS_SQLITE else Roadmap.created_at
+
+    query = db.query(
+        Roadmap.id,
+        Roadmap.project_title,
+        Roadmap.goal,
+        Roadmap.level,
+        Roadmap.created_at,
+        Roadmap.total_missions,
+        Roadmap.completed_missions,
+        Roadmap.week_progress,
+        created_at_raw.label("created_at_raw"),
+    )
+    if goal:
+        query = query.filter(Roadmap.goal.ilike(f"%{goal}%"))
+    if level:
+        query = query.filter(Roadmap.level == level)
+    if cursor:
+        cursor_created_at, cursor_id = decode_roadmap_cursor(cursor)
+        if IS_SQLITE:
+            cursor_value = type_coerce(cursor_created_at, String)
+        else:
+            cursor_value = datetime.fromisoformat(cursor_created_at)
+        query = query.filter(tuple_(Roadmap.created_at, Roadmap.id) < tuple_(cursor_value, cursor_id))
+    # 다음 페이지 존재 여부를 알기 위해 하나 더 가져옵니다.
+    rows = query.order_by(Roadmap.created_at.desc(), Roadmap.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        raw = last.created_at_raw if IS_SQLITE else last.created_at_raw.isoformat()
+        next_cursor = encode_roadmap_cursor(str(raw), last.id)
+
+    result = [
+        RoadmapSummary(
             id=r.id,
             project_title=r.project_title,
             goal=r.goal,
             level=r.level,
             created_at=r.created_at,
-            total_missions=total,
-            completed_missions=completed
-        ))
-    return result
+            total_missions=r.total_missions or 0,
+            completed_missions=r.completed_missions or 0,
+            week_progress=load_week_progress(r.week_progress)
+        )
+        for r in rows
+    ]
+    return result, next_cursor
 
-@router.get("/roadmap/{roadmap_id}", response_model=RoadmapWithHistory)
-async def get_roadmap_detail(roadmap_id: int, db: Session = Depends(get_db)):
+def _load_chat_page(
+    db: Session, roadmap_id: int, limit: int, before: Optional[int] = None
+) -> Tuple[List[ChatMessage], Optional[int]]:
     """
-    특정 로드맵의 상세 커리큘럼과 채팅 내역을 반환합니다.
+    (roadmap_id, id) 인덱스로 최신 대화부터 limit개를 읽어 시간순으로 반환합니다.
+    더 오래된 대화가 있으면 다음 페이지의 before 값(이번 페이지의 가장 오래된 id)을 함께 반환합니다.
+    chat_history에 남은 대화가 부족하면 보관 테이블(chat_archives)에서 이어서 읽습니다.
     """
+    query = db.query(models.ChatHistory).filter(models.ChatHistory.roadmap_id == roadmap_id)
+    if before is not None:
+        query = query.filter(models.ChatHistory.id < before)
+    chats = query.order_by(models.ChatHistory.id.desc()).limit(limit + 1).all()
+
+    has_more = len(chats) > limit
+    chats = list(reversed(chats[:limit]))
+
+    # 아직 Base64로 남아 있는 이전 이미지는 그대로 내려보냅니다. (블롭 저장소로의 이전은 manage.py migrate-images)
+    messages = [
+        ChatMessage(
+            id=str(chat.id),
+            role=chat.role,
+            text=chat.text,
+            image=chat.image,
+            modelImage=chat.model_image,
+            created_at=chat.created_at
+        )
+        for chat in chats
+    ]
+    oldest_id = chats[0].id if chats else None
+
+    # 보관된 대화는 항상 chat_history에 남은 대화보다 오래되었습니다.
+    if not has_more:
+        archived_until_id = (
+            db.query(models.Roadmap.archived_until_id).filter(models.Roadmap.id == roadmap_id).scalar()
+        )
+        if archived_until_id:
+            remaining = limit - len(messages)
+            if remaining:
+                archived, has_more = load_archived_messages(
+                    db, roadmap_id, oldest_id if oldest_id is not None else before, remaining
+                )
+                if archived:
+                    oldest_id = archived[0]["id"]
+                messages = [
+                    ChatMessage(
+                        id=str(m["id"]),
+                        role=m["role"],
+                        text=m["text"],
+                        image=m["image"],
+                        modelImage=m["model_image"],
+                        created_at=m["created_at"]
+                    )
+                    for m in archived
+                ] + messages
+            else:
+                has_more = True
+
+    return messages, (oldest_id if has_more and oldest_id is not None else None)
+
+def _build_roadmap_detail(db: Session, roadmap_id: int, chat_limit: int = CHAT_PAGE_DEFAULT) -> Optional[RoadmapWithHistory]:
     roadmap = db.query(models.Roadmap).filter(models.Roadmap.id == roadmap_id).first()
     if not roadmap:
-        raise HTTPException(status_code=404, detail="Roadmap not found")
+        return None
 
     # 미션 데이터를 주차(Week)별로 그룹화
     missions_by_week = {}
     # id 순 정렬 (생성 순서 유지)
-    sorted_missions = sorted(roadmap.missions, key=lambda x: x.id)
+    sorted_missions = (
+        db.query(models.Mission)
+        .filter(models.Mission.roadmap_id == roadmap_id)
+        .order_by(models.Mission.id)
+        .all()
+    )
     
     for m in sorted_missions:
         if m.week not in missions_by_week:
@@ -61,40 +199,114 @@ async def get_roadmap_detail(roadmap_id: int, db: Session = Depends(get_db)):
             missions=data["missions"]
         ))
 
-    # 채팅 내역 변환
-    chat_history = []
-    sorted_chats = sorted(roadmap.chats, key=lambda x: x.id)
-    
-    for chat in sorted_chats:
-        chat_history.append(ChatMessage(
-            id=str(chat.id),
-            role=chat.role,
-            text=chat.text,
-            image=chat.image,
-            modelImage=chat.model_image,
-            created_at=chat.created_at
-        ))
+    # 최근 채팅 내역만 변환 (이전 내역은 /roadmap/{id}/chats로 페이지 조회)
+    chat_history, chat_cursor = _load_chat_page(db, roadmap_id, chat_limit)
 
     return RoadmapWithHistory(
         id=roadmap.id,
         project_title=roadmap.project_title,
         curriculum=curriculum,
-        chat_history=chat_history
+        chat_history=chat_history,
+        chat_cursor=chat_cursor
     )
 
+def _json_response(body: bytes, headers: dict) -> Response:
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@router.get("/roadmaps", response_model=List[RoadmapSummary])
+async def get_all_roadmaps(
+    request: Request,
+    limit: int = Query(ROADMAP_PAGE_DEFAULT, ge=1, le=ROADMAP_PAGE_MAX),
+    cursor: Optional[str] = None,
+    goal: Optional[str] = None,
+    level: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    저장된 로드맵의 목록과 진행률을 최신순으로 반환합니다.
+    다음 페이지가 있으면 `X-Next-Cursor` 헤더의 값을 `cursor` 파라미터로 넘겨 이어서 조회합니다.
+    goal은 부분 일치, level은 정확히 일치하는 로드맵만 반환합니다.
+    목록이 바뀌지 않았으면 ETag 조건부 요청에 304로 응답하고, 캐시된 응답 본문을 재사용합니다.
+    """
+    params = (limit, cursor, goal, level)
+    stamp = await run_db(get_roadmap_list_stamp, db)
+    etag = make_etag("roadmaps", stamp, *params)
+    headers = cache_headers(etag)
+
+    key = ("roadmaps",) + params
+    cached = roadmap_read_cache.get(key, stamp)
+    if cached is not None:
+        body, next_cursor = cached
+    else:
+        try:
+            summaries, next_cursor = await run_db(_list_roadmap_summaries, db, limit, cursor, goal, level)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        with span("serialize"):
+            body = json.dumps(
+                [s.model_dump(mode="json") for s in summaries], ensure_ascii=False
+            ).encode("utf-8")
+        roadmap_read_cache.put(key, stamp, (body, next_cursor))
+
+    if next_cursor:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return _json_response(body, headers)
+
+@router.get("/roadmap/{roadmap_id}", response_model=RoadmapWithHistory)
+async def get_roadmap_detail(
+    roadmap_id: int,
+    request: Request,
+    chat_limit: int = Query(CHAT_PAGE_DEFAULT, ge=1, le=CHAT_PAGE_MAX),
+    db: Session = Depends(get_db),
+):
+    """
+    특정 로드맵의 상세 커리큘럼과 최근 채팅 내역(chat_limit개)을 반환합니다.
+    로드맵 버전이 그대로면 ETag/Last-Modified 조건부 요청에 304로 응답하고, 캐시된 응답 본문을 재사용합니다.
+    """
+    # 쓰기 큐에 남은 이 로드맵의 채팅/미션 완료가 커밋된 뒤에 읽습니다. (read-your-writes)
+    await chat_log_writer.sync(roadmap_id)
+    stamp = await run_db(get_roadmap_stamp, db, roadmap_id)
+    if stamp is None:
+        raise HTTPException(status_code=404, detail="Roadmap not found")
+
+    etag = make_etag("roadmap", roadmap_id, stamp.version, chat_limit)
+    headers = cache_headers(etag, stamp.last_modified)
+    if is_not_modified(request, etag, stamp.last_modified):
+        return Response(status_code=304, headers=headers)
+
+    key = ("roadmap", roadmap_id, chat_limit)
+    body = roadmap_read_cache.get(key, stamp.version)
+    if body is None:
+        detail = await run_db(_build_roadmap_detail, db, roadmap_id, chat_limit)
+        if not detail:
+            raise HTTPException(status_code=404, detail="Roadmap not found")
+        with span("serialize"):
+            body = detail.model_dump_json().encode("utf-8")
+        roadmap_read_cache.put(key, stamp.version, body, roadmap_id=roadmap_id)
+    return _json_response(body, headers)
+
+@router.get("/roadmap/{roadmap_id}/chats", response_model=ChatHistoryPage)
+async def get_chat_history(
+    roadmap_id: int,
+    before: Optional[int] = None,
+    limit: int = Query(CHAT_PAGE_DEFAULT, ge=1, le=CHAT_PAGE_MAX),
+    db: Session = Depends(get_db),
+):
+    """
+    특정 로드맵의 채팅 내역을 before(메시지 id)보다 오래된 것부터 최신순으로 limit개씩 반환합니다.
+    """
+    await chat_log_writer.sync(roadmap_id)
+    messages, next_before = await run_db(_load_chat_page, db, roadmap_id, limit, before)
+    return ChatHistoryPage(messages=messages, next_before=next_before)
+
 @router.put("/roadmap/{roadmap_id}/mission/{mission_key}/complete")
 async def complete_mission(roadmap_id: int, mission_key: str, db: Session = Depends(get_db)):
     """
     특정 로드맵의 특정 미션을 완료 처리합니다.
     """
-    mission = db.query(models.Mission).filter(
-        models.Mission.roadmap_id == roadmap_id,
-        models.Mission.mission_key == mission_key
-    ).first()
-    
-    if not mission:
+    # 채팅 기록과 같은 쓰기 큐에서 커밋되며, 결과(미션 존재 여부)를 기다립니다.
+    if not await chat_log_writer.execute(roadmap_id, mark_mission_complete, roadmap_id, mission_key):
         raise HTTPException(status_code=404, detail="Mission not found")
-        
-    mission.is_completed = True
-    db.commit()
-    return {"status": "success", "roadmap_id": roadmap_id, "mission_key": mission_key}
\ No newline at end of file
+    return {"status": "success", "roadmap_id": roadmap_id, "mission_key": mission_key}
@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Literal, Optional
+from app.core.database import get_db
+from app.core.executor import run_db
+from app.schemas.search import SearchResponse
+from app.services.chat_log import chat_log_writer
+from app.services.search import search
+
+router = APIRouter()
+
+SEARCH_LIMIT_DEFAULT = 20
+SEARCH_LIMIT_MAX = 100
+
+@router.get("/search", response_model=SearchResponse)
+async def search_roadmaps(
+    q: str = Query(..., min_length=1, max_length=200),
+    roadmap_id: Optional[int] = None,
+    kind: Optional[Literal["chat", "mission"]] = None,
+    limit: int = Query(SEARCH_LIMIT_DEFAULT, ge=1, le=SEARCH_LIMIT_MAX),
+    db: Session = Depends(get_db),
+):
+    """
+    지난 코칭 대화와 미션(제목/테마)을 검색합니다.
+    roadmap_id로 특정 로드맵만, kind로 대화(chat) 또는 미션(mission)만 검색할 수 있습니다.
+    결과는 관련도순이며, snippet은 일치한 단어를 **로 강조한 본문 일부입니다.
+    """
+    # 쓰기 큐에 남은 메시지도 검색되도록 커밋된 뒤에 조회합니다.
+    await chat_log_writer.sync(roadmap_id)
+    results = await run_db(search, db, q, roadmap_id, kind, limit)
+    if results is None:
+        raise HTTPException(status_code=400, detail="Search query has no searchable words")
+    return SearchResponse(query=q, results=results)
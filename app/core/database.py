@@ -1,30 +1,113 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import os
+from app.core.config import settings
 
-# SQLite 데이터베이스 파일 경로 설정
-# Cloud Run 환경(K_SERVICE 환경변수 존재)에서는 쓰기 가능한 /tmp 디렉토리 사용
-if os.getenv("K_SERVICE"):
-    SQLALCHEMY_DATABASE_URL = "sqlite:////tmp/app.db"
+def _normalize_url(url: str) -> str:
+    # postgres:// (Heroku/Cloud SQL 형식)와 드라이버가 없는 postgresql://는 psycopg(v3) 드라이버로 엽니다.
+    for prefix in ("postgres://", "postgresql://"):
+        if url.startswith(prefix):
+            return "postgresql+psycopg://" + url[len(prefix):]
+    return url
+
+# 데이터베이스 URL (config의 DATABASE_URL, 기본값은 로컬 SQLite 파일)
+SQLALCHEMY_DATABASE_URL = _normalize_url(settings.DATABASE_URL)
+IS_SQLITE = make_url(SQLALCHEMY_DATABASE_URL).get_backend_name() == "sqlite"
+
+# DB_ASYNC=true일 때 사용하는 URL (SQLite는 aiosqlite, psycopg는 같은 드라이버의 async 모드)
+if IS_SQLITE:
+    ASYNC_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
 else:
-    # 로컬 개발 환경
-    SQLALCHEMY_DATABASE_URL = "sqlite:///./app.db"
+    ASYNC_DATABASE_URL = SQLALCHEMY_DATABASE_URL
+
+def sqlite_pragmas() -> list:
+    return [
+        f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        # 음수 값은 페이지 수가 아닌 KiB 단위입니다.
+        f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}",
+        f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}",
+    ]
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # 새 커넥션이 열릴 때마다 적용합니다. (journal_mode=WAL은 파일에 유지되지만 나머지는 커넥션 단위)
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in sqlite_pragmas():
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+def _engine_options() -> dict:
+    options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+    }
+    if not IS_SQLITE:
+        # 네트워크 DB는 서버/프록시가 유휴 연결을 끊을 수 있으므로 꺼낼 때 확인하고 주기적으로 재생성합니다.
+        options["pool_pre_ping"] = settings.DB_POOL_PRE_PING
+        options["pool_recycle"] = settings.DB_POOL_RECYCLE_SECONDS
+    return options
+
+def _create_engine():
+    if not IS_SQLITE:
+        return create_engine(SQLALCHEMY_DATABASE_URL, **_engine_options())
+    # connect_args={"check_same_thread": False}는 SQLite에서만 필요합니다.
+    # FastAPI는 멀티 스레딩을 사용하므로, 한 스레드에서 생성된 커넥션을 다른 스레드에서 쓸 수 있게 허용해야 합니다.
+    sqlite_engine = create_engine(
+        SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, **_engine_options()
+    )
+    event.listen(sqlite_engine, "connect", _set_sqlite_pragmas)
+    return sqlite_engine
 
-# connect_args={"check_same_thread": False}는 SQLite에서만 필요합니다.
-# FastAPI는 멀티 스레딩을 사용하므로, 한 스레드에서 생성된 커넥션을 다른 스레드에서 쓸 수 있게 허용해야 합니다.
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+engine = _create_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 요청 세션용 비동기 엔진 (DB_ASYNC=true일 때만 생성)
+# 마이그레이션, 관리 명령어, 백그라운드 작업(run_in_session)은 계속 동기 엔진을 사용합니다.
+async_engine = None
+AsyncSessionLocal = None
+if settings.DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options())
+    if IS_SQLITE:
+        event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False)
+
 Base = declarative_base()
 
 # Dependency Injection을 위한 헬퍼 함수
-def get_db():
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# 라우터는 get_db만 사용하며, 세션은 run_db로 실행합니다. (Session/AsyncSession 모두 지원)
+get_db = get_async_db if settings.DB_ASYNC else get_sync_db
+
+# 요청 스코프 밖(백그라운드 작업, 스트리밍 종료 후 등)에서 새 세션으로 func(db, ...)를 실행합니다.
+def run_in_session(func, *args, **kwargs):
+    db = SessionLocal()
+    try:
+        return func(db, *args, **kwargs)
+    finally:
+        db.close()
+
+async def dispose_engines():
+    """
+    종료 시 풀에 남은 커넥션을 닫습니다. (WAL 체크포인트가 마지막 커넥션을 닫을 때 실행됨)
+    """
+    if async_engine is not None:
+        await async_engine.dispose()
+    engine.dispose()
@@ -0,0 +1,88 @@
+from functools import partial
+from typing import AsyncIterator, Callable, Dict, Iterable, TypeVar
+import anyio
+from anyio.to_thread import run_sync
+from app.core.config import settings
+from app.core.metrics import Gauge, registry, span
+
+T = TypeVar("T")
+
+# 업스트림별 동시 실행 한도
+# google-generativeai SDK와 SQLAlchemy Session은 동기 API이므로,
+# async 라우트에서 직접 호출하면 uvicorn 이벤트 루프 전체가 멈춥니다.
+# 대신 업스트림마다 크기가 제한된 스레드풀에서 실행하여 한 업스트림이 느려져도 다른 요청이 막히지 않게 합니다.
+UPSTREAM_LIMITS: Dict[str, int] = {
+    "llm": settings.LLM_MAX_CONCURRENCY,
+    "upload": settings.UPLOAD_MAX_CONCURRENCY,
+    "db": settings.DB_MAX_CONCURRENCY,
+}
+
+_limiters: Dict[str, anyio.CapacityLimiter] = {}
+
+def get_limiter(upstream: str) -> anyio.CapacityLimiter:
+    """
+    업스트림 이름에 해당하는 CapacityLimiter를 반환합니다. (최초 사용 시 생성)
+    """
+    limiter = _limiters.get(upstream)
+    if limiter is None:
+        limiter = anyio.CapacityLimiter(UPSTREAM_LIMITS[upstream])
+        _limiters[upstream] = limiter
+    return limiter
+
+# 노출할 때 업스트림별 한도의 사용 중/대기 중 작업 수를 읽습니다.
+UPSTREAM_IN_FLIGHT = registry.register(Gauge(
+    "app_upstream_in_flight", "Blocking calls currently running per upstream (db, llm, upload).", ("upstream",),
+    collect=lambda: {(name,): limiter.borrowed_tokens for name, limiter in _limiters.items()},
+))
+UPSTREAM_WAITING = registry.register(Gauge(
+    "app_upstream_waiting", "Calls waiting for a free slot per upstream.", ("upstream",),
+    collect=lambda: {(name,): limiter.statistics().tasks_waiting for name, limiter in _limiters.items()},
+))
+
+async def run_blocking(upstream: str, func: Callable[..., T], *args, **kwargs) -> T:
+    """
+    블로킹 함수를 해당 업스트림의 스레드풀에서 실행하고 결과를 기다립니다.
+    대기 시간을 포함한 소요 시간은 업스트림 이름의 단계(phase)로 기록됩니다.
+    """
+    with span(upstream):
+        return await run_sync(partial(func, *args, **kwargs), limiter=get_limiter(upstream))
+
+async def run_llm(func: Callable[..., T], *args, **kwargs) -> T:
+    """Gemini 호출 (generate_content, send_message 등)"""
+    return await run_blocking("llm", func, *args, **kwargs)
+
+async def run_upload(func: Callable[..., T], *args, **kwargs) -> T:
+    """파일 저장 및 Gemini 파일 업로드/삭제"""
+    return await run_blocking("upload", func, *args, **kwargs)
+
+def _as_async_session(value):
+    if not settings.DB_ASYNC:
+        return None
+    from sqlalchemy.ext.asyncio import AsyncSession
+    return value if isinstance(value, AsyncSession) else None
+
+async def run_db(func: Callable[..., T], *args, **kwargs) -> T:
+    """
+    SQLAlchemy Session을 사용하는 DB 작업
+    첫 인자가 AsyncSession이면 스레드풀 대신 AsyncSession.run_sync로 실행합니다.
+    (func는 동기 Session을 받으며, 드라이버 I/O는 이벤트 루프에서 대기. DB 외의 블로킹 작업은 짧아야 합니다.)
+    """
+    session = _as_async_session(args[0]) if args else None
+    if session is not None:
+        with span("db"):
+            async with get_limiter("db"):
+                return await session.run_sync(func, *args[1:], **kwargs)
+    return await run_blocking("db", func, *args, **kwargs)
+
+_STREAM_END = object()
+
+async def iterate_llm_stream(stream: Iterable[T]) -> AsyncIterator[T]:
+    """
+    Gemini 스트리밍 응답(동기 이터레이터)을 LLM 스레드풀에서 한 청크씩 꺼내는 비동기 이터레이터로 변환합니다.
+    """
+    iterator = iter(stream)
+    while True:
+        item = await run_llm(next, iterator, _STREAM_END)
+        if item is _STREAM_END:
+            break
+        yield item
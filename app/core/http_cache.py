@@ -0,0 +1,50 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+from fastapi import Request
+
+# 브라우저가 응답을 보관하되 매번 ETag로 재검증하도록 합니다.
+REVALIDATE_CACHE_CONTROL = "no-cache"
+# 내용이 바뀌면 URL도 바뀌는 리소스(내용 해시 이름)는 브라우저/CDN이 영구 캐시합니다.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+def make_etag(*parts) -> str:
+    """
+    버전 스탬프 등 응답 내용을 결정하는 값들로 strong ETag를 만듭니다.
+    """
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:20]
+    return f'"{digest}"'
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite는 타임존 없이 UTC 시각을 저장합니다.
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+def cache_headers(etag: str, last_modified: Optional[datetime] = None) -> Dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL}
+    if last_modified:
+        headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+    return headers
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """
+    조건부 요청(If-None-Match / If-Modified-Since)이 현재 버전과 일치하여 304로 응답할 수 있는지 확인합니다.
+    If-None-Match가 있으면 If-Modified-Since보다 우선합니다.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in candidates or etag in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return _as_utc(last_modified) <= since
+    return False
@@ -0,0 +1,50 @@
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING
+from app.core.config import settings
+from app.core.executor import run_llm
+
+if TYPE_CHECKING:
+    import google.generativeai
+
+logger = logging.getLogger(__name__)
+
+# Gemini SDK는 임포트에만 수백 ms가 걸리므로, 서버 시작 시가 아니라 처음 사용할 때 임포트합니다.
+_genai = None
+_lock = threading.Lock()
+
+def get_genai() -> "google.generativeai":
+    """
+    API 키가 설정된 Gemini SDK(google.generativeai) 모듈을 반환합니다.
+    처음 호출될 때 한 번만 임포트하고 설정합니다. (여러 스레드에서 동시에 호출해도 한 번만 실행)
+    """
+    global _genai
+    if _genai is None:
+        with _lock:
+            if _genai is None:
+                started = time.perf_counter()
+                import google.generativeai as genai
+
+                genai.configure(api_key=settings.GOOGLE_API_KEY)
+                _genai = genai
+                logger.info(f"Initialized Gemini client in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return _genai
+
+async def load_genai() -> "google.generativeai":
+    """
+    이벤트 루프를 막지 않고 get_genai()의 결과를 반환합니다. (초기화 전이면 스레드에서 임포트)
+    """
+    if _genai is not None:
+        return _genai
+    return await run_llm(get_genai)
+
+async def warm_up_llm():
+    """
+    서버가 요청을 받기 시작한 뒤 백그라운드에서 Gemini 클라이언트를 초기화합니다.
+    시작(첫 응답)을 늦추지 않으면서 첫 LLM 요청이 임포트 시간을 기다리지 않게 합니다.
+    """
+    try:
+        await run_llm(get_genai)
+    except Exception as e:
+        logger.warning(f"Failed to initialize Gemini client: {e}")
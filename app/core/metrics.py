@@ -0,0 +1,274 @@
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from app.core.config import settings
+
+# Prometheus 텍스트 형식(0.0.4)으로 노출하는 가벼운 메트릭 레지스트리입니다.
+# 값 갱신은 딕셔너리 조회와 잠금 한 번으로 끝나도록 단순하게 유지합니다.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 요청 지연 (초): 캐시된 조회(ms 단위)부터 LLM 스트리밍(수십 초)까지
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 요청 밖(백그라운드 작업, 쓰기 큐 등)에서 기록된 값의 route 레이블
+BACKGROUND_ROUTE = "background"
+UNMATCHED_ROUTE = "unmatched"
+
+LabelValues = Tuple[str, ...]
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def samples(self) -> Iterator[Tuple[str, Sequence[str], Sequence[str], float]]:
+        """(이름, 레이블 이름, 레이블 값, 값)"""
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for name, labelnames, labelvalues, value in self.samples():
+            lines.append(f"{name}{_format_labels(labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for labelvalues, value in items:
+            yield self.name, self.labelnames, labelvalues, value
+
+class Gauge(_Metric):
+    """
+    collect가 있으면 노출할 때마다 호출하여 {레이블 값: 값}을 읽습니다. (다른 객체의 상태를 그대로 노출)
+    """
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 collect: Optional[Callable[[], Dict[LabelValues, float]]] = None):
+        super().__init__(name, documentation, labelnames)
+        # 레이블이 없는 게이지는 처음부터 0으로 노출합니다.
+        self._values: Dict[LabelValues, float] = {} if self.labelnames else {(): 0.0}
+        self._collect = collect
+
+    def inc(self, *labelvalues: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def dec(self, *labelvalues: str, amount: float = 1.0):
+        self.inc(*labelvalues, amount=-amount)
+
+    def samples(self):
+        if self._collect is not None:
+            items = list(self._collect().items())
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        for labelvalues, value in items:
+            yield self.name, self.labelnames, labelvalues, value
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 레이블 값별 [버킷별 개수(+Inf 포함, 누적 아님), 합계]
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labelvalues: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labelvalues)
+            if entry is None:
+                entry = self._values[labelvalues] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    def samples(self):
+        with self._lock:
+            items = [(labelvalues, list(counts), total[0]) for labelvalues, (counts, total) in self._values.items()]
+        bucket_labelnames = self.labelnames + ("le",)
+        for labelvalues, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", bucket_labelnames, labelvalues + (_format_value(bound),), cumulative
+            yield f"{self.name}_sum", self.labelnames, labelvalues, total
+            yield f"{self.name}_count", self.labelnames, labelvalues, cumulative
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+REQUESTS = registry.register(Counter(
+    "app_requests_total", "HTTP requests by method, route template and status code.",
+    ("method", "route", "status"),
+))
+REQUEST_DURATION = registry.register(Histogram(
+    "app_request_duration_seconds", "HTTP request latency until the response body is fully sent.",
+    ("method", "route"),
+))
+REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    "app_requests_in_flight", "HTTP requests currently being processed.",
+))
+PHASE_DURATION = registry.register(Histogram(
+    "app_phase_duration_seconds",
+    "Time spent per request in each phase (db, llm, upload, parse, serialize, ...), including queueing.",
+    ("route", "phase"),
+))
+ERRORS = registry.register(Counter(
+    "app_errors_total", "Errors by route and kind (unhandled exceptions and errors handled in place).",
+    ("route", "kind"),
+))
+LLM_TOKENS = registry.register(Counter(
+    "app_llm_tokens_total", "Gemini tokens by operation and kind (prompt, completion, cached).",
+    ("operation", "kind"),
+))
+
+@dataclass
+class _RequestState:
+    scope: dict
+    # 단계별 누적 시간 (요청이 끝날 때 PHASE_DURATION에 기록)
+    phases: Dict[str, float] = field(default_factory=dict)
+
+_request_state: ContextVar[Optional[_RequestState]] = ContextVar("metrics_request_state", default=None)
+
+def route_label(scope: dict) -> str:
+    # 라우팅 후 FastAPI가 scope에 남기는 라우트의 경로 템플릿 (/roadmap/{roadmap_id}, 라우터 prefix 제외)을
+    # 레이블로 사용하여 레이블 수를 제한합니다.
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+def _current_route() -> str:
+    state = _request_state.get()
+    return route_label(state.scope) if state is not None else BACKGROUND_ROUTE
+
+def record_phase(phase: str, seconds: float):
+    """
+    단계 소요 시간을 기록합니다. 요청 안에서는 요청이 끝날 때 단계별 합계로, 요청 밖에서는 바로 기록합니다.
+    """
+    if not settings.METRICS_ENABLED:
+        return
+    state = _request_state.get()
+    if state is None:
+        PHASE_DURATION.observe(seconds, BACKGROUND_ROUTE, phase)
+        return
+    state.phases[phase] = state.phases.get(phase, 0.0) + seconds
+
+@contextmanager
+def span(phase: str):
+    """
+    with 블록의 실행 시간을 phase 단계로 기록합니다. (async 함수 안에서 await를 감싸도 됩니다)
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(phase, time.perf_counter() - started)
+
+def record_error(kind: str):
+    """처리된 오류(스트림 중 오류, 백그라운드 작업 실패 등)를 현재 route로 기록합니다."""
+    if settings.METRICS_ENABLED:
+        ERRORS.inc(_current_route(), kind)
+
+def record_llm_usage(operation: str, response):
+    """
+    Gemini 응답의 usage_metadata에서 토큰 수를 기록합니다. (스트리밍 응답은 스트림을 다 읽은 뒤 호출)
+    """
+    if not settings.METRICS_ENABLED:
+        return
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    for kind, attr in (("prompt", "prompt_token_count"), ("completion", "candidates_token_count"),
+                       ("cached", "cached_content_token_count")):
+        count = getattr(usage, attr, 0) or 0
+        if count:
+            LLM_TOKENS.inc(operation, kind, amount=count)
+
+class MetricsMiddleware:
+    """
+    요청마다 지연/상태 코드/진행 중 요청 수/단계별 시간을 기록하는 ASGI 미들웨어입니다.
+    스트리밍 응답은 본문 전송이 끝날 때까지의 시간을 기록합니다.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        state = _RequestState(scope)
+        token = _request_state.set(state)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception as e:
+            ERRORS.inc(route_label(scope), type(e).__name__)
+            raise
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            _request_state.reset(token)
+            route = route_label(scope)
+            REQUEST_DURATION.observe(time.perf_counter() - started, scope["method"], route)
+            REQUESTS.inc(scope["method"], route, str(status))
+            for phase, seconds in state.phases.items():
+                PHASE_DURATION.observe(seconds, route, phase)
@@ -0,0 +1,148 @@
+import hashlib
+import logging
+from contextlib import contextmanager
+from sqlalchemy import Column, MetaData, String, Table, delete, inspect, literal, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.core.database import Base
+
+logger = logging.getLogger(__name__)
+
+def _column_default_sql(column, dialect) -> str:
+    # 기존 행에도 값이 채워지도록 스칼라 기본값이 있으면 DEFAULT 절로 옮깁니다.
+    default = column.default
+    if default is None or not default.is_scalar:
+        return ""
+    value = literal(default.arg).compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+    return f" DEFAULT {value}"
+
+def _add_missing_columns(engine: Engine) -> set:
+    added = set()
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(
+                    f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                    f"{_column_default_sql(column, engine.dialect)}"
+                ))
+                logger.info(f"Added column {table.name}.{column.name}")
+                added.add((table.name, column.name))
+    return added
+
+def _create_missing_indexes(engine: Engine):
+    # create_all은 이미 존재하는 테이블에 새로 정의된 인덱스를 만들지 않으므로 따로 확인합니다.
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing_indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(bind=engine)
+                logger.info(f"Created index {index.name}")
+
+# 여러 인스턴스가 동시에 시작할 때 스키마 변경을 한 인스턴스씩 실행하기 위한 PostgreSQL advisory lock 키
+MIGRATION_LOCK_KEY = 7_202_401
+
+@contextmanager
+def _migration_lock(engine: Engine):
+    # SQLite는 인스턴스 로컬 파일이므로 잠금이 필요 없습니다.
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    with engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+# 마지막으로 적용한 스키마의 지문 (모델 정의가 바뀌지 않았으면 시작 시 스키마 확인을 건너뜀)
+# 모델 메타데이터와 분리하여 지문 계산에 포함되지 않게 합니다.
+_stamp_metadata = MetaData()
+schema_stamp = Table("schema_stamp", _stamp_metadata, Column("fingerprint", String, primary_key=True))
+
+def schema_fingerprint() -> str:
+    """
+    모델 정의(테이블, 컬럼 타입/기본값, 인덱스)와 검색 색인 DDL로 스키마 지문을 만듭니다.
+    """
+    from app import models  # noqa: F401 (모든 모델을 메타데이터에 등록)
+    from app.services.search import PG_SEARCH_INDEX_DDL, SEARCH_INDEX_DDL
+
+    parts = []
+    for table in Base.metadata.sorted_tables:
+        parts.append(f"table {table.name}")
+        for column in table.columns:
+            default = column.default.arg if column.default is not None and column.default.is_scalar else None
+            parts.append(f"column {column.name} {column.type!r} {default!r}")
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            parts.append(f"index {index.name} {[c.name for c in index.columns]}")
+    parts.extend(SEARCH_INDEX_DDL)
+    parts.extend(PG_SEARCH_INDEX_DDL)
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+def _stamp_matches(engine: Engine, fingerprint: str) -> bool:
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(schema_stamp.c.fingerprint)).scalar() == fingerprint
+    except SQLAlchemyError:
+        # 스탬프 테이블이 없는 DB (새 DB 또는 이전 버전)
+        return False
+
+def _write_stamp(engine: Engine, fingerprint: str):
+    _stamp_metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(delete(schema_stamp))
+        conn.execute(schema_stamp.insert().values(fingerprint=fingerprint))
+
+def upgrade_schema(engine: Engine, force: bool = False):
+    """
+    모델 정의에 맞춰 DB 스키마를 갱신합니다.
+    - 없는 테이블/인덱스는 create_all로 생성합니다.
+    - 이미 존재하는 테이블에 새로 추가된 컬럼은 ALTER TABLE ... ADD COLUMN으로 추가합니다.
+    - 이미 존재하는 테이블에 새로 정의된 인덱스는 CREATE INDEX로 추가합니다.
+    - SQLite에서는 FTS5 검색 색인과 트리거를 만들고, 새로 만든 경우 기존 행으로 채웁니다.
+      (PostgreSQL에서는 to_tsvector GIN 색인을 만듭니다.)
+    (컬럼 삭제/변경은 다루지 않는 가벼운 마이그레이션입니다.)
+    SQLite와 PostgreSQL에서 같은 방식으로 동작하며, PostgreSQL에서는 advisory lock으로 인스턴스 간에 직렬화합니다.
+    DB에 저장된 스키마 지문이 현재 모델 정의와 같으면 (force가 아니면) 확인 없이 바로 반환합니다.
+    """
+    fingerprint = schema_fingerprint()
+    if not force and _stamp_matches(engine, fingerprint):
+        logger.info("Database schema is up to date")
+        return
+
+    with _migration_lock(engine):
+        # 잠금을 기다리는 동안 다른 인스턴스가 갱신했을 수 있습니다.
+        if not force and _stamp_matches(engine, fingerprint):
+            return
+        Base.metadata.create_all(bind=engine)
+        added = _add_missing_columns(engine)
+        _create_missing_indexes(engine)
+
+        # 새로 추가된 진행률 카운터는 기존 미션 행에서 채웁니다.
+        if ("roadmaps", "total_missions") in added:
+            from app.services.progress import check_progress
+            with Session(engine) as db:
+                check_progress(db, fix=True)
+
+        # 로드맵 목록 버전 카운터의 한 행 (쓰기 경로는 UPDATE만 하도록 미리 만들어 둡니다)
+        from app.models import RoadmapListVersion
+        with Session(engine) as db:
+            if db.get(RoadmapListVersion, 1) is None:
+                db.add(RoadmapListVersion(id=1, version=1))
+                db.commit()
+
+        # 전문 검색 색인 (SQLite FTS5 가상 테이블 + 동기화 트리거, PostgreSQL GIN 색인)
+        from app.services.search import ensure_search_index
+        ensure_search_index(engine)
+
+        _write_stamp(engine, fingerprint)
@@ -0,0 +1,14 @@
+import json
+from typing import Optional
+
+# Server-Sent Events 응답에 공통으로 사용하는 헤더 (프록시 버퍼링 비활성화)
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def format_sse(data: dict, event: Optional[str] = None) -> str:
+    """
+    Server-Sent Events 형식의 메시지 한 건을 만듭니다.
+    """
+    message = f"data: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+    if event:
+        message = f"event: {event}\n" + message
+    return message
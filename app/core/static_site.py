@@ -0,0 +1,209 @@
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+from app.core.http_cache import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, is_not_modified
+
+logger = logging.getLogger(__name__)
+
+# Vite가 내용 해시를 붙여 내보내는 파일 (assets/index-BxG1h2Jk.js)은 내용이 바뀌면 이름도 바뀝니다.
+HASHED_ASSET_PATTERN = re.compile(r"^assets/.+[-.][A-Za-z0-9_-]{8,}\.\w+$")
+
+INDEX_FILE = "index.html"
+
+# 이 크기 이하의 파일은 시작 시 메모리에 올려 요청마다 파일을 열지 않습니다.
+MEMORY_MAX_BYTES = 2 * 1024 * 1024
+# 이보다 작은 파일은 압축 이득이 헤더 크기보다 작습니다.
+COMPRESS_MIN_BYTES = 1024
+# 압축본이 원본의 이 비율보다 작을 때만 사용합니다.
+COMPRESS_MAX_RATIO = 0.9
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "application/xml", "image/svg+xml")
+
+# Content-Encoding별 미리 압축된 파일 확장자 (선호 순)
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def _compress(data: bytes, encoding: str) -> Optional[bytes]:
+    if encoding == "gzip":
+        # mtime=0: 같은 내용이면 같은 압축본 (ETag 유지)
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if encoding == "br" and brotli is not None:
+        return brotli.compress(data, quality=11)
+    return None
+
+def _is_compressible(media_type: str) -> bool:
+    return media_type.startswith(COMPRESSIBLE_TYPES)
+
+def _media_type(path: str) -> str:
+    return mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+@dataclass
+class StaticVariant:
+    etag: str
+    body: Optional[bytes] = None  # 메모리에 올린 내용
+    path: Optional[str] = None  # MEMORY_MAX_BYTES보다 큰 파일은 경로만 보관
+
+@dataclass
+class StaticAsset:
+    media_type: str
+    cache_control: str
+    # Content-Encoding("identity", "br", "gzip")별 표현
+    variants: Dict[str, StaticVariant] = field(default_factory=dict)
+
+def _load_variant(path: str, etag_suffix: str = "") -> StaticVariant:
+    size = os.path.getsize(path)
+    if size <= MEMORY_MAX_BYTES:
+        with open(path, "rb") as f:
+            body = f.read()
+        digest = hashlib.sha1(body).hexdigest()[:20]
+        return StaticVariant(etag=f'"{digest}{etag_suffix}"', body=body)
+    stat = os.stat(path)
+    return StaticVariant(etag=f'"{stat.st_mtime_ns:x}-{size:x}{etag_suffix}"', path=path)
+
+def build_asset(root: str, relative_path: str, compress: bool = True) -> StaticAsset:
+    """
+    파일 하나의 응답 표현을 만듭니다.
+    빌드 시 만든 압축본(.br/.gz)이 있으면 사용하고, 없으면 메모리에 올린 파일을 압축합니다. (compress=True)
+    """
+    path = os.path.join(root, relative_path)
+    media_type = _media_type(path)
+    cache_control = IMMUTABLE_CACHE_CONTROL if HASHED_ASSET_PATTERN.match(relative_path) else REVALIDATE_CACHE_CONTROL
+    asset = StaticAsset(media_type=media_type, cache_control=cache_control)
+    identity = _load_variant(path)
+    asset.variants["identity"] = identity
+
+    size = os.path.getsize(path)
+    if not _is_compressible(media_type) or size < COMPRESS_MIN_BYTES:
+        return asset
+    for encoding, suffix in ENCODING_SUFFIXES.items():
+        etag_suffix = f"-{encoding}"
+        if os.path.isfile(path + suffix):
+            variant = _load_variant(path + suffix, etag_suffix)
+            variant_size = len(variant.body) if variant.body is not None else os.path.getsize(variant.path)
+        elif compress and identity.body is not None:
+            body = _compress(identity.body, encoding)
+            if body is None:
+                continue
+            variant = StaticVariant(etag=identity.etag[:-1] + etag_suffix + '"', body=body)
+            variant_size = len(body)
+        else:
+            continue
+        if variant_size < size * COMPRESS_MAX_RATIO:
+            asset.variants[encoding] = variant
+    return asset
+
+def iter_static_files(root: str):
+    """
+    root 아래 파일의 상대 경로(/ 구분)를 반환합니다. 원본이 있는 압축본(.br/.gz)은 제외합니다.
+    """
+    for dirpath, _, filenames in os.walk(root):
+        names = set(filenames)
+        for name in filenames:
+            base, ext = os.path.splitext(name)
+            if ext in ENCODING_SUFFIXES.values() and base in names:
+                continue
+            yield os.path.relpath(os.path.join(dirpath, name), root).replace(os.sep, "/")
+
+def accepted_encodings(accept_encoding: str) -> set:
+    accepted = set()
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if token:
+            accepted.add(token.strip().lower())
+    return accepted
+
+class StaticSite:
+    """
+    프론트엔드 빌드(static/)의 매니페스트입니다.
+    시작 시 파일 목록, ETag, 압축본을 한 번 만들어 두고, 요청은 딕셔너리 조회만으로 응답합니다.
+    (파일 변경은 load()를 다시 호출해야 반영됩니다.)
+    """
+    def __init__(self, root: str):
+        self.root = root
+        self.assets: Dict[str, StaticAsset] = {}
+
+    @property
+    def index(self) -> Optional[StaticAsset]:
+        return self.assets.get(INDEX_FILE)
+
+    def load(self, compress: bool = True):
+        assets = {}
+        if os.path.isdir(self.root):
+            for relative_path in iter_static_files(self.root):
+                assets[relative_path] = build_asset(self.root, relative_path, compress=compress)
+        self.assets = assets
+        if assets:
+            in_memory = sum(
+                len(v.body) for a in assets.values() for v in a.variants.values() if v.body is not None
+            )
+            logger.info(f"Loaded {len(assets)} static files ({in_memory / 1024:.0f} KiB in memory)")
+
+    def lookup(self, path: str) -> Optional[StaticAsset]:
+        """
+        경로의 파일을 반환합니다. 없는 경로는 SPA 라우트로 보고 index.html을 반환하며,
+        없는 assets/ 파일은 index.html 대신 None(404)을 반환합니다.
+        """
+        asset = self.assets.get(path or INDEX_FILE)
+        if asset is not None:
+            return asset
+        if path.startswith("assets/"):
+            return None
+        return self.index
+
+    def response(self, request: Request, asset: StaticAsset) -> Response:
+        encoding = "identity"
+        if len(asset.variants) > 1:
+            accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+            encoding = next((e for e in ENCODING_SUFFIXES if e in accepted and e in asset.variants), "identity")
+        variant = asset.variants[encoding]
+
+        headers = {"ETag": variant.etag, "Cache-Control": asset.cache_control}
+        if len(asset.variants) > 1:
+            headers["Vary"] = "Accept-Encoding"
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        if is_not_modified(request, variant.etag):
+            return Response(status_code=304, headers=headers)
+        if variant.body is not None:
+            return Response(content=variant.body, media_type=asset.media_type, headers=headers)
+        return FileResponse(variant.path, media_type=asset.media_type, headers=headers)
+
+def precompress_static(root: str) -> int:
+    """
+    root 아래 압축할 만한 파일마다 .gz/.br 압축본을 만들어 둡니다. (빌드 단계용, 만든 파일 수 반환)
+    brotli 패키지가 없으면 .gz만 만듭니다.
+    """
+    written = 0
+    for relative_path in iter_static_files(root):
+        path = os.path.join(root, relative_path)
+        if not _is_compressible(_media_type(path)) or os.path.getsize(path) < COMPRESS_MIN_BYTES:
+            continue
+        with open(path, "rb") as f:
+            data = f.read()
+        for encoding, suffix in ENCODING_SUFFIXES.items():
+            body = _compress(data, encoding)
+            if body is None or len(body) >= len(data) * COMPRESS_MAX_RATIO:
+                continue
+            with open(path + suffix, "wb") as f:
+                f.write(body)
+            written += 1
+    return written
+
+static_site = StaticSite("static")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Text, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Text, DateTime, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -14,9 +14,28 @@ class Roadmap(Base):
     frequency = Column(String)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # 진행률 카운터 (Mission 행의 비정규화 값, 미션 추가/완료와 같은 트랜잭션에서 갱신)
+    total_missions = Column(Integer, default=0)
+    completed_missions = Column(Integer, default=0)
+    week_progress = Column(Text, nullable=True)  # JSON: {"<주차>": {"completed": n, "total": m}}
+
+    # 응답 캐시/ETag용 버전 스탬프 (미션 완료, 새 채팅 메시지 등 쓰기마다 증가)
+    version = Column(Integer, default=1)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # 보관 테이블(chat_archives)로 옮겨진 마지막 ChatHistory.id (0이면 보관된 대화 없음)
+    archived_until_id = Column(Integer, default=0)
+
     # Relationships
     missions = relationship("Mission", back_populates="roadmap", cascade="all, delete-orphan")
     chats = relationship("ChatHistory", back_populates="roadmap", cascade="all, delete-orphan")
+    chat_summary = relationship("ChatSummary", back_populates="roadmap", uselist=False, cascade="all, delete-orphan")
+    chat_archives = relationship("ChatArchive", back_populates="roadmap", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # 목록 조회의 정렬/키셋 페이지네이션 (created_at DESC, id DESC)
+        Index("ix_roadmaps_created_at_id", "created_at", "id"),
+    )
 
 class Mission(Base):
     __tablename__ = "missions"
@@ -32,6 +51,11 @@ class Mission(Base):
     # Relationships
     roadmap = relationship("Roadmap", back_populates="missions")
 
+    __table_args__ = (
+        # 로드맵별 미션 조회와 진행률 카운터 재계산(집계)을 인덱스로 처리합니다.
+        Index("ix_missions_roadmap_id_is_completed", "roadmap_id", "is_completed"),
+    )
+
 class ChatHistory(Base):
     __tablename__ = "chat_history"
 
@@ -39,9 +63,97 @@ class ChatHistory(Base):
     roadmap_id = Column(Integer, ForeignKey("roadmaps.id"))
     role = Column(String)  # "user" or "model"
     text = Column(Text)
-    image = Column(Text, nullable=True)  # Base64 string or URL (optional)
-    model_image = Column(Text, nullable=True)  # Image generated by model (optional)
+    image = Column(Text, nullable=True)  # Blob URL (/api/v1/blobs/...). 이전 데이터는 Base64일 수 있음 (manage.py migrate-images)
+    model_image = Column(Text, nullable=True)  # Image generated by model (optional, Blob URL)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
     roadmap = relationship("Roadmap", back_populates="chats")
+
+    __table_args__ = (
+        # 로드맵별 최신 대화부터 역순 페이지 조회 (WHERE roadmap_id = ? AND id < ? ORDER BY id DESC)
+        Index("ix_chat_history_roadmap_id_id", "roadmap_id", "id"),
+    )
+
+class ChatSummary(Base):
+    __tablename__ = "chat_summaries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    roadmap_id = Column(Integer, ForeignKey("roadmaps.id"), unique=True, index=True)
+    summary = Column(Text, default="")
+    summarized_until_id = Column(Integer, default=0)  # 요약에 반영된 마지막 ChatHistory.id
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # Relationships
+    roadmap = relationship("Roadmap", back_populates="chat_summary")
+
+class ChatArchive(Base):
+    __tablename__ = "chat_archives"
+
+    id = Column(Integer, primary_key=True, index=True)
+    roadmap_id = Column(Integer, ForeignKey("roadmaps.id"))
+    # 이 세그먼트에 담긴 ChatHistory.id 범위 (양 끝 포함)
+    first_chat_id = Column(Integer)
+    last_chat_id = Column(Integer)
+    message_count = Column(Integer)
+    codec = Column(String, default="zlib")
+    payload = Column(LargeBinary)  # 압축된 JSON: [{"id", "role", "text", "image", "model_image", "created_at"}, ...]
+    raw_size = Column(Integer)  # 압축 전 바이트 수
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relationships
+    roadmap = relationship("Roadmap", back_populates="chat_archives")
+
+    __table_args__ = (
+        # 로드맵별로 before보다 오래된 세그먼트를 최신순으로 조회 (WHERE roadmap_id = ? AND first_chat_id < ?)
+        Index("ix_chat_archives_roadmap_id_last_chat_id", "roadmap_id", "last_chat_id"),
+    )
+
+class PlanJob(Base):
+    __tablename__ = "plan_jobs"
+
+    id = Column(String, primary_key=True)  # uuid4 hex
+    status = Column(String, default="queued", index=True)  # "queued", "running", "succeeded", "failed"
+    stage = Column(String, nullable=True)  # 진행 단계 (e.g., "uploading", "generating", "saving")
+    goal = Column(String)
+    level = Column(String)
+    duration = Column(Integer)
+    frequency = Column(String)
+    file_path = Column(String, nullable=True)  # 작업 처리 전까지 보관하는 업로드 파일 경로
+    use_cache = Column(Boolean, default=True)  # 로드맵 생성 결과 캐시 사용 여부
+    roadmap_id = Column(Integer, ForeignKey("roadmaps.id"), nullable=True)
+    result = Column(Text, nullable=True)  # 생성된 로드맵 JSON
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class PlanCache(Base):
+    __tablename__ = "plan_cache"
+
+    cache_key = Column(String, primary_key=True)  # 정규화된 (goal, level, duration, frequency, file hash)의 SHA-256
+    payload = Column(Text)  # 커리큘럼 JSON (project_title, curriculum)
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ReviewCache(Base):
+    __tablename__ = "review_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    prompt_key = Column(String, index=True)  # 정규화된 리뷰 프롬프트의 SHA-256
+    image_hash = Column(String)  # 이미지 perceptual hash (dHash, 16진수)
+    text = Column(Text)  # 리뷰 응답
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # 같은 이미지(해시 정확히 일치) 조회와 만료 항목 정리
+        Index("ix_review_cache_prompt_key_image_hash", "prompt_key", "image_hash"),
+        Index("ix_review_cache_created_at", "created_at"),
+    )
+
+class RoadmapListVersion(Base):
+    __tablename__ = "roadmap_list_version"
+
+    # 한 행(id=1)만 사용하는 카운터. 목록 응답이 바뀌는 쓰기(로드맵 추가, 진행률/제목 변경)마다 증가합니다.
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, default=1)
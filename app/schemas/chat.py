@@ -13,6 +13,8 @@ class ChatRequest(BaseModel):
     model_config = ConfigDict(extra='ignore')
 
     message: str
+    # 더 이상 사용하지 않습니다. 서버가 roadmap_id 기준으로 ChatHistory에서 대화 내역을 재구성합니다.
+    # (이전 버전 클라이언트 호환을 위해 필드만 유지)
     history: Optional[List[ChatMessage]] = []
     context: Optional[str] = None
     roadmap_id: Optional[int] = None
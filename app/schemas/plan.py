@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 class PlanRequest(BaseModel):
     goal: str
@@ -20,3 +20,11 @@ class WeekPlan(BaseModel):
 class RoadmapResponse(BaseModel):
     project_title: str
     curriculum: List[WeekPlan]
+
+class PlanJobStatus(BaseModel):
+    job_id: str
+    status: str  # "queued", "running", "succeeded", "failed"
+    stage: Optional[str] = None
+    roadmap_id: Optional[int] = None
+    result: Optional[RoadmapResponse] = None
+    error: Optional[str] = None
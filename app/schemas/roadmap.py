@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from app.schemas.plan import RoadmapResponse
 
@@ -16,7 +16,14 @@ class ChatMessage(BaseModel):
 
 class RoadmapWithHistory(RoadmapResponse):
     id: int
+    # 최근 대화만 포함합니다. 이전 대화는 chat_cursor를 before로 넘겨 /roadmap/{id}/chats에서 조회합니다.
     chat_history: List[ChatMessage] = []
+    chat_cursor: Optional[int] = None
+
+class ChatHistoryPage(BaseModel):
+    messages: List[ChatMessage]
+    # 더 오래된 대화가 있으면 다음 요청의 before 값, 없으면 None
+    next_before: Optional[int] = None
 
 class RoadmapSummary(BaseModel):
     id: int
@@ -26,6 +33,8 @@ class RoadmapSummary(BaseModel):
     created_at: datetime
     total_missions: int
     completed_missions: int
+    # 주차별 진행률: {"<주차>": {"completed": n, "total": m}}
+    week_progress: Dict[str, Dict[str, int]] = {}
 
     class Config:
         from_attributes = True
@@ -0,0 +1,27 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+class SearchHit(BaseModel):
+    kind: str  # "chat" or "mission"
+    id: int  # ChatHistory.id 또는 Mission.id
+    roadmap_id: int
+    roadmap_title: Optional[str] = None
+    # 일치한 단어를 **로 감싼 본문 일부 (Markdown 굵게)
+    snippet: str
+    # 관련도 (클수록 관련 높음, 결과 정렬 기준)
+    score: float = 0.0
+
+    # kind == "chat"
+    role: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    # kind == "mission"
+    mission_key: Optional[str] = None
+    week: Optional[int] = None
+    title: Optional[str] = None
+    is_completed: Optional[bool] = None
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchHit]
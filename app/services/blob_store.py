@@ -0,0 +1,216 @@
+import base64
+import binascii
+import hashlib
+import logging
+import mimetypes
+import mmap
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app import models
+
+logger = logging.getLogger(__name__)
+
+# 블롭을 내려주는 API 경로 (라우터 prefix 포함)
+BLOB_URL_PREFIX = "/api/v1/blobs/"
+# 파일명: SHA-256 해시 + 확장자
+BLOB_NAME_PATTERN = re.compile(r"^([0-9a-f]{64})(\.[a-z0-9]{1,8})?$")
+_DATA_URL_PATTERN = re.compile(r"^data:([\w.+-]+/[\w.+-]+)?(?:;[^,]*)?;base64,", re.IGNORECASE)
+
+# 헤더(매직 바이트)로 이미지 형식 추정 (data URL이 아닌 순수 Base64 값용)
+_MAGIC_MIME_TYPES = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+]
+
+def _sniff_mime_type(data: bytes) -> str:
+    for magic, mime_type in _MAGIC_MIME_TYPES:
+        if data.startswith(magic):
+            return mime_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+def _extension_for(mime_type: str) -> str:
+    if mime_type == "image/jpeg":
+        return ".jpg"
+    return mimetypes.guess_extension(mime_type) or ".bin"
+
+def parse_blob_name(name: str) -> Optional[Tuple[str, str]]:
+    """
+    "<sha256>.<ext>" 형식의 블롭 이름을 (해시, MIME 타입)으로 해석합니다. 형식이 맞지 않으면 None.
+    """
+    match = BLOB_NAME_PATTERN.match(name)
+    if not match:
+        return None
+    mime_type = mimetypes.guess_type(f"blob{match.group(2) or ''}")[0] or "application/octet-stream"
+    return match.group(1), mime_type
+
+class BlobStore:
+    """
+    내용 주소 기반(SHA-256) 블롭 저장소입니다. 같은 내용은 한 번만 저장되며 파일은 변경되지 않습니다.
+    파일은 `<root>/<해시 앞 2자리>/<해시><확장자>`에 저장합니다.
+    mmap_max_bytes가 0보다 크면 그 이하 크기의 블롭은 메모리 매핑하여 LRU로 재사용합니다.
+    """
+    def __init__(self, root: str, mmap_cache_size: int = 0, mmap_max_bytes: int = 0):
+        self.root = root
+        self.mmap_cache_size = mmap_cache_size
+        self.mmap_max_bytes = mmap_max_bytes
+        self._mmaps: "OrderedDict[str, mmap.mmap]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path_for(self, name: str) -> str:
+        return os.path.join(self.root, name[:2], name)
+
+    def put(self, data: bytes, mime_type: str) -> str:
+        """
+        블롭을 저장하고 이름("<해시><확장자>")을 반환합니다. 이미 있으면 다시 쓰지 않습니다.
+        """
+        name = hashlib.sha256(data).hexdigest() + _extension_for(mime_type)
+        path = self.path_for(name)
+        if os.path.exists(path):
+            return name
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 임시 파일에 쓴 뒤 rename하여 읽는 쪽이 쓰다 만 파일을 보지 않도록 합니다.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return name
+
+    def exists(self, name: str) -> bool:
+        return os.path.isfile(self.path_for(name))
+
+    def read_mapped(self, name: str) -> Optional[memoryview]:
+        """
+        (블로킹) 작은 블롭을 메모리 매핑하여 복사 없이 반환합니다. 매핑 대상이 아니거나 파일이 없으면 None을 반환합니다.
+        """
+        if self.mmap_cache_size <= 0 or self.mmap_max_bytes <= 0:
+            return None
+
+        with self._lock:
+            mapped = self._mmaps.get(name)
+            if mapped is not None:
+                self._mmaps.move_to_end(name)
+                return memoryview(mapped)
+
+        path = self.path_for(name)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return None
+        if size == 0 or size > self.mmap_max_bytes:
+            return None
+
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with self._lock:
+            self._mmaps[name] = mapped
+            while len(self._mmaps) > self.mmap_cache_size:
+                _, evicted = self._mmaps.popitem(last=False)
+                self._close_mapping(evicted)
+        return memoryview(mapped)
+
+    @staticmethod
+    def _close_mapping(mapped: mmap.mmap):
+        try:
+            mapped.close()
+        except BufferError:
+            # 아직 전송 중인 응답이 참조하고 있으면 참조가 모두 사라질 때 해제됩니다.
+            pass
+
+    def close(self):
+        with self._lock:
+            for mapped in self._mmaps.values():
+                self._close_mapping(mapped)
+            self._mmaps.clear()
+
+blob_store = BlobStore(
+    root=settings.BLOB_DIR,
+    mmap_cache_size=settings.BLOB_MMAP_CACHE_SIZE,
+    mmap_max_bytes=settings.BLOB_MMAP_MAX_BYTES,
+)
+
+def blob_url(name: str) -> str:
+    return f"{BLOB_URL_PREFIX}{name}"
+
+def decode_inline_image(value: str) -> Optional[Tuple[bytes, str]]:
+    """
+    data URL 또는 순수 Base64 문자열을 (바이트, MIME 타입)으로 디코딩합니다.
+    이미 URL이거나 Base64가 아니면 None을 반환합니다.
+    """
+    if not value or value.startswith(("/", "http://", "https://")):
+        return None
+
+    mime_type = None
+    match = _DATA_URL_PATTERN.match(value)
+    if match:
+        mime_type = match.group(1)
+        value = value[match.end():]
+    elif value.startswith("data:"):
+        return None
+
+    try:
+        data = base64.b64decode(value, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    return data, mime_type or _sniff_mime_type(data)
+
+def store_image_value(value: Optional[str], store: BlobStore = blob_store) -> Optional[str]:
+    """
+    (블로킹) 인라인 이미지(Base64)를 블롭 저장소에 저장하고 URL을 반환합니다. URL 등 그 외 값은 그대로 둡니다.
+    """
+    decoded = decode_inline_image(value) if value else None
+    if not decoded:
+        return value
+    data, mime_type = decoded
+    return blob_url(store.put(data, mime_type))
+
+def _is_inline(column):
+    # URL(상대 경로 또는 http)이 아닌 값 = Base64로 저장된 이미지
+    return column.isnot(None) & (column != "") & ~column.like("/%") & ~column.like("http%")
+
+def migrate_chat_images(db: Session, store: BlobStore = blob_store, batch_size: int = 100) -> int:
+    """
+    chat_history에 Base64로 저장된 image/model_image를 블롭 저장소로 옮기고 URL로 바꿉니다.
+    배치마다 커밋하므로 중간에 중단되어도 다시 실행하면 남은 행부터 이어서 처리합니다.
+    """
+    converted = 0
+    last_id = 0
+    while True:
+        rows = (
+            db.query(models.ChatHistory)
+            .filter(
+                models.ChatHistory.id > last_id,
+                or_(_is_inline(models.ChatHistory.image), _is_inline(models.ChatHistory.model_image)),
+            )
+            .order_by(models.ChatHistory.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        for row in rows:
+            row.image = store_image_value(row.image, store)
+            row.model_image = store_image_value(row.model_image, store)
+            converted += 1
+        last_id = rows[-1].id
+        db.commit()
+        # 변환된 Base64 문자열을 세션에서 해제합니다.
+        db.expunge_all()
+        logger.info(f"Migrated images of {converted} chat messages to the blob store")
+    return converted
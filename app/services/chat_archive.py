@@ -0,0 +1,179 @@
+import json
+import logging
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.services.blob_store import store_image_value
+from app import models
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_CODEC = "zlib"
+ZLIB_LEVEL = 9
+
+def encode_segment(messages: List[dict]) -> Tuple[bytes, int]:
+    """
+    메시지 목록을 압축된 JSON으로 직렬화합니다. (압축된 바이트, 압축 전 크기)를 반환합니다.
+    """
+    raw = json.dumps(messages, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return zlib.compress(raw, ZLIB_LEVEL), len(raw)
+
+def decode_segment(archive: models.ChatArchive) -> List[dict]:
+    if archive.codec != ARCHIVE_CODEC:
+        raise ValueError(f"Unsupported chat archive codec: {archive.codec}")
+    return json.loads(zlib.decompress(archive.payload))
+
+def _archived_message(chat: models.ChatHistory) -> dict:
+    return {
+        "id": chat.id,
+        "role": chat.role,
+        "text": chat.text,
+        # 보관 전에 남아 있는 Base64 이미지는 블롭 저장소로 옮겨 URL만 보관합니다.
+        "image": store_image_value(chat.image),
+        "model_image": store_image_value(chat.model_image),
+        "created_at": chat.created_at.isoformat() if chat.created_at else None,
+    }
+
+def archive_boundary(db: Session, roadmap_id: int, summarized_until_id: int, cutoff: datetime,
+                     keep_recent: int) -> int:
+    """
+    보관할 수 있는 마지막 ChatHistory.id를 반환합니다. (0이면 보관할 메시지 없음)
+    cutoff보다 오래되었거나 최근 keep_recent개를 벗어난 메시지 중, 대화 윈도우가 더 이상 읽지 않는
+    (요약에 반영된) 메시지만 보관합니다.
+    """
+    if not summarized_until_id:
+        return 0
+    ChatHistory = models.ChatHistory
+    by_age = (
+        db.query(func.max(ChatHistory.id))
+        .filter(ChatHistory.roadmap_id == roadmap_id, ChatHistory.created_at < cutoff)
+        .scalar()
+    ) or 0
+    # 최근 keep_recent개를 제외한 가장 최신 메시지
+    by_count = (
+        db.query(ChatHistory.id)
+        .filter(ChatHistory.roadmap_id == roadmap_id)
+        .order_by(ChatHistory.id.desc())
+        .offset(keep_recent)
+        .limit(1)
+        .scalar()
+    ) or 0
+    return min(summarized_until_id, max(by_age, by_count))
+
+def compact_roadmap(db: Session, roadmap_id: int, cutoff: datetime, keep_recent: int, segment_size: int) -> int:
+    """
+    로드맵의 오래된 채팅 메시지를 segment_size개씩 압축하여 chat_archives로 옮기고, 옮긴 메시지 수를 반환합니다.
+    세그먼트마다 커밋하므로 중간에 중단되어도 다시 실행하면 남은 메시지부터 이어서 처리합니다.
+    """
+    from app.services.search import index_archive_segment
+
+    ChatHistory = models.ChatHistory
+    summarized_until_id = (
+        db.query(models.ChatSummary.summarized_until_id)
+        .filter(models.ChatSummary.roadmap_id == roadmap_id)
+        .scalar()
+    ) or 0
+    until_id = archive_boundary(db, roadmap_id, summarized_until_id, cutoff, keep_recent)
+
+    archived = 0
+    while until_id:
+        rows = (
+            db.query(ChatHistory)
+            .filter(ChatHistory.roadmap_id == roadmap_id, ChatHistory.id <= until_id)
+            .order_by(ChatHistory.id)
+            .limit(segment_size)
+            .all()
+        )
+        if not rows:
+            break
+        first_id, last_id = rows[0].id, rows[-1].id
+        messages = [_archived_message(row) for row in rows]
+        payload, raw_size = encode_segment(messages)
+        archive = models.ChatArchive(
+            roadmap_id=roadmap_id,
+            first_chat_id=first_id,
+            last_chat_id=last_id,
+            message_count=len(rows),
+            codec=ARCHIVE_CODEC,
+            payload=payload,
+            raw_size=raw_size,
+        )
+        db.add(archive)
+        db.flush()
+        # chat_history에서 지워지면 대화 검색 색인에서도 빠지므로, 같은 트랜잭션에서 세그먼트를 색인합니다.
+        index_archive_segment(db, archive.id, messages)
+        deleted = (
+            db.query(ChatHistory)
+            .filter(ChatHistory.roadmap_id == roadmap_id, ChatHistory.id.between(first_id, last_id))
+            .delete(synchronize_session=False)
+        )
+        if deleted != len(rows):
+            # 다른 인스턴스의 compact가 같은 메시지를 먼저 옮긴 경우 (세그먼트 중복 방지)
+            db.rollback()
+            logger.warning(f"Chat history of roadmap {roadmap_id} changed during compaction, skipping")
+            break
+        # 조회 응답은 보관 테이블에서 같은 메시지를 읽으므로 로드맵 버전은 올리지 않습니다.
+        db.query(models.Roadmap).filter(models.Roadmap.id == roadmap_id).update(
+            {models.Roadmap.archived_until_id: last_id}, synchronize_session=False
+        )
+        db.commit()
+        # 옮긴 메시지 본문을 세션에서 해제합니다.
+        db.expunge_all()
+        archived += len(rows)
+    if archived:
+        logger.info(f"Archived {archived} chat messages of roadmap {roadmap_id}")
+    return archived
+
+def compact_chat_history(db: Session, max_age_days: Optional[int] = None, keep_recent: Optional[int] = None,
+                         segment_size: Optional[int] = None) -> Tuple[int, int]:
+    """
+    모든 로드맵의 오래된 채팅 메시지를 보관 테이블로 옮깁니다. (로드맵 수, 메시지 수)를 반환합니다.
+    보관된 메시지는 /roadmap/{id}/chats 페이지 조회와 /search 검색에서 그대로 찾을 수 있습니다.
+    """
+    max_age_days = settings.CHAT_ARCHIVE_AFTER_DAYS if max_age_days is None else max_age_days
+    keep_recent = settings.CHAT_HOT_MAX_MESSAGES if keep_recent is None else keep_recent
+    segment_size = segment_size or settings.CHAT_ARCHIVE_SEGMENT_SIZE
+    cutoff = datetime.now(timezone.utc) - timedelta(days=max_age_days)
+
+    # 요약에 반영되었지만 아직 보관되지 않은 메시지가 있는 로드맵만 확인합니다.
+    roadmap_ids = [
+        roadmap_id for (roadmap_id,) in (
+            db.query(models.ChatSummary.roadmap_id)
+            .join(models.Roadmap, models.Roadmap.id == models.ChatSummary.roadmap_id)
+            .filter(models.ChatSummary.summarized_until_id > func.coalesce(models.Roadmap.archived_until_id, 0))
+            .order_by(models.ChatSummary.roadmap_id)
+            .all()
+        )
+    ]
+    roadmaps = messages = 0
+    for roadmap_id in roadmap_ids:
+        archived = compact_roadmap(db, roadmap_id, cutoff, keep_recent, segment_size)
+        if archived:
+            roadmaps += 1
+            messages += archived
+    return roadmaps, messages
+
+def load_archived_messages(db: Session, roadmap_id: int, before: Optional[int], limit: int) -> Tuple[List[dict], bool]:
+    """
+    보관된 메시지 중 before(메시지 id)보다 오래된 것을 최신부터 limit개 읽어 시간순으로 반환합니다.
+    필요한 세그먼트만 최신순으로 하나씩 읽어 압축을 풉니다. (메시지 목록, 더 오래된 메시지 존재 여부)를 반환합니다.
+    """
+    ChatArchive = models.ChatArchive
+    messages: List[dict] = []
+    upper = before
+    while len(messages) <= limit:
+        query = db.query(ChatArchive).filter(ChatArchive.roadmap_id == roadmap_id)
+        if upper is not None:
+            query = query.filter(ChatArchive.first_chat_id < upper)
+        archive = query.order_by(ChatArchive.last_chat_id.desc()).first()
+        if archive is None:
+            break
+        segment = decode_segment(archive)
+        if upper is not None:
+            segment = [m for m in segment if m["id"] < upper]
+        messages = segment + messages
+        upper = archive.first_chat_id
+    return messages[-limit:], len(messages) > limit
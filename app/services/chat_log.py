@@ -0,0 +1,163 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import run_in_session
+from app.core.executor import run_db
+from app.core.metrics import record_error
+from app.services.roadmap_cache import touch_roadmap
+from app import models
+
+logger = logging.getLogger(__name__)
+
+def add_chat_message(db: Session, roadmap_id: int, role: str, text: str):
+    """
+    채팅 메시지를 세션에 추가합니다. (커밋하지 않음)
+    """
+    db.add(models.ChatHistory(roadmap_id=roadmap_id, role=role, text=text))
+
+class _WriteOp(NamedTuple):
+    roadmap_id: int
+    apply: Callable[[Session], Any]
+    future: asyncio.Future
+
+def _apply_batch(db: Session, ops: List[_WriteOp]) -> List[Any]:
+    results = [op.apply(db) for op in ops]
+    # 상세 응답(채팅 내역, 진행률)이 바뀌므로 로드맵마다 한 번씩 버전을 올립니다.
+    # 목록 버전은 진행률을 바꾸는 쓰기(미션 완료)가 직접 올리므로 여기서는 올리지 않습니다.
+    for roadmap_id in dict.fromkeys(op.roadmap_id for op in ops):
+        touch_roadmap(db, roadmap_id, listed=False)
+    db.commit()
+    return results
+
+def _consume_exception(future: asyncio.Future):
+    # 결과를 기다리지 않는 쓰기(write-behind)의 실패는 writer가 로그로 남깁니다.
+    if not future.cancelled():
+        future.exception()
+
+_STOP = object()
+
+class ChatLogWriter:
+    """
+    채팅 메시지와 미션 완료를 모아 커밋하는 단일 writer 큐입니다.
+    요청은 쓰기를 큐에 넣기만 하고, writer 태스크가 앞선 배치를 커밋하는 동안 쌓인 쓰기를
+    다음 배치로 묶어 한 트랜잭션(한 번의 fsync)으로 커밋합니다. (group commit)
+    - 큐 깊이는 max_pending으로 제한되며, 가득 차면 enqueue가 자리가 날 때까지 기다립니다.
+    - 같은 로드맵을 읽기 전에 sync(roadmap_id)를 호출하면 그 로드맵의 대기 중인 쓰기가 커밋된 뒤에 읽습니다.
+    - 종료 시 stop()이 남은 쓰기를 모두 커밋합니다.
+    writer가 실행 중이 아니면(관리 명령어 등) 쓰기를 바로 커밋합니다.
+    """
+    def __init__(self, max_pending: int, batch_size: int):
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Dict[int, Set[asyncio.Future]] = defaultdict(set)
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        새 쓰기를 받지 않고, 큐에 남은 쓰기를 모두 커밋한 뒤 writer를 종료합니다.
+        """
+        if self._task is None:
+            return
+        task, queue = self._task, self._queue
+        self._task = None
+        await queue.put(_STOP)
+        await task
+
+    async def enqueue(self, roadmap_id: int, func: Callable[..., Any], *args) -> asyncio.Future:
+        """
+        func(db, *args)를 쓰기 큐에 넣고, 커밋 후 func의 반환값으로 완료되는 Future를 반환합니다.
+        """
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_consume_exception)
+        op = _WriteOp(roadmap_id, lambda db: func(db, *args), future)
+
+        if self._task is None:
+            await self._write([op])
+            return future
+
+        pending = self._pending[roadmap_id]
+        pending.add(future)
+        future.add_done_callback(lambda f: self._forget(roadmap_id, f))
+        await self._queue.put(op)
+        return future
+
+    async def execute(self, roadmap_id: int, func: Callable[..., Any], *args) -> Any:
+        """
+        enqueue 후 커밋될 때까지 기다려 func의 반환값을 돌려줍니다.
+        """
+        return await (await self.enqueue(roadmap_id, func, *args))
+
+    async def append_message(self, roadmap_id: int, role: str, text: str):
+        """
+        채팅 메시지를 write-behind로 저장합니다. (커밋을 기다리지 않음)
+        """
+        await self.enqueue(roadmap_id, add_chat_message, roadmap_id, role, text)
+
+    async def sync(self, roadmap_id: Optional[int] = None):
+        """
+        roadmap_id(없으면 전체)의 대기 중인 쓰기가 커밋될 때까지 기다립니다. (read-your-writes)
+        """
+        if roadmap_id is None:
+            futures = [f for pending in self._pending.values() for f in pending]
+        else:
+            futures = list(self._pending.get(roadmap_id, ()))
+        if futures:
+            await asyncio.wait(futures)
+
+    def _forget(self, roadmap_id: int, future: asyncio.Future):
+        pending = self._pending.get(roadmap_id)
+        if pending is not None:
+            pending.discard(future)
+            if not pending:
+                del self._pending[roadmap_id]
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            op = await self._queue.get()
+            if op is _STOP:
+                break
+            batch = [op]
+            # 앞선 배치를 커밋하는 동안 쌓인 쓰기를 함께 묶습니다.
+            while len(batch) < self.batch_size:
+                try:
+                    op = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if op is _STOP:
+                    stopping = True
+                    break
+                batch.append(op)
+            await self._write(batch)
+
+    async def _write(self, batch: List[_WriteOp]):
+        try:
+            results = await run_db(run_in_session, _apply_batch, batch)
+        except Exception as e:
+            if len(batch) == 1:
+                logger.error(f"Failed to write chat log for roadmap {batch[0].roadmap_id}: {e}")
+                record_error("chat_log")
+                batch[0].future.set_exception(e)
+                return
+            # 한 쓰기의 실패가 같은 배치의 다른 쓰기를 실패시키지 않도록 하나씩 다시 커밋합니다.
+            logger.warning(f"Chat log batch of {len(batch)} failed, retrying one by one: {e}")
+            for op in batch:
+                await self._write([op])
+            return
+        for op, result in zip(batch, results):
+            op.future.set_result(result)
+
+chat_log_writer = ChatLogWriter(
+    max_pending=settings.CHAT_LOG_MAX_PENDING,
+    batch_size=settings.CHAT_LOG_BATCH_SIZE,
+)
@@ -0,0 +1,198 @@
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Set, Tuple
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import run_in_session
+from app.core.executor import run_db, run_llm
+from app.core.llm import load_genai
+from app.core.metrics import record_error, record_llm_usage
+from app import models
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PREFIX = "[이전 대화 요약]"
+SUMMARY_ACK = "네, 이전 대화 내용을 기억하고 이어서 도와드릴게요."
+
+# 같은 로드맵에 대해 요약 작업이 중복 실행되지 않도록 진행 중인 로드맵 ID를 기록합니다.
+_folding_roadmaps: Set[int] = set()
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """
+    토큰 수의 근사치를 계산합니다. (UTF-8 4바이트당 1토큰: 영문은 약 4자, 한글은 약 1.3자)
+    매 요청마다 count_tokens API를 호출하지 않기 위한 휴리스틱입니다.
+    """
+    if not text:
+        return 0
+    return max(1, len(text.encode("utf-8")) // 4)
+
+@dataclass
+class ConversationWindow:
+    history: List[dict]  # Gemini start_chat()에 전달할 히스토리
+    overflow_until_id: int = 0  # 요약에 접어 넣어야 할 마지막 ChatHistory.id (0이면 없음)
+
+def build_conversation_window(db: Session, roadmap_id: int, token_budget: Optional[int] = None) -> ConversationWindow:
+    """
+    ChatHistory에서 로드맵의 대화 내역을 재구성합니다.
+    저장된 요약 + 토큰 예산 안에 들어가는 최근 메시지로 윈도우를 만들고,
+    예산을 벗어났지만 아직 요약되지 않은 메시지의 범위를 함께 반환합니다.
+    """
+    budget = token_budget or settings.CHAT_HISTORY_TOKEN_BUDGET
+
+    summary = db.query(models.ChatSummary).filter(models.ChatSummary.roadmap_id == roadmap_id).first()
+    summary_text = summary.summary if summary and summary.summary else ""
+    summarized_until_id = summary.summarized_until_id if summary else 0
+
+    # 최신 메시지부터 역순으로 읽으며 예산이 찰 때까지만 가져옵니다.
+    rows = (
+        db.query(models.ChatHistory.id, models.ChatHistory.role, models.ChatHistory.text)
+        .filter(
+            models.ChatHistory.roadmap_id == roadmap_id,
+            models.ChatHistory.id > summarized_until_id,
+        )
+        .order_by(models.ChatHistory.id.desc())
+        .yield_per(100)
+    )
+
+    used = estimate_tokens(summary_text)
+    recent = []
+    overflow_until_id = 0
+    for row in rows:
+        cost = estimate_tokens(row.text)
+        if used + cost > budget:
+            overflow_until_id = row.id
+            break
+        recent.append(row)
+        used += cost
+    recent.reverse()
+
+    # Gemini 멀티턴 대화는 user 메시지로 시작해야 하므로, 앞쪽의 model 메시지는 요약 대상으로 넘깁니다.
+    while recent and recent[0].role != "user":
+        overflow_until_id = max(overflow_until_id, recent.pop(0).id)
+
+    history = []
+    if summary_text:
+        history.append({"role": "user", "parts": [f"{SUMMARY_PREFIX}\n{summary_text}"]})
+        history.append({"role": "model", "parts": [SUMMARY_ACK]})
+    for row in recent:
+        history.append({"role": row.role, "parts": [row.text or ""]})
+
+    return ConversationWindow(history=history, overflow_until_id=overflow_until_id)
+
+def _load_fold_input(db: Session, roadmap_id: int, until_id: int) -> Tuple[str, int, list]:
+    """
+    기존 요약과 그 요약이 반영한 마지막 메시지 ID, 요약에 새로 반영할 메시지들을 읽어옵니다.
+    긴 기존 대화를 한 번에 요약하지 않도록 한 번에 접어 넣는 분량을 제한합니다.
+    """
+    summary = db.query(models.ChatSummary).filter(models.ChatSummary.roadmap_id == roadmap_id).first()
+    previous = summary.summary if summary and summary.summary else ""
+    summarized_until_id = (summary.summarized_until_id or 0) if summary else 0
+
+    rows = (
+        db.query(models.ChatHistory.id, models.ChatHistory.role, models.ChatHistory.text)
+        .filter(
+            models.ChatHistory.roadmap_id == roadmap_id,
+            models.ChatHistory.id > summarized_until_id,
+            models.ChatHistory.id <= until_id,
+        )
+        .order_by(models.ChatHistory.id.asc())
+        .yield_per(100)
+    )
+
+    limit = settings.CHAT_HISTORY_TOKEN_BUDGET * 2
+    used = 0
+    turns = []
+    for row in rows:
+        cost = estimate_tokens(row.text)
+        if turns and used + cost > limit:
+            break
+        turns.append(row)
+        used += cost
+    return previous, summarized_until_id, turns
+
+def _store_summary(
+    db: Session, roadmap_id: int, summary_text: str, base_until_id: int, summarized_until_id: int
+) -> bool:
+    """
+    요약을 읽은 시점의 범위(base_until_id)가 그대로일 때만 새 요약으로 바꿉니다.
+    그 사이 다른 인스턴스가 요약을 갱신했다면 덮어쓰지 않고 False를 반환합니다.
+    """
+    updated = db.execute(
+        update(models.ChatSummary)
+        .where(
+            models.ChatSummary.roadmap_id == roadmap_id,
+            func.coalesce(models.ChatSummary.summarized_until_id, 0) == base_until_id,
+        )
+        .values(summary=summary_text, summarized_until_id=summarized_until_id)
+    ).rowcount
+    if not updated:
+        if base_until_id or db.query(models.ChatSummary.id).filter(models.ChatSummary.roadmap_id == roadmap_id).first():
+            return False
+        db.add(models.ChatSummary(roadmap_id=roadmap_id, summary=summary_text, summarized_until_id=summarized_until_id))
+    try:
+        db.commit()
+    except IntegrityError:
+        # 다른 인스턴스가 같은 로드맵의 첫 요약을 먼저 만든 경우
+        db.rollback()
+        return False
+    return True
+
+def _build_summary_prompt(previous: str, turns: list) -> str:
+    conversation = "\n".join(
+        f"{'사용자' if row.role == 'user' else '코치'}: {row.text or ''}" for row in turns
+    )
+    return f"""
+    다음은 AI 학습 코치와 사용자의 대화입니다. 기존 요약에 새 대화 내용을 반영하여 하나의 요약으로 갱신하세요.
+
+    [규칙]
+    - 사용자의 학습 진행 상황, 완료한 미션, 퀴즈 결과, 어려워한 개념, 약속한 다음 단계를 반드시 보존하세요.
+    - 인사말 등 학습과 무관한 내용은 생략하세요.
+    - 한국어 글머리표로 간결하게 작성하세요.
+
+    [기존 요약]
+    {previous or "(없음)"}
+
+    [새 대화]
+    {conversation}
+    """
+
+async def fold_into_summary(roadmap_id: int, until_id: int):
+    """
+    윈도우에서 밀려난 메시지를 로드맵별 요약에 점진적으로 접어 넣습니다.
+    응답 이후 백그라운드 작업으로 실행되며, 실패해도 다음 턴에 다시 시도됩니다.
+    """
+    if until_id <= 0 or roadmap_id in _folding_roadmaps:
+        return
+
+    _folding_roadmaps.add(roadmap_id)
+    try:
+        # 읽기 세션은 LLM 호출 전에 닫습니다. (요약하는 동안 커넥션과 읽기 트랜잭션을 잡고 있지 않음)
+        previous, base_until_id, turns = await run_db(run_in_session, _load_fold_input, roadmap_id, until_id)
+        if not turns:
+            return
+
+        genai = await load_genai()
+        model = genai.GenerativeModel(
+            'gemini-2.5-flash',
+            generation_config=genai.types.GenerationConfig(
+                max_output_tokens=settings.CHAT_SUMMARY_MAX_TOKENS,
+                temperature=0.2,
+            )
+        )
+        response = await run_llm(model.generate_content, _build_summary_prompt(previous, turns))
+        record_llm_usage("summary", response)
+
+        stored = await run_db(
+            run_in_session, _store_summary, roadmap_id, response.text.strip(), base_until_id, turns[-1].id
+        )
+        if stored:
+            logger.info(f"Folded chat messages up to {turns[-1].id} into summary for roadmap {roadmap_id}")
+        else:
+            logger.info(f"Chat summary for roadmap {roadmap_id} changed during folding, discarded")
+    except Exception as e:
+        logger.error(f"Failed to update chat summary for roadmap {roadmap_id}: {e}")
+        record_error("summary")
+    finally:
+        _folding_roadmaps.discard(roadmap_id)
@@ -0,0 +1,311 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+from sqlalchemy import event, inspect
+from app.core.config import settings
+from app.core.llm import get_genai
+from app import models
+
+if TYPE_CHECKING:
+    from google.generativeai import GenerativeModel
+
+logger = logging.getLogger(__name__)
+
+CHAT_MODEL_NAME = 'gemini-2.5-flash'
+
+# 생성 설정 (답변 길이 및 창의성 제어)
+CHAT_GENERATION_CONFIG = {
+    "max_output_tokens": 1000,
+    "temperature": 0.7,
+}
+
+@lru_cache(maxsize=256)
+def build_system_instruction(goal: str, level: str) -> str:
+    """
+    사용자의 목표(Goal)와 수준(Level)을 반영한 코치 페르소나 시스템 프롬프트를 만듭니다. (Dynamic Persona)
+    """
+    system_instruction = f"""
+    당신은 'Grow'라는 친절하고 꼼꼼한 **AI 퍼스널 코치**입니다.
+    현재 사용자는 **"{goal}"** (수준: {level})라는 목표를 달성하기 위해 학습 중입니다.
+    당신의 임무는 사용자가 이 목표를 완수할 때까지 단계별로 안내하고 격려하는 것입니다.
+
+    [핵심 원칙]
+    1. **목표 지향적 대화:** 모든 답변은 **"{goal}"**과 관련된 내용이어야 합니다. 
+       - 사용자가 관련 없는 질문을 하면, 정중하게 답변하되 다시 원래 학습 목표로 주의를 환기시키세요.
+    2. **맞춤형 눈높이 교육:** 사용자의 수준({level})에 맞춰 설명의 난이도를 조절하세요.
+    3. **커리큘럼 준수:** 사용자가 업로드한 자료나 생성된 커리큘럼의 흐름을 따르세요.
+
+    [UI 및 환경 인지]
+    - 사용자는 웹 브라우저 환경에 있습니다.
+    - 화면 왼쪽 사이드바에 '학습 로드맵'이 있으며, 각 미션 제목 옆에는 [ ] 모양의 체크박스가 있습니다.
+    - **중요:** 사용자가 미션을 완수했다고 판단되면, 응답의 마지막에 반드시 **`[MISSION_COMPLETE]`** 태그를 붙여주세요.
+    - 시스템이 이 태그를 감지하여 **자동으로 미션을 완료 처리**하고 체크박스를 채워줍니다.
+    - 따라서 사용자에게는 "미션을 완료하셨군요! 체크박스는 제가 처리해 드렸습니다."와 같이 안내하세요.
+
+    [학습 진행 및 검증 가이드라인 (이원화)]
+    학습 주제의 성격에 따라 검증 방식을 다르게 적용하세요.
+
+    1. **실습형 미션 (결과물 생성)**
+       - 사용자가 "완료했다"고 하면, 바로 넘어가지 말고 **증거**를 확인하세요.
+       - 예: "작성한 결과물을 보여주시겠어요?", "어떻게 구현했는지 설명해 주시겠어요?" (이미지 업로드 가능)
+       - 결과가 올바르면 칭찬과 함께 "완료 처리해 드릴게요"라고 안내하고, 응답의 마지막에 반드시 **`[MISSION_COMPLETE]`** 태그를 붙여주세요.
+
+    2. **지식/이론형 미션 (개념 이해)**
+       - 사용자가 이해했다고 하면, **퀴즈 세션**을 제안하고 시작하세요.
+       - **규칙:** 총 3~5문제를 출제하되, **반드시 한 번에 한 문제씩** 내세요.
+       - 각 문제에 대해 정답/오답 및 해설을 즉시 제공하세요.
+       - **통과 기준:** 퀴즈를 모두 통과해야 합니다.
+       - **성공 시:** "축하합니다! 완벽하게 이해하셨네요. 미션을 완료 처리해 드리겠습니다."라고 안내하고, 응답의 마지막에 반드시 **`[MISSION_COMPLETE]`** 태그를 붙여주세요.
+
+    [대화 스타일]
+    - 항상 한국어 '해요체'를 사용하세요. (친근하지만 정중하게)
+    - 답변은 5-7문장 내외로 간결하게 유지하여 가독성을 높이세요.
+    - 설명이 끝날 때마다 "준비되셨으면 다음으로 넘어갈까요?" 또는 "궁금한 점이 있으신가요?"와 같이 사용자의 반응을 유도하는 질문을 하세요.
+    """
+    return system_instruction
+
+# 원격 컨텍스트 캐시는 로컬 항목보다 이만큼 더 오래 유지합니다.
+# 로컬 TTL 직전에 꺼내 간 모델로 보내는 요청(긴 스트리밍 응답 포함)이 원격 캐시 만료로 실패하지 않게 합니다.
+CONTEXT_CACHE_TTL_MARGIN_SECONDS = 600
+
+class LocalContextCache:
+    """
+    Gemini 컨텍스트 캐싱을 사용하지 않는 기본 구현입니다. (테스트/로컬용 대체 구현)
+    시스템 프롬프트를 모델 객체에 그대로 담습니다.
+    """
+    def create_model(self, model_name: str, system_instruction: str, generation_config: dict) -> Tuple["GenerativeModel", Optional[object]]:
+        """
+        (모델, 원격 캐시 핸들)을 반환합니다. 원격 캐시를 만들지 않았으면 핸들은 None입니다.
+        """
+        genai = get_genai()
+        model = genai.GenerativeModel(
+            model_name,
+            system_instruction=system_instruction,
+            generation_config=genai.types.GenerationConfig(**generation_config)
+        )
+        return model, None
+
+    def release(self, cached_content: object):
+        """더 이상 쓰지 않는 원격 캐시를 삭제합니다."""
+
+class GeminiContextCache(LocalContextCache):
+    """
+    고정된 페르소나 프롬프트를 Gemini 컨텍스트 캐시(CachedContent)에 올려,
+    매 턴 반복되는 시스템 프롬프트가 입력 토큰으로 다시 과금되지 않게 합니다.
+    캐시 생성에 실패하면 (예: 최소 토큰 수 미달) 일반 모델로 대체합니다.
+    """
+    def __init__(self, ttl_seconds: int):
+        self.ttl = timedelta(seconds=ttl_seconds + CONTEXT_CACHE_TTL_MARGIN_SECONDS)
+
+    def create_model(self, model_name: str, system_instruction: str, generation_config: dict) -> Tuple["GenerativeModel", Optional[object]]:
+        try:
+            genai = get_genai()
+            from google.generativeai import caching
+
+            cached_content = caching.CachedContent.create(
+                model=f"models/{model_name}",
+                display_name="grow-coach-persona",
+                system_instruction=system_instruction,
+                ttl=self.ttl,
+            )
+            model = genai.GenerativeModel.from_cached_content(
+                cached_content,
+                generation_config=genai.types.GenerationConfig(**generation_config)
+            )
+            return model, cached_content
+        except Exception as e:
+            logger.warning(f"Gemini context caching unavailable, falling back to inline system prompt: {e}")
+            return super().create_model(model_name, system_instruction, generation_config)
+
+    def release(self, cached_content: object):
+        try:
+            cached_content.delete()
+            logger.info(f"Deleted Gemini context cache: {getattr(cached_content, 'name', '')}")
+        except Exception as e:
+            logger.error(f"Failed to delete Gemini context cache: {e}")
+
+ModelKey = Tuple[str, str, str, Tuple]
+
+@dataclass
+class _ModelEntry:
+    created_at: float
+    model: "GenerativeModel"
+    cached_content: Optional[object]
+    # 이 모델을 사용한 로드맵 ID (로드맵별 무효화용)
+    roadmap_ids: Set[int] = field(default_factory=set)
+    # 모델을 사용 중인 요청 수와 캐시에서 빠졌는지 여부 (빠진 뒤 마지막 요청이 끝나면 원격 캐시 삭제)
+    users: int = 0
+    retired: bool = False
+
+class ModelLease:
+    """
+    캐시된 모델의 사용권입니다. 요청이 모델을 다 쓰면 release()를 호출합니다. (여러 번 호출해도 안전)
+    """
+    def __init__(self, cache: "ModelCache", entry: _ModelEntry):
+        self.model = entry.model
+        self._cache = cache
+        self._entry = entry
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._cache._release_lease(self._entry)
+
+class ModelCache:
+    """
+    (목표, 수준, 모델명, 생성 설정)을 키로 준비된 GenerativeModel 객체를 보관하는 LRU + TTL 캐시입니다.
+    GenerativeModel은 상태가 없으므로 여러 요청이 공유하고, 요청마다 start_chat()으로 세션만 새로 만듭니다.
+    요청은 acquire()로 사용권을 받아 모델을 쓰고, 캐시에서 빠진 항목(LRU, 만료, 무효화)의 원격 컨텍스트 캐시는
+    그 항목을 쓰던 마지막 요청이 사용권을 반납할 때 삭제합니다.
+    """
+    def __init__(self, maxsize: int, ttl_seconds: int, context_cache: LocalContextCache):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.context_cache = context_cache
+        self._entries: "OrderedDict[ModelKey, _ModelEntry]" = OrderedDict()
+        # 캐시에 남아 있는 항목의 로드맵만 기록하므로 항목 수와 함께 제한됩니다.
+        self._keys_by_roadmap: Dict[int, ModelKey] = {}
+        self._lock = threading.Lock()
+
+    def _track_roadmap(self, roadmap_id: Optional[int], key: ModelKey, entry: _ModelEntry):
+        if roadmap_id is None:
+            return
+        previous = self._keys_by_roadmap.get(roadmap_id)
+        if previous is not None and previous != key:
+            previous_entry = self._entries.get(previous)
+            if previous_entry:
+                previous_entry.roadmap_ids.discard(roadmap_id)
+        self._keys_by_roadmap[roadmap_id] = key
+        entry.roadmap_ids.add(roadmap_id)
+
+    def _retire(self, key: ModelKey) -> Optional[_ModelEntry]:
+        """
+        항목을 캐시에서 빼고, 사용 중인 요청이 없으면 원격 캐시를 삭제할 항목으로 반환합니다. (잠금 안에서 호출)
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        for roadmap_id in entry.roadmap_ids:
+            if self._keys_by_roadmap.get(roadmap_id) == key:
+                del self._keys_by_roadmap[roadmap_id]
+        entry.retired = True
+        return entry if entry.users == 0 else None
+
+    def _delete_remote(self, entries: List[Optional[_ModelEntry]]):
+        # 원격 삭제는 네트워크 호출이므로 잠금/요청(또는 DB flush) 밖의 스레드에서 수행합니다.
+        # 원격 TTL이 이미 지난 캐시는 삭제할 필요가 없습니다.
+        now = time.monotonic()
+        remote_ttl = self.ttl_seconds + CONTEXT_CACHE_TTL_MARGIN_SECONDS
+        resources = [
+            entry.cached_content for entry in entries
+            if entry is not None and entry.cached_content is not None and now - entry.created_at < remote_ttl
+        ]
+        if resources:
+            threading.Thread(
+                target=lambda: [self.context_cache.release(r) for r in resources], daemon=True
+            ).start()
+
+    def _release_lease(self, entry: _ModelEntry):
+        with self._lock:
+            entry.users -= 1
+            unused = entry.retired and entry.users == 0
+        if unused:
+            self._delete_remote([entry])
+
+    def _lease(self, roadmap_id: Optional[int], key: ModelKey, entry: _ModelEntry) -> ModelLease:
+        # 잠금 안에서 호출
+        self._entries.move_to_end(key)
+        self._track_roadmap(roadmap_id, key, entry)
+        entry.users += 1
+        return ModelLease(self, entry)
+
+    def acquire(self, roadmap_id: Optional[int], goal: str, level: str,
+                model_name: str = CHAT_MODEL_NAME, generation_config: Optional[dict] = None) -> ModelLease:
+        config = generation_config or CHAT_GENERATION_CONFIG
+        key: ModelKey = (goal, level, model_name, tuple(sorted(config.items())))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.monotonic() - entry.created_at < self.ttl_seconds:
+                return self._lease(roadmap_id, key, entry)
+
+        # 모델 생성(컨텍스트 캐시 생성 포함)은 잠금 밖에서 수행합니다.
+        # 로컬 TTL은 생성 요청 전 시각부터 재므로 원격 캐시보다 먼저 만료됩니다.
+        created_at = time.monotonic()
+        model, cached_content = self.context_cache.create_model(model_name, build_system_instruction(goal, level), config)
+
+        entry = _ModelEntry(created_at, model, cached_content)
+        unused = []
+        with self._lock:
+            current = self._entries.get(key)
+            if current and time.monotonic() - current.created_at < self.ttl_seconds:
+                # 다른 요청이 동시에 먼저 만든 모델을 사용하고, 방금 만든 것은 버립니다.
+                lease = self._lease(roadmap_id, key, current)
+                unused.append(entry)
+            else:
+                if current:
+                    # 만료된 항목의 로드맵 기록은 새 항목으로 옮깁니다.
+                    roadmap_ids = set(current.roadmap_ids)
+                    unused.append(self._retire(key))
+                    for rid in roadmap_ids:
+                        self._track_roadmap(rid, key, entry)
+                self._entries[key] = entry
+                lease = self._lease(roadmap_id, key, entry)
+                while len(self._entries) > self.maxsize:
+                    unused.append(self._retire(next(iter(self._entries))))
+        self._delete_remote(unused)
+        return lease
+
+    def invalidate_roadmap(self, roadmap_id: int):
+        """
+        로드맵의 목표/수준이 바뀌거나 삭제되었을 때 호출합니다.
+        같은 페르소나를 다른 로드맵도 쓰고 있을 수 있으므로, 이 로드맵의 기록만 지우고
+        더 이상 쓰는 로드맵이 없는 항목만 캐시에서 뺍니다.
+        """
+        unused = None
+        with self._lock:
+            key = self._keys_by_roadmap.pop(roadmap_id, None)
+            entry = self._entries.get(key) if key is not None else None
+            if entry:
+                entry.roadmap_ids.discard(roadmap_id)
+                if not entry.roadmap_ids:
+                    unused = self._retire(key)
+        self._delete_remote([unused])
+
+    def clear(self):
+        with self._lock:
+            unused = [self._retire(key) for key in list(self._entries)]
+        self._delete_remote(unused)
+
+model_cache = ModelCache(
+    maxsize=settings.MODEL_CACHE_SIZE,
+    ttl_seconds=settings.MODEL_CACHE_TTL_SECONDS,
+    context_cache=(
+        GeminiContextCache(settings.MODEL_CACHE_TTL_SECONDS)
+        if settings.GEMINI_CONTEXT_CACHE
+        else LocalContextCache()
+    ),
+)
+
+def acquire_coach_model(roadmap: models.Roadmap) -> ModelLease:
+    """
+    로드맵의 코치 페르소나가 적용된 GenerativeModel의 사용권을 캐시에서 가져옵니다.
+    요청이 끝나면 (스트리밍이면 스트림이 끝난 뒤) release()를 호출해야 합니다.
+    """
+    return model_cache.acquire(roadmap.id, roadmap.goal, roadmap.level)
+
+@event.listens_for(models.Roadmap, "after_update")
+def _invalidate_on_roadmap_update(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.goal.history.has_changes() or state.attrs.level.history.has_changes():
+        model_cache.invalidate_roadmap(target.id)
+
+@event.listens_for(models.Roadmap, "after_delete")
+def _invalidate_on_roadmap_delete(mapper, connection, target):
+    model_cache.invalidate_roadmap(target.id)
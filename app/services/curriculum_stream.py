@@ -0,0 +1,128 @@
+import json
+import logging
+from typing import List, Optional
+from pydantic import ValidationError
+from app.schemas.plan import WeekPlan
+
+logger = logging.getLogger(__name__)
+
+class _Frame:
+    __slots__ = ("kind", "key", "expect_key", "current_key")
+
+    def __init__(self, kind: str, key: Optional[str]):
+        self.kind = kind  # "object" or "array"
+        self.key = key  # 부모 객체에서 이 컨테이너를 가리키는 키
+        self.expect_key = kind == "object"
+        self.current_key: Optional[str] = None
+
+class CurriculumStreamParser:
+    """
+    Gemini 스트림 청크를 받아 로드맵 JSON을 점진적으로 파싱합니다.
+
+    `{"project_title": ..., "curriculum": [{week}, {week}, ...]}` 구조에서
+    curriculum 배열의 각 주차 객체가 닫히는 즉시 WeekPlan으로 검증하여 반환하므로,
+    전체 응답을 기다리지 않고 주차별로 처리할 수 있고, 응답 끝부분이 잘려도 완성된 주차는 살릴 수 있습니다.
+    마크다운 코드 블록 등 첫 '{' 이전의 텍스트와 최상위 객체가 닫힌 이후의 텍스트는 무시합니다.
+    """
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._stack: List[_Frame] = []
+        self._started = False
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._week_start: Optional[int] = None
+        self.project_title: Optional[str] = None
+        self.weeks: List[dict] = []
+        self.complete = False
+
+    @property
+    def truncated(self) -> bool:
+        """최상위 객체가 닫히기 전에 스트림이 끝났는지 여부"""
+        return not self.complete
+
+    def feed(self, chunk: str) -> List[dict]:
+        """
+        청크를 추가로 읽고, 이번 청크에서 새로 완성된 주차(WeekPlan dict) 목록을 반환합니다.
+        """
+        completed = []
+        if self.complete:
+            return completed
+
+        self._text += chunk
+        text = self._text
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._stack.append(_Frame("object", None))
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._on_string(json.loads(text[self._string_start:i + 1]))
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch in "{[":
+                parent = self._stack[-1]
+                key = parent.current_key if parent.kind == "object" else parent.key
+                if ch == "{" and self._is_curriculum_array(parent, depth=len(self._stack)):
+                    self._week_start = i
+                self._stack.append(_Frame("object" if ch == "{" else "array", key))
+            elif ch in "}]":
+                self._stack.pop()
+                if ch == "}" and self._week_start is not None and len(self._stack) == 2:
+                    week = self._parse_week(text[self._week_start:i + 1])
+                    self._week_start = None
+                    if week:
+                        self.weeks.append(week)
+                        completed.append(week)
+                if not self._stack:
+                    self.complete = True
+                    break
+            elif ch == ":":
+                self._stack[-1].expect_key = False
+            elif ch == ",":
+                top = self._stack[-1]
+                if top.kind == "object":
+                    top.expect_key = True
+
+        self._pos = len(text)
+        return completed
+
+    def result(self) -> dict:
+        """
+        지금까지 파싱된 로드맵을 반환합니다. (잘린 경우 완성된 주차까지만 포함)
+        """
+        return {"project_title": self.project_title or "", "curriculum": list(self.weeks)}
+
+    def _on_string(self, value: str):
+        top = self._stack[-1]
+        if top.kind == "object" and top.expect_key:
+            top.current_key = value
+        elif len(self._stack) == 1 and top.current_key == "project_title":
+            self.project_title = value
+
+    @staticmethod
+    def _is_curriculum_array(frame: _Frame, depth: int) -> bool:
+        # 최상위 객체(깊이 1) 바로 아래의 "curriculum" 배열(깊이 2)
+        return depth == 2 and frame.kind == "array" and frame.key == "curriculum"
+
+    @staticmethod
+    def _parse_week(raw: str) -> Optional[dict]:
+        try:
+            return WeekPlan.model_validate(json.loads(raw)).model_dump()
+        except (json.JSONDecodeError, ValidationError) as e:
+            logger.warning(f"Skipping malformed week in curriculum stream: {e}")
+            return None
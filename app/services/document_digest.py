@@ -0,0 +1,183 @@
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from app.core.config import settings
+from app.services.upload_cache import ReferenceFile
+
+logger = logging.getLogger(__name__)
+
+# 텍스트로 직접 읽을 수 있는 자료
+TEXT_MIME_TYPES = {"text/plain", "text/markdown", "text/x-markdown", "text/csv"}
+TEXT_EXTENSIONS = (".txt", ".md", ".markdown", ".rst", ".csv")
+
+# 이보다 추출된 텍스트가 적으면 (예: 스캔 PDF) 원본 업로드로 대체합니다.
+MIN_EXTRACTED_CHARS = 500
+# 페이지/섹션별 발췌 길이
+EXCERPT_CHARS = 240
+
+# 목차 제목처럼 보이는 줄: "Chapter 3 ...", "제3장 ...", "1.2 ...", "Part II ...", "# ..."
+_HEADING_PATTERN = re.compile(
+    r"^(?:#{1,4}\s+\S.*"
+    r"|(?:chapter|part|section|unit|lesson)\s+[\dIVXLC]+\b.*"
+    r"|제\s*\d+\s*[장절편부]\b.*"
+    r"|\d+(?:\.\d+){0,2}\.?\s+[^\d\s].{2,})$",
+    re.IGNORECASE,
+)
+_MAX_HEADING_CHARS = 90
+
+def _is_text_document(reference: ReferenceFile) -> bool:
+    return (
+        reference.mime_type.split(";")[0] in TEXT_MIME_TYPES
+        or reference.display_name.lower().endswith(TEXT_EXTENSIONS)
+    )
+
+def _is_pdf(reference: ReferenceFile) -> bool:
+    return reference.mime_type == "application/pdf" or reference.display_name.lower().endswith(".pdf")
+
+def _find_headings(text: str) -> List[str]:
+    headings = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and len(line) <= _MAX_HEADING_CHARS and _HEADING_PATTERN.match(line):
+            headings.append(line.lstrip("#").strip())
+    return headings
+
+def _excerpt(text: str) -> str:
+    text = re.sub(r"\s+", " ", text).strip()
+    return text[:EXCERPT_CHARS] + ("…" if len(text) > EXCERPT_CHARS else "")
+
+def _flatten_outline(reader, outline, depth: int = 0) -> List[Tuple[int, str, Optional[int]]]:
+    items = []
+    for entry in outline:
+        if isinstance(entry, list):
+            items.extend(_flatten_outline(reader, entry, depth + 1))
+            continue
+        try:
+            page_number = reader.get_destination_page_number(entry) + 1
+        except Exception:
+            page_number = None
+        items.append((depth, str(entry.title).strip(), page_number))
+    return items
+
+def _read_pdf(reference: ReferenceFile) -> Optional[Tuple[List[str], List[Tuple[str, str]], int]]:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        logger.info("pypdf is not installed; sending the original PDF instead of a digest")
+        return None
+
+    reference.fileobj.seek(0)
+    reader = PdfReader(reference.fileobj)
+    if reader.is_encrypted:
+        return None
+
+    outline = []
+    try:
+        for depth, title, page_number in _flatten_outline(reader, reader.outline):
+            page = f" (p.{page_number})" if page_number else ""
+            outline.append(f"{'  ' * depth}- {title}{page}")
+    except Exception as e:
+        logger.warning(f"Failed to read PDF outline: {e}")
+
+    pages = []
+    for index, page in enumerate(reader.pages[:settings.DOCUMENT_DIGEST_MAX_PAGES]):
+        pages.append((f"p.{index + 1}", page.extract_text() or ""))
+    return outline, pages, len(reader.pages)
+
+def _read_text(reference: ReferenceFile) -> Tuple[List[str], List[Tuple[str, str]], int]:
+    reference.fileobj.seek(0)
+    text = reference.fileobj.read().decode("utf-8", errors="replace")
+    # 빈 줄 기준 단락을 하나의 "페이지"로 취급합니다.
+    sections = [s for s in re.split(r"\n\s*\n", text) if s.strip()]
+    return [], [(f"§{i + 1}", s) for i, s in enumerate(sections)], len(sections)
+
+def _compose_digest(name: str, outline: List[str], pages: List[Tuple[str, str]], total_pages: int) -> Optional[str]:
+    if sum(len(text) for _, text in pages) < MIN_EXTRACTED_CHARS and not outline:
+        return None
+
+    budget = settings.DOCUMENT_DIGEST_MAX_CHARS
+    parts = [f"[Document] {name} ({total_pages} pages/sections)"]
+
+    def add(line: str) -> bool:
+        nonlocal budget
+        if len(line) + 1 > budget:
+            return False
+        parts.append(line)
+        budget -= len(line) + 1
+        return True
+
+    if outline:
+        add("[Outline]")
+        for line in outline:
+            if not add(line):
+                break
+
+    headings = [(label, h) for label, text in pages for h in _find_headings(text)]
+    if headings and not outline:
+        add("[Headings]")
+        for label, heading in headings:
+            if not add(f"- {heading} ({label})"):
+                break
+
+    # 남은 예산으로 페이지/섹션 발췌를 고르게 추가합니다.
+    non_empty = [(label, text) for label, text in pages if text.strip()]
+    if non_empty and budget > EXCERPT_CHARS:
+        add("[Excerpts]")
+        step = max(1, len(non_empty) // max(1, budget // (EXCERPT_CHARS + 16)))
+        for label, text in non_empty[::step]:
+            if not add(f"{label}: {_excerpt(text)}"):
+                break
+
+    return "\n".join(parts)
+
+def build_document_digest(reference: ReferenceFile) -> Optional[str]:
+    """
+    참고 자료에서 목차/제목/발췌로 이루어진 크기 제한 요약 텍스트를 만듭니다.
+    지원하지 않는 형식이거나 텍스트를 거의 추출하지 못하면 None을 반환합니다. (원본 업로드로 대체)
+    """
+    try:
+        if _is_pdf(reference):
+            extracted = _read_pdf(reference)
+        elif _is_text_document(reference):
+            extracted = _read_text(reference)
+        else:
+            extracted = None
+    except Exception as e:
+        logger.warning(f"Failed to extract document digest from {reference.display_name}: {e}")
+        extracted = None
+    finally:
+        reference.fileobj.seek(0)
+
+    if not extracted:
+        return None
+    outline, pages, total_pages = extracted
+    return _compose_digest(reference.display_name, outline, pages, total_pages)
+
+class DocumentDigestCache:
+    """
+    내용 해시(SHA-256) → 문서 요약 LRU 캐시입니다. 추출 실패(None)도 캐시하여 다시 시도하지 않습니다.
+    """
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_digest(self, reference: ReferenceFile) -> Optional[str]:
+        """
+        (블로킹) 캐시된 요약을 반환하거나 새로 추출합니다. run_upload 등 스레드에서 호출하세요.
+        """
+        with self._lock:
+            if reference.sha256 in self._entries:
+                self._entries.move_to_end(reference.sha256)
+                return self._entries[reference.sha256]
+
+        digest = build_document_digest(reference)
+        with self._lock:
+            self._entries[reference.sha256] = digest
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return digest
+
+document_digest_cache = DocumentDigestCache(maxsize=settings.DOCUMENT_DIGEST_CACHE_SIZE)
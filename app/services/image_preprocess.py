@@ -0,0 +1,150 @@
+import io
+import logging
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+# Pillow 출력 포맷 → Gemini에 전달할 MIME 타입
+_OUTPUT_MIME_TYPES = {"WEBP": "image/webp", "JPEG": "image/jpeg", "PNG": "image/png"}
+
+class ImageTooLargeError(ValueError):
+    """업로드 크기 또는 픽셀 수가 허용 한도를 넘는 경우"""
+
+class InvalidImageError(ValueError):
+    """이미지로 해석할 수 없는 데이터인 경우"""
+
+@dataclass
+class PreparedImage:
+    """
+    비전 모델에 보낼 준비가 끝난 이미지입니다. (해상도 제한, 메타데이터 제거, 재인코딩 완료)
+    """
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+    original_size: int
+
+    def as_part(self) -> dict:
+        return {"mime_type": self.mime_type, "data": self.data}
+
+@dataclass
+class DecodedImage:
+    """
+    디코딩과 해상도 제한까지 끝난 이미지입니다. 리뷰 캐시 조회 후 필요할 때만 재인코딩합니다.
+    """
+    raw: bytes
+    mime_type: str
+    image: Any = None  # PIL.Image.Image (Pillow가 없으면 None)
+    # 리뷰 캐시용 dHash (Pillow가 없으면 None)
+    perceptual_hash: Optional[int] = None
+
+def read_limited(source: BinaryIO, max_bytes: int) -> bytes:
+    """
+    업로드 스트림을 최대 max_bytes까지만 읽습니다. 한도를 넘으면 ImageTooLargeError를 발생시킵니다.
+    """
+    buffer = io.BytesIO()
+    while True:
+        chunk = source.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        if buffer.tell() + len(chunk) > max_bytes:
+            raise ImageTooLargeError(f"Image exceeds {max_bytes} bytes.")
+        buffer.write(chunk)
+    return buffer.getvalue()
+
+def difference_hash(image, hash_size: int) -> int:
+    """
+    dHash: 흑백 (hash_size+1)x(hash_size) 크기로 줄인 뒤 가로로 이웃한 픽셀의 밝기 비교 결과를 비트로 모읍니다.
+    재인코딩, 약간의 크기/밝기 변화에는 비트가 거의 바뀌지 않아 유사 이미지 판별에 사용합니다.
+    """
+    from PIL import Image
+
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+    pixels = small.tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+def decode_review_image(raw: bytes, mime_type: str) -> DecodedImage:
+    """
+    (블로킹) 이미지를 디코딩하여 긴 변을 REVIEW_IMAGE_MAX_SIDE 이하로 줄이고 perceptual hash를 계산합니다.
+    Pillow가 설치되어 있지 않으면 디코딩하지 않습니다. (원본 그대로 전송, 캐시 미사용)
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        logger.info("Pillow is not installed; sending the original image without preprocessing")
+        return DecodedImage(raw=raw, mime_type=mime_type)
+
+    max_side = settings.REVIEW_IMAGE_MAX_SIDE
+    try:
+        image = Image.open(io.BytesIO(raw))
+        # JPEG는 디코딩 단계에서 1/2, 1/4, 1/8로 축소하여 메모리 사용량을 줄입니다. (헤더의 크기도 축소된 값으로 바뀜)
+        if image.format == "JPEG":
+            image.draft("RGB", (max_side, max_side))
+        # 헤더만 읽은 상태에서 실제로 디코딩할 픽셀 수를 확인하여 디컴프레션 폭탄을 막습니다.
+        if image.width * image.height > settings.REVIEW_IMAGE_MAX_PIXELS:
+            raise ImageTooLargeError(f"Image has too many pixels ({image.width}x{image.height}).")
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    except ImageTooLargeError:
+        raise
+    except Image.DecompressionBombError as e:
+        # Pillow 자체 한도(MAX_IMAGE_PIXELS)를 넘는 헤더
+        raise ImageTooLargeError(str(e)) from e
+    except Exception as e:
+        raise InvalidImageError(f"Invalid image data: {e}") from e
+
+    return DecodedImage(
+        raw=raw,
+        mime_type=mime_type,
+        image=image,
+        perceptual_hash=difference_hash(image, settings.REVIEW_CACHE_HASH_SIZE),
+    )
+
+def encode_review_image(decoded: DecodedImage) -> PreparedImage:
+    """
+    (블로킹) 디코딩된 이미지를 EXIF 등 메타데이터 없이 작은 포맷(기본 WebP)으로 재인코딩합니다.
+    """
+    image = decoded.image
+    if image is None:
+        return PreparedImage(
+            data=decoded.raw, mime_type=decoded.mime_type, width=0, height=0, original_size=len(decoded.raw)
+        )
+
+    output_format = settings.REVIEW_IMAGE_FORMAT
+    has_alpha = "A" in image.getbands() or "transparency" in image.info
+    if output_format == "JPEG" or not has_alpha:
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+    elif image.mode != "RGBA":
+        image = image.convert("RGBA")
+
+    # 메타데이터(EXIF, ICC 등)를 넘기지 않고 저장하면 픽셀 데이터만 남습니다.
+    output = io.BytesIO()
+    image.save(output, format=output_format, quality=settings.REVIEW_IMAGE_QUALITY, optimize=True)
+    prepared = PreparedImage(
+        data=output.getvalue(),
+        mime_type=_OUTPUT_MIME_TYPES[output_format],
+        width=image.width,
+        height=image.height,
+        original_size=len(decoded.raw),
+    )
+    logger.info(
+        f"Review image prepared: {len(decoded.raw)} -> {len(prepared.data)} bytes "
+        f"({prepared.width}x{prepared.height} {output_format})"
+    )
+    return prepared
+
+def prepare_review_image(raw: bytes, mime_type: str) -> PreparedImage:
+    """
+    (블로킹) 디코딩 → 해상도 제한 → 메타데이터 제거 → 재인코딩을 한 번에 수행합니다.
+    """
+    return encode_review_image(decode_review_image(raw, mime_type))
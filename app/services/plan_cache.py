@@ -0,0 +1,106 @@
+import copy
+import hashlib
+import json
+import re
+import unicodedata
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app import models
+
+# 학습 빈도 표현의 동의어 → 정규화된 값
+_DAILY_PATTERN = re.compile(r"매일|평일|every\s*day|daily|weekdays?")
+_RANGE_PER_WEEK_PATTERN = re.compile(r"(\d+)\s*[~\-]\s*(\d+)\s*(?:회|일|times|days?)")
+_COUNT_PER_WEEK_PATTERNS = [
+    re.compile(r"주\s*(\d+)\s*(?:회|일|번)"),
+    re.compile(r"(\d+)\s*(?:x|times|days?)\s*(?:a|per|/)\s*week"),
+]
+_WEEKEND_PATTERN = re.compile(r"주말|weekends?")
+
+_LEVEL_SYNONYMS = {
+    "초급": "beginner", "입문": "beginner", "beginner": "beginner", "novice": "beginner",
+    "중급": "intermediate", "intermediate": "intermediate",
+    "고급": "advanced", "advanced": "advanced", "expert": "advanced",
+}
+
+def normalize_text(value: str) -> str:
+    """
+    유니코드 정규화(NFKC), 대소문자 통일, 연속 공백 축약, 끝 문장부호 제거를 적용합니다.
+    """
+    value = unicodedata.normalize("NFKC", value or "").casefold()
+    value = re.sub(r"\s+", " ", value).strip()
+    return value.rstrip(".!?。 ")
+
+def normalize_level(level: str) -> str:
+    value = normalize_text(level)
+    return _LEVEL_SYNONYMS.get(value, value)
+
+def normalize_frequency(frequency: str) -> str:
+    """
+    "매일 (월~금, 5일)", "Everyday", "daily"처럼 같은 뜻의 빈도 표현을 하나의 값으로 맞춥니다.
+    """
+    value = normalize_text(frequency)
+    if _DAILY_PATTERN.search(value):
+        return "daily"
+    match = _RANGE_PER_WEEK_PATTERN.search(value)
+    if match:
+        return f"{match.group(1)}-{match.group(2)}_per_week"
+    for pattern in _COUNT_PER_WEEK_PATTERNS:
+        match = pattern.search(value)
+        if match:
+            return f"{match.group(1)}_per_week"
+    if _WEEKEND_PATTERN.search(value):
+        return "weekends"
+    return value
+
+def make_cache_key(goal: str, level: str, duration: int, frequency: str, file_sha256: Optional[str]) -> str:
+    normalized = [
+        normalize_text(goal),
+        normalize_level(level),
+        int(duration),
+        normalize_frequency(frequency),
+        file_sha256 or "",
+    ]
+    return hashlib.sha256(json.dumps(normalized, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def _is_fresh(created_at: Optional[datetime]) -> bool:
+    if created_at is None:
+        return False
+    if created_at.tzinfo is None:
+        # SQLite는 타임존 없이 UTC 시각을 저장합니다.
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return datetime.now(timezone.utc) - created_at < timedelta(seconds=settings.PLAN_CACHE_TTL_SECONDS)
+
+def lookup_cached_plan(db: Session, cache_key: str) -> Optional[dict]:
+    """
+    유효 기간 내에 생성된 동일 요청의 커리큘럼이 있으면 복사본을 반환합니다.
+    """
+    entry = db.query(models.PlanCache).filter(models.PlanCache.cache_key == cache_key).first()
+    if not entry or not _is_fresh(entry.created_at):
+        return None
+
+    entry.hit_count = (entry.hit_count or 0) + 1
+    db.commit()
+    return json.loads(entry.payload)
+
+def store_cached_plan(db: Session, cache_key: str, roadmap_data: dict):
+    """
+    생성된 커리큘럼을 캐시에 저장합니다. 진행 상태(is_completed)와 ID는 제외합니다.
+    """
+    payload = {
+        "project_title": roadmap_data["project_title"],
+        "curriculum": copy.deepcopy(roadmap_data["curriculum"]),
+    }
+    for week_plan in payload["curriculum"]:
+        for mission in week_plan["missions"]:
+            mission["is_completed"] = False
+
+    entry = db.query(models.PlanCache).filter(models.PlanCache.cache_key == cache_key).first()
+    if not entry:
+        entry = models.PlanCache(cache_key=cache_key)
+        db.add(entry)
+    entry.payload = json.dumps(payload, ensure_ascii=False)
+    entry.created_at = datetime.now(timezone.utc)
+    entry.hit_count = 0
+    db.commit()
@@ -0,0 +1,254 @@
+import json
+import logging
+import os
+import re
+import shutil
+from typing import Awaitable, BinaryIO, Callable, Optional
+from app.core.config import settings
+from app.core.database import run_in_session
+from app.core.executor import run_db, run_llm, run_upload, iterate_llm_stream
+from app.core.llm import load_genai
+from app.core.metrics import record_llm_usage, span
+from app.services.curriculum_stream import CurriculumStreamParser
+from app.services.document_digest import document_digest_cache
+from app.services.plan_cache import lookup_cached_plan, make_cache_key, store_cached_plan
+from app.services.upload_cache import ReferenceFile, delete_remote_file, upload_cache, upload_reference
+
+logger = logging.getLogger(__name__)
+
+# 진행 단계 콜백 (예: "uploading", "generating", "parsing")
+StageCallback = Callable[[str], Awaitable[None]]
+# 주차 완성 콜백 (완성된 WeekPlan dict, 지금까지 파싱된 project_title)
+WeekCallback = Callable[[dict, Optional[str]], Awaitable[None]]
+
+class PlanParseError(ValueError):
+    """AI 응답을 로드맵 JSON으로 해석하지 못한 경우"""
+
+class _WeekCallbackError(Exception):
+    """on_week 콜백(주차 저장 등)의 오류. 스트림 중단으로 보고 살리지 않도록 원래 오류를 그대로 전파합니다."""
+
+def safe_upload_filename(filename: Optional[str]) -> str:
+    """
+    업로드 파일명을 안전한 파일명으로 변환합니다. (path traversal 공격 방지)
+    """
+    # os.path.basename()을 사용하여 파일명만 추출하고 경로 제거
+    safe_filename = os.path.basename(filename) if filename else "uploaded_file"
+    # 추가 보안: 특수 문자 제거 및 유효한 파일명으로 변환
+    safe_filename = re.sub(r'[^a-zA-Z0-9._-]', '_', safe_filename)
+    # 파일명이 비어있거나 너무 긴 경우 처리
+    if not safe_filename or len(safe_filename) > 255:
+        safe_filename = "uploaded_file"
+    return safe_filename
+
+def save_upload(source: BinaryIO, path: str):
+    with open(path, "wb") as buffer:
+        shutil.copyfileobj(source, buffer)
+
+def build_plan_prompt(
+    goal: str,
+    level: str,
+    duration: int,
+    frequency: str,
+    has_file: bool,
+    reference_digest: Optional[str] = None,
+) -> str:
+    # 기본 프롬프트 구성
+    base_instruction = f"""
+        You are an expert study coach. Create a structured study roadmap based on the user's request.
+
+        [User Information]
+        - Goal: {goal}
+        - Level: {level}
+        - Duration: {duration} weeks
+        - Frequency: {frequency}
+        """
+
+    # 프롬프트에 파일 참조 지시 추가
+    file_instruction = ""
+    if reference_digest:
+        file_instruction = f"""
+            [Reference Material]
+            - The user provided a reference document. Its outline, headings and short excerpts were extracted below.
+            - **CRITICAL:** You MUST strictly base the curriculum on this material (Table of Contents, key concepts).
+            - Ensure the roadmap covers the key topics found in the document within the given duration.
+
+            [Reference Digest]
+            {reference_digest}
+            """
+    elif has_file:
+        file_instruction = """
+            [Reference Material]
+            - A file has been uploaded by the user.
+            - **CRITICAL:** You MUST analyze the uploaded file (Table of Contents, key concepts) and strictly base the curriculum on this material.
+            - Ensure the roadmap covers the key topics found in the file within the given duration.
+            """
+
+    # 공통 프롬프트 (출력 형식 등)
+    common_instruction = f"""
+        [Instructions]
+        1. Create a week-by-week plan for exactly {duration} weeks.
+        2. Each week should have a 'theme' and specific 'missions'.
+        3. The number and difficulty of missions MUST be adjusted based on the 'Frequency' ({frequency}).
+           - If frequency is high (e.g., "Everyday"), provide more detailed and numerous missions (3-5 missions/week).
+           - If frequency is low (e.g., "Weekends only"), provide fewer, focused missions (1-2 missions/week).
+        4. Mission 'id' format: 'w{{week}}_m{{number}}' (e.g., w1_m1).
+        5. Response MUST be valid JSON only. No markdown blocks.
+
+        [JSON Structure Example]
+        {{
+          "project_title": "Mastering Python in 4 Weeks",
+          "curriculum": [
+            {{
+              "week": 1,
+              "theme": "Python Basics",
+              "missions": [
+                {{ "id": "w1_m1", "title": "Install Python & IDE", "is_completed": false }},
+                {{ "id": "w1_m2", "title": "Variables & Data Types", "is_completed": false }}
+              ]
+            }}
+          ]
+        }}
+        """
+
+    return base_instruction + file_instruction + common_instruction
+
+def parse_roadmap_response(response_text: str) -> dict:
+    # 안전한 파싱을 위한 정제 (Markdown 코드 블록 제거)
+    cleaned_text = re.sub(r"```json\s*|\s*```", "", response_text).strip()
+
+    # 가끔 시작/끝에 이상한 문자가 붙을 경우를 대비해 첫 '{'와 마지막 '}' 사이만 추출
+    match = re.search(r"\{.*\}", cleaned_text, re.DOTALL)
+    if match:
+        cleaned_text = match.group(0)
+
+    try:
+        return json.loads(cleaned_text)
+    except json.JSONDecodeError as e:
+        logger.error(f"JSON Parse Error. Raw response: {response_text}")
+        raise PlanParseError("Failed to parse AI response.") from e
+
+async def generate_roadmap(
+    goal: str,
+    level: str,
+    duration: int,
+    frequency: str,
+    reference: Optional[ReferenceFile] = None,
+    on_stage: Optional[StageCallback] = None,
+    use_cache: bool = True,
+    on_week: Optional[WeekCallback] = None,
+) -> dict:
+    """
+    (선택적) 참고 자료 파일을 Gemini에 업로드하고 로드맵을 생성하여 파싱된 JSON을 반환합니다.
+    PDF/텍스트 자료는 로컬에서 추출한 목차·발췌 요약을 프롬프트에 넣어 업로드를 생략하고 (추출 불가 시 원본 업로드),
+    같은 내용의 파일은 업로드 캐시의 원격 파일을 재사용하고, 같은 요청(정규화 기준)은 결과 캐시에서
+    LLM 호출 없이 커리큘럼을 가져옵니다. DB 저장은 호출하는 쪽에서 수행합니다.
+
+    응답은 스트리밍으로 받아 주차 객체가 닫힐 때마다 `on_week`를 호출하며,
+    응답 끝부분이 잘리거나 스트림이 중단되어도 완성된 주차까지는 살려서 반환합니다.
+    `on_week`에서 발생한 오류는 살리지 않고 그대로 전파합니다.
+    (캐시 적중이나 전체 파싱 대체 경로에서는 `on_week`가 호출되지 않습니다.)
+    """
+    async def report(stage: str):
+        if on_stage:
+            await on_stage(stage)
+
+    cache_key = None
+    if use_cache and settings.PLAN_CACHE_TTL_SECONDS > 0:
+        cache_key = make_cache_key(goal, level, duration, frequency, reference.sha256 if reference else None)
+        cached = await run_db(run_in_session, lookup_cached_plan, cache_key)
+        if cached:
+            await report("cache_hit")
+            logger.info(f"Plan cache hit for Goal: {goal}, Level: {level}, Duration: {duration} weeks")
+            return cached
+
+    # 캐시를 사용하지 않을 때만 요청이 끝난 뒤 원격 파일을 삭제합니다. (캐시 사용 시 캐시가 수명을 관리)
+    owned_file = None
+    # 캐시된 원격 파일의 사용권 (생성이 끝나면 반납)
+    upload_lease = None
+    try:
+        logger.info(f"Generating plan for Goal: {goal}, Level: {level}, Duration: {duration} weeks")
+
+        # 모델 설정: gemini-2.5-flash (멀티모달 지원)
+        genai = await load_genai()
+        model = genai.GenerativeModel('gemini-2.5-flash')
+
+        # 참고 자료에서 목차/제목/발췌를 로컬로 추출할 수 있으면 원본 대신 텍스트로 보냅니다.
+        reference_digest = None
+        if reference and settings.DOCUMENT_DIGEST_ENABLED:
+            await report("extracting")
+            reference_digest = await run_upload(document_digest_cache.get_digest, reference)
+
+        prompt = build_plan_prompt(
+            goal, level, duration, frequency,
+            has_file=reference is not None,
+            reference_digest=reference_digest,
+        )
+        request_content = [prompt]
+
+        # 파일 처리 로직: 요약을 만들 수 없는 경우에만 Gemini에 파일 업로드(또는 캐시 재사용) 후 요청 콘텐츠에 추가
+        if reference and not reference_digest:
+            await report("uploading")
+            if upload_cache.enabled:
+                upload_lease = await upload_cache.acquire(reference)
+                uploaded_file = upload_lease.remote_file
+            else:
+                uploaded_file = owned_file = await upload_reference(reference)
+            request_content.append(uploaded_file)
+
+        # 콘텐츠 생성 요청
+        await report("generating")
+        logger.info("Requesting content generation from Gemini...")
+        parser = CurriculumStreamParser()
+        chunks = []
+        try:
+            response = await run_llm(model.generate_content, request_content, stream=True)
+            async for chunk in iterate_llm_stream(response):
+                try:
+                    chunk_text = chunk.text
+                except ValueError:
+                    # 텍스트 파트가 없는 청크 (예: 종료 사유만 담긴 청크)
+                    continue
+                chunks.append(chunk_text)
+                with span("parse"):
+                    week_plans = parser.feed(chunk_text)
+                for week_plan in week_plans:
+                    if on_week:
+                        try:
+                            await on_week(week_plan, parser.project_title)
+                        except Exception as e:
+                            raise _WeekCallbackError() from e
+            record_llm_usage("plan", response)
+        except _WeekCallbackError as e:
+            raise e.__cause__ from None
+        except Exception as e:
+            if not parser.weeks:
+                # 캐시된 원격 파일이 만료/삭제되었을 수 있으므로 다음 요청에서는 다시 업로드합니다.
+                if reference and not reference_digest and upload_cache.enabled:
+                    await upload_cache.discard(reference.sha256)
+                raise
+            logger.warning(f"Plan stream interrupted after {len(parser.weeks)} weeks, salvaging them: {e}")
+
+        await report("parsing")
+        with span("parse"):
+            if parser.weeks:
+                roadmap_data = parser.result()
+                roadmap_data["project_title"] = roadmap_data["project_title"] or goal
+            else:
+                # 스트림 파서가 주차를 찾지 못한 경우 전체 응답 파싱으로 대체합니다.
+                roadmap_data = parse_roadmap_response("".join(chunks))
+        if parser.weeks and parser.truncated:
+            logger.warning(f"Plan response truncated; salvaged {len(parser.weeks)} of {duration} weeks")
+        logger.info(f"Roadmap generated successfully: {roadmap_data.get('project_title')}")
+
+        # 잘린 결과는 캐시하지 않습니다.
+        if cache_key and not (parser.weeks and parser.truncated):
+            try:
+                await run_db(run_in_session, store_cached_plan, cache_key, roadmap_data)
+            except Exception as e:
+                logger.error(f"Failed to store plan cache entry: {e}")
+        return roadmap_data
+    finally:
+        if upload_lease:
+            await upload_lease.release()
+        if owned_file:
+            await run_upload(delete_remote_file, owned_file)
@@ -0,0 +1,253 @@
+import asyncio
+import json
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set
+from fastapi import UploadFile
+from sqlalchemy import and_, or_, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import IS_SQLITE, run_in_session
+from app.core.executor import run_db, run_upload
+from app.core.metrics import record_error
+from app.schemas.plan import PlanJobStatus
+from app.services.plan_generator import generate_roadmap, save_upload, safe_upload_filename
+from app.services.roadmap_store import IncrementalRoadmapWriter
+from app.services.upload_cache import open_reference_file
+from app import models
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = {"succeeded", "failed"}
+
+def _to_status(job: models.PlanJob) -> PlanJobStatus:
+    return PlanJobStatus(
+        job_id=job.id,
+        status=job.status,
+        stage=job.stage,
+        roadmap_id=job.roadmap_id,
+        result=json.loads(job.result) if job.result else None,
+        error=job.error,
+    )
+
+def _create_job(db: Session, job_id: str, goal: str, level: str, duration: int, frequency: str,
+                file_path: Optional[str], use_cache: bool) -> PlanJobStatus:
+    job = models.PlanJob(
+        id=job_id,
+        status="queued",
+        goal=goal,
+        level=level,
+        duration=duration,
+        frequency=frequency,
+        file_path=file_path,
+        use_cache=use_cache,
+    )
+    db.add(job)
+    db.commit()
+    return _to_status(job)
+
+def _get_job(db: Session, job_id: str) -> Optional[models.PlanJob]:
+    job = db.query(models.PlanJob).filter(models.PlanJob.id == job_id).first()
+    if job:
+        # 세션 밖(이벤트 루프)에서 속성을 읽을 수 있도록 분리합니다.
+        db.expunge(job)
+    return job
+
+def _get_job_status(db: Session, job_id: str) -> Optional[PlanJobStatus]:
+    job = db.query(models.PlanJob).filter(models.PlanJob.id == job_id).first()
+    return _to_status(job) if job else None
+
+def _update_job(db: Session, job_id: str, **fields) -> PlanJobStatus:
+    job = db.query(models.PlanJob).filter(models.PlanJob.id == job_id).first()
+    for name, value in fields.items():
+        setattr(job, name, value)
+    db.commit()
+    return _to_status(job)
+
+def _recoverable_clause():
+    """
+    다시 실행할 수 있는 작업 조건: 대기 중이거나, 중단된 것으로 보이는 실행 중 작업
+    SQLite는 인스턴스 로컬 DB이므로 재시작 시점의 실행 중 작업은 모두 중단된 작업입니다.
+    공유 DB(PostgreSQL)에서는 다른 인스턴스가 실행 중일 수 있으므로 PLAN_JOB_STALE_SECONDS 동안 갱신이 없던 작업만 포함합니다.
+    """
+    Job = models.PlanJob
+    if IS_SQLITE:
+        return Job.status.in_(["queued", "running"])
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=settings.PLAN_JOB_STALE_SECONDS)
+    return or_(Job.status == "queued", and_(Job.status == "running", Job.updated_at < stale_before))
+
+def _pending_job_ids(db: Session) -> List[str]:
+    # 재시작 전에 대기 중이었거나 실행 중이던 작업은 처음부터 다시 실행합니다.
+    rows = (
+        db.query(models.PlanJob.id)
+        .filter(_recoverable_clause())
+        .order_by(models.PlanJob.created_at.asc())
+        .all()
+    )
+    return [row.id for row in rows]
+
+def _claim_job(db: Session, job_id: str) -> Optional[models.PlanJob]:
+    """
+    작업을 running으로 바꾸며 가져옵니다. 다른 워커/인스턴스가 먼저 가져갔으면 None을 반환합니다.
+    """
+    claimed = db.execute(
+        update(models.PlanJob)
+        .where(models.PlanJob.id == job_id, _recoverable_clause())
+        .values(status="running", stage="started", error=None)
+    ).rowcount
+    db.commit()
+    return _get_job(db, job_id) if claimed else None
+
+def _remove_file(path: Optional[str]):
+    if path and os.path.exists(path):
+        try:
+            os.remove(path)
+            logger.info(f"Deleted job file: {path}")
+        except Exception as e:
+            logger.error(f"Failed to delete job file: {e}")
+
+class PlanJobQueue:
+    """
+    로드맵 생성 작업 큐입니다.
+    제출 즉시 작업 ID를 반환하고, 크기가 제한된 워커들이 백그라운드에서 생성을 수행합니다.
+    작업 상태는 DB(plan_jobs)에 저장되므로 서버가 재시작되어도 대기/실행 중이던 작업이 다시 실행됩니다.
+    """
+    def __init__(self, workers: int, job_dir: str):
+        self.workers = workers
+        self.job_dir = job_dir
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    async def start(self):
+        os.makedirs(self.job_dir, exist_ok=True)
+        self._queue = asyncio.Queue()
+
+        pending = await run_db(run_in_session, _pending_job_ids)
+        for job_id in pending:
+            self._queue.put_nowait(job_id)
+        if pending:
+            logger.info(f"Recovered {len(pending)} pending plan jobs")
+
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, goal: str, level: str, duration: int, frequency: str,
+                     file: Optional[UploadFile] = None, use_cache: bool = True) -> PlanJobStatus:
+        job_id = uuid.uuid4().hex
+
+        # 업로드 파일은 작업이 끝날 때까지 작업 디렉토리에 보관합니다.
+        file_path = None
+        if file:
+            file_path = os.path.join(self.job_dir, f"{job_id}_{safe_upload_filename(file.filename)}")
+            await run_upload(save_upload, file.file, file_path)
+
+        status = await run_db(
+            run_in_session, _create_job, job_id, goal, level, duration, frequency, file_path, use_cache
+        )
+        await self._queue.put(job_id)
+        return status
+
+    async def get_status(self, job_id: str) -> Optional[PlanJobStatus]:
+        return await run_db(run_in_session, _get_job_status, job_id)
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        """
+        작업 이벤트 구독 큐를 반환합니다. 큐에는 (이벤트 이름, 데이터) 튜플이 들어옵니다.
+        - ("status", PlanJobStatus dict): 상태/단계 변경
+        - ("week", WeekPlan dict): 새로 완성되어 저장된 주차
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(job_id)
+        if subscribers:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[job_id]
+
+    def _publish(self, job_id: str, event: str, data: dict):
+        for queue in self._subscribers.get(job_id, ()):
+            queue.put_nowait((event, data))
+
+    async def _update(self, job_id: str, **fields) -> PlanJobStatus:
+        status = await run_db(run_in_session, _update_job, job_id, **fields)
+        self._publish(job_id, "status", status.model_dump())
+        return status
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                logger.error(f"Plan job {job_id} crashed: {e}")
+                record_error("plan_job")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        job = await run_db(run_in_session, _claim_job, job_id)
+        if not job:
+            return
+        self._publish(job_id, "status", _to_status(job).model_dump())
+
+        async def on_stage(stage: str):
+            await self._update(job_id, stage=stage)
+
+        # 완성된 주차는 도착하는 즉시 저장하고 구독자에게 전달합니다.
+        # 중단 후 다시 실행하는 작업이면 이전 실행이 남긴 부분 로드맵을 새 로드맵 대신 다시 채웁니다.
+        writer = IncrementalRoadmapWriter(job.goal, job.level, job.duration, job.frequency, roadmap_id=job.roadmap_id)
+
+        async def on_week(week_plan: dict, project_title: Optional[str]):
+            first_week = writer.weeks_written == 0
+            await run_db(run_in_session, writer.add_week, week_plan, project_title)
+            if first_week:
+                # 첫 주차가 저장되면 로드맵 ID를 알려 클라이언트가 부분 결과를 조회할 수 있게 합니다.
+                await self._update(job_id, roadmap_id=writer.roadmap_id)
+            self._publish(job_id, "week", week_plan)
+
+        reference = None
+        try:
+            if job.file_path:
+                reference = await run_upload(open_reference_file, job.file_path)
+
+            roadmap_data = await generate_roadmap(
+                job.goal, job.level, job.duration, job.frequency,
+                reference=reference, on_stage=on_stage, use_cache=job.use_cache is not False,
+                on_week=on_week,
+            )
+
+            await on_stage("saving")
+            if writer.weeks_written:
+                # 스트리밍 중 저장된 주차가 곧 최종 커리큘럼입니다.
+                await run_db(run_in_session, writer.finish, roadmap_data["project_title"])
+                roadmap_id = writer.roadmap_id
+            else:
+                # 캐시 적중 또는 전체 파싱 대체 경로
+                roadmap_id = await run_db(run_in_session, writer.save_all, roadmap_data)
+            roadmap_data["id"] = roadmap_id
+
+            await self._update(
+                job_id, status="succeeded", stage="done", roadmap_id=roadmap_id, result=json.dumps(roadmap_data)
+            )
+            logger.info(f"Plan job {job_id} succeeded (roadmap {roadmap_id})")
+        except Exception as e:
+            logger.error(f"Plan job {job_id} failed: {e}")
+            record_error("plan_job")
+            await self._update(job_id, status="failed", error=str(e), roadmap_id=writer.roadmap_id)
+        finally:
+            if reference:
+                reference.close()
+            await run_upload(_remove_file, job.file_path)
+
+plan_job_queue = PlanJobQueue(workers=settings.PLAN_JOB_WORKERS, job_dir=settings.PLAN_JOB_DIR)
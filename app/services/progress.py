@@ -0,0 +1,155 @@
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import case, func, update
+from sqlalchemy.orm import Session
+from app import models
+from app.services.roadmap_cache import touch_roadmap
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Progress:
+    """
+    로드맵 진행률 (Roadmap의 비정규화 카운터와 같은 구조)
+    week_progress: {"<주차>": {"completed": n, "total": m}}
+    """
+    total: int = 0
+    completed: int = 0
+    week_progress: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+    def add(self, week: int, total: int, completed: int):
+        self.total += total
+        self.completed += completed
+        entry = self.week_progress.setdefault(str(week), {"completed": 0, "total": 0})
+        entry["total"] += total
+        entry["completed"] += completed
+
+    def week_progress_json(self) -> str:
+        return json.dumps(dict(sorted(self.week_progress.items(), key=lambda kv: int(kv[0]))))
+
+def load_week_progress(value: Optional[str]) -> Dict[str, Dict[str, int]]:
+    return json.loads(value) if value else {}
+
+def progress_from_curriculum(curriculum: Iterable[dict]) -> Progress:
+    """
+    저장할 커리큘럼(JSON)에서 진행률 카운터를 계산합니다.
+    """
+    progress = Progress()
+    for week_plan in curriculum:
+        missions = week_plan["missions"]
+        progress.add(
+            week_plan["week"],
+            total=len(missions),
+            completed=sum(1 for m in missions if m.get("is_completed")),
+        )
+    return progress
+
+def add_progress(db: Session, roadmap_id: int, delta: Progress):
+    """
+    로드맵의 진행률 카운터에 delta를 더합니다. 호출하는 쪽의 트랜잭션 안에서 실행됩니다. (커밋하지 않음)
+    """
+    # 행 잠금 후 읽기 → 쓰기 (SQLite는 트랜잭션의 쓰기 잠금으로 직렬화됨)
+    roadmap = (
+        db.query(models.Roadmap)
+        .filter(models.Roadmap.id == roadmap_id)
+        .with_for_update()
+        .populate_existing()
+        .one()
+    )
+    current = Progress(
+        total=roadmap.total_missions or 0,
+        completed=roadmap.completed_missions or 0,
+        week_progress=load_week_progress(roadmap.week_progress),
+    )
+    for week, entry in delta.week_progress.items():
+        current.add(int(week), total=entry["total"], completed=entry["completed"])
+    roadmap.total_missions = current.total
+    roadmap.completed_missions = current.completed
+    roadmap.week_progress = current.week_progress_json()
+    db.flush()
+    touch_roadmap(db, roadmap_id)
+
+def mark_mission_complete(db: Session, roadmap_id: int, mission_key: str) -> bool:
+    """
+    미션을 완료 처리하고, 실제로 미완료 → 완료로 바뀐 경우에만 같은 트랜잭션에서 진행률 카운터를 올립니다.
+    미션이 없으면 False를 반환합니다. (이미 완료된 미션은 카운터 변경 없이 True, 커밋하지 않음)
+    """
+    Mission = models.Mission
+    week = db.execute(
+        update(Mission)
+        .where(
+            Mission.roadmap_id == roadmap_id,
+            Mission.mission_key == mission_key,
+            Mission.is_completed.is_not(True),
+        )
+        .values(is_completed=True)
+        .returning(Mission.week)
+    ).scalars().first()
+
+    if week is None:
+        return db.query(Mission.id).filter(
+            Mission.roadmap_id == roadmap_id,
+            Mission.mission_key == mission_key,
+        ).first() is not None
+
+    delta = Progress()
+    delta.add(week, total=0, completed=1)
+    add_progress(db, roadmap_id, delta)
+    return True
+
+def _actual_progress(db: Session, roadmap_ids: Optional[List[int]] = None) -> Dict[int, Progress]:
+    Mission = models.Mission
+    query = db.query(
+        Mission.roadmap_id,
+        Mission.week,
+        func.count(Mission.id),
+        func.coalesce(func.sum(case((Mission.is_completed == True, 1), else_=0)), 0),  # noqa: E712
+    ).group_by(Mission.roadmap_id, Mission.week)
+    if roadmap_ids is not None:
+        query = query.filter(Mission.roadmap_id.in_(roadmap_ids))
+
+    actual: Dict[int, Progress] = {}
+    for roadmap_id, week, total, completed in query:
+        actual.setdefault(roadmap_id, Progress()).add(week, total=total, completed=completed)
+    return actual
+
+def check_progress(db: Session, fix: bool = False, batch_size: int = 500) -> List[int]:
+    """
+    Roadmap의 진행률 카운터를 Mission 행에서 다시 계산한 값과 비교하여 불일치하는 로드맵 ID를 반환합니다.
+    fix=True이면 불일치한 카운터를 재계산한 값으로 덮어씁니다. (배치마다 커밋)
+    """
+    mismatched = []
+    last_id = 0
+    while True:
+        roadmaps = (
+            db.query(models.Roadmap)
+            .filter(models.Roadmap.id > last_id)
+            .order_by(models.Roadmap.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not roadmaps:
+            break
+        actual = _actual_progress(db, [r.id for r in roadmaps])
+        for roadmap in roadmaps:
+            expected = actual.get(roadmap.id, Progress())
+            if (
+                roadmap.total_missions != expected.total
+                or roadmap.completed_missions != expected.completed
+                or load_week_progress(roadmap.week_progress) != expected.week_progress
+            ):
+                mismatched.append(roadmap.id)
+                if fix:
+                    roadmap.total_missions = expected.total
+                    roadmap.completed_missions = expected.completed
+                    roadmap.week_progress = expected.week_progress_json()
+                    touch_roadmap(db, roadmap.id)
+        last_id = roadmaps[-1].id
+        if fix:
+            db.commit()
+        db.expunge_all()
+    if mismatched:
+        logger.info(f"{'Rebuilt' if fix else 'Found'} inconsistent progress counters for {len(mismatched)} roadmaps")
+    return mismatched
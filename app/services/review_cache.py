@@ -0,0 +1,144 @@
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import run_in_session
+from app.core.executor import run_db
+from app.services.plan_cache import normalize_text
+from app import models
+
+logger = logging.getLogger(__name__)
+
+def make_prompt_key(prompt: str) -> str:
+    return hashlib.sha256(normalize_text(prompt).encode("utf-8")).hexdigest()
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+def _find_persisted_review(db: Session, prompt_key: str, image_hash: int, max_distance: int, ttl: int,
+                           scan_limit: int) -> Optional[str]:
+    """
+    같은 프롬프트로 저장된 리뷰 중 해시가 같은 항목을 인덱스로 찾고,
+    없으면 최근 scan_limit개 중 해밍 거리가 가장 가까운 항목을 찾습니다.
+    """
+    ReviewCache = models.ReviewCache
+    since = datetime.now(timezone.utc) - timedelta(seconds=ttl)
+    fresh = db.query(ReviewCache).filter(ReviewCache.prompt_key == prompt_key, ReviewCache.created_at >= since)
+
+    best = fresh.filter(ReviewCache.image_hash == format(image_hash, "x")).order_by(ReviewCache.id.desc()).first()
+    if best is None and max_distance > 0:
+        best_distance = max_distance + 1
+        for row in fresh.order_by(ReviewCache.id.desc()).limit(scan_limit):
+            distance = hamming_distance(int(row.image_hash, 16), image_hash)
+            if distance < best_distance:
+                best, best_distance = row, distance
+    if best is None:
+        return None
+    best.hit_count = (best.hit_count or 0) + 1
+    db.commit()
+    return best.text
+
+def _store_persisted_review(db: Session, prompt_key: str, image_hash: int, text: str, ttl: int, max_rows: int):
+    """
+    리뷰를 저장하고, 같은 트랜잭션에서 만료된 행과 max_rows를 넘는 오래된 행을 삭제합니다.
+    """
+    ReviewCache = models.ReviewCache
+    db.add(ReviewCache(prompt_key=prompt_key, image_hash=format(image_hash, "x"), text=text))
+    db.flush()
+    since = datetime.now(timezone.utc) - timedelta(seconds=ttl)
+    db.query(ReviewCache).filter(ReviewCache.created_at < since).delete(synchronize_session=False)
+    oldest_kept = db.query(ReviewCache.id).order_by(ReviewCache.id.desc()).offset(max_rows - 1).limit(1).scalar()
+    if oldest_kept is not None:
+        db.query(ReviewCache).filter(ReviewCache.id < oldest_kept).delete(synchronize_session=False)
+    db.commit()
+
+class ReviewCache:
+    """
+    (perceptual hash, 정규화된 프롬프트) → 리뷰 응답 캐시입니다.
+    해시 간 해밍 거리가 max_distance 이하이면 같은 이미지로 보고 저장된 응답을 반환합니다.
+    메모리 계층은 LRU로 크기를 제한하고, persist가 켜져 있으면 DB 계층을 추가로 조회합니다.
+    DB 계층은 저장할 때마다 만료된 행을 지우고 max_rows개로 제한합니다.
+    """
+    def __init__(self, maxsize: int, ttl: int, max_distance: int, persist: bool,
+                 max_rows: int = 10000, scan_limit: int = 500):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.persist = persist
+        self.max_rows = max_rows
+        self.scan_limit = scan_limit
+        # (prompt_key, image_hash) → (expires_at, text)
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, str]]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def _lookup_memory(self, prompt_key: str, image_hash: int) -> Optional[str]:
+        now = time.monotonic()
+        best_key, best_distance = None, self.max_distance + 1
+        for key, (expires_at, _) in list(self._entries.items()):
+            if expires_at <= now:
+                del self._entries[key]
+                continue
+            if key[0] != prompt_key:
+                continue
+            distance = hamming_distance(key[1], image_hash)
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+        if best_key is None:
+            return None
+        self._entries.move_to_end(best_key)
+        return self._entries[best_key][1]
+
+    def _remember(self, prompt_key: str, image_hash: int, text: str):
+        self._entries[(prompt_key, image_hash)] = (time.monotonic() + self.ttl, text)
+        self._entries.move_to_end((prompt_key, image_hash))
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def get(self, prompt: str, image_hash: Optional[int]) -> Optional[str]:
+        if not self.enabled or image_hash is None:
+            return None
+        prompt_key = make_prompt_key(prompt)
+        text = self._lookup_memory(prompt_key, image_hash)
+        if text is None and self.persist:
+            try:
+                text = await run_db(
+                    run_in_session, _find_persisted_review, prompt_key, image_hash, self.max_distance, self.ttl,
+                    self.scan_limit,
+                )
+            except Exception as e:
+                logger.error(f"Failed to read review cache: {e}")
+            if text is not None:
+                self._remember(prompt_key, image_hash, text)
+        return text
+
+    async def put(self, prompt: str, image_hash: Optional[int], text: str):
+        if not self.enabled or image_hash is None:
+            return
+        prompt_key = make_prompt_key(prompt)
+        self._remember(prompt_key, image_hash, text)
+        if self.persist:
+            try:
+                await run_db(
+                    run_in_session, _store_persisted_review, prompt_key, image_hash, text, self.ttl, self.max_rows
+                )
+            except Exception as e:
+                logger.error(f"Failed to store review cache entry: {e}")
+
+    def clear(self):
+        self._entries.clear()
+
+review_cache = ReviewCache(
+    maxsize=settings.REVIEW_CACHE_SIZE,
+    ttl=settings.REVIEW_CACHE_TTL_SECONDS,
+    max_distance=settings.REVIEW_CACHE_MAX_DISTANCE,
+    persist=settings.REVIEW_CACHE_PERSIST,
+    max_rows=settings.REVIEW_CACHE_MAX_ROWS,
+    scan_limit=settings.REVIEW_CACHE_SCAN_LIMIT,
+)
@@ -0,0 +1,103 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Hashable, NamedTuple, Optional, Tuple
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app import models
+
+class RoadmapStamp(NamedTuple):
+    version: int
+    last_modified: Optional[datetime]
+
+def get_roadmap_stamp(db: Session, roadmap_id: int) -> Optional[RoadmapStamp]:
+    """
+    로드맵의 버전과 마지막 수정 시각만 조회합니다. (기본 키 조회 한 번)
+    """
+    row = (
+        db.query(models.Roadmap.version, models.Roadmap.updated_at, models.Roadmap.created_at)
+        .filter(models.Roadmap.id == roadmap_id)
+        .first()
+    )
+    if row is None:
+        return None
+    return RoadmapStamp(version=row.version or 1, last_modified=row.updated_at or row.created_at)
+
+def get_roadmap_list_stamp(db: Session) -> int:
+    """
+    로드맵 목록의 버전 카운터를 조회합니다. (한 행짜리 테이블의 기본 키 조회 한 번)
+    """
+    version = db.query(models.RoadmapListVersion.version).filter(models.RoadmapListVersion.id == 1).scalar()
+    return int(version or 0)
+
+def bump_roadmap_list_version(db: Session):
+    """
+    로드맵 목록의 버전을 올립니다. 호출하는 쪽의 트랜잭션 안에서 실행됩니다. (커밋하지 않음)
+    """
+    bumped = db.execute(
+        update(models.RoadmapListVersion)
+        .where(models.RoadmapListVersion.id == 1)
+        .values(version=models.RoadmapListVersion.version + 1)
+    ).rowcount
+    if not bumped:
+        # 스키마 갱신 전에 만들어진 DB 등 카운터 행이 아직 없는 경우
+        db.execute(insert(models.RoadmapListVersion).values(id=1, version=2))
+
+def touch_roadmap(db: Session, roadmap_id: int, listed: bool = True):
+    """
+    로드맵의 버전을 올리고 수정 시각을 갱신합니다. 호출하는 쪽의 트랜잭션 안에서 실행됩니다. (커밋하지 않음)
+    미션 완료, 새 채팅 메시지 등 상세/목록 응답이 바뀌는 모든 쓰기에서 호출합니다.
+    목록 응답에 드러나지 않는 쓰기(채팅 메시지)는 listed=False로 목록 버전을 올리지 않습니다.
+    """
+    db.execute(
+        update(models.Roadmap)
+        .where(models.Roadmap.id == roadmap_id)
+        .values(version=func.coalesce(models.Roadmap.version, 1) + 1, updated_at=func.now())
+    )
+    if listed:
+        bump_roadmap_list_version(db)
+    roadmap_read_cache.invalidate_roadmap(roadmap_id, listed=listed)
+
+class RoadmapReadCache:
+    """
+    직렬화된 로드맵 응답 본문의 읽기 캐시입니다.
+    항목은 만들 때의 버전 스탬프와 함께 저장되며, 조회 시 현재 스탬프와 다르면 무시됩니다.
+    (다른 프로세스에서 쓰기가 일어나도 스탬프 비교로 오래된 응답을 내보내지 않음)
+    같은 프로세스의 쓰기는 invalidate_roadmap으로 해당 로드맵과 목록 항목을 즉시 제거합니다.
+    """
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        # key → (roadmap_id 또는 None(목록), stamp, payload)
+        self._entries: "OrderedDict[Hashable, Tuple[Optional[int], Any, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, stamp: Any) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] != stamp:
+                return None
+            self._entries.move_to_end(key)
+            return entry[2]
+
+    def put(self, key: Hashable, stamp: Any, payload: Any, roadmap_id: Optional[int] = None):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (roadmap_id, stamp, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate_roadmap(self, roadmap_id: int, listed: bool = True):
+        with self._lock:
+            for key in [
+                k for k, (rid, _, _) in self._entries.items() if rid == roadmap_id or (listed and rid is None)
+            ]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+roadmap_read_cache = RoadmapReadCache(maxsize=settings.ROADMAP_CACHE_SIZE)
@@ -0,0 +1,182 @@
+from typing import Iterable, List, Optional
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+from app import models
+from app.services.progress import Progress, add_progress, progress_from_curriculum
+from app.services.roadmap_cache import bump_roadmap_list_version, touch_roadmap
+
+# insertmanyvalues가 한 INSERT ... VALUES (...), (...) RETURNING 문에 묶는 미션 행 수
+# (SQLAlchemy가 DB의 바인드 변수 한도를 넘지 않도록 필요하면 더 작게 나눔)
+MISSION_BATCH_SIZE = 500
+
+def insert_roadmap(
+    db: Session,
+    goal: str,
+    level: str,
+    duration: int,
+    frequency: str,
+    project_title: str,
+    progress: Optional[Progress] = None,
+) -> int:
+    """
+    로드맵 행을 INSERT ... RETURNING으로 추가하고 ID를 반환합니다. (커밋하지 않음)
+    progress에는 함께 저장할 미션들의 진행률 카운터를 넘깁니다.
+    """
+    progress = progress or Progress()
+    bump_roadmap_list_version(db)
+    return db.execute(
+        insert(models.Roadmap)
+        .values(
+            project_title=project_title,
+            goal=goal,
+            level=level,
+            duration=duration,
+            frequency=frequency,
+            total_missions=progress.total,
+            completed_missions=progress.completed,
+            week_progress=progress.week_progress_json(),
+        )
+        .returning(models.Roadmap.id)
+    ).scalar_one()
+
+def _mission_rows(roadmap_id: int, curriculum: Iterable[dict]) -> List[dict]:
+    return [
+        {
+            "roadmap_id": roadmap_id,
+            "week": week_plan["week"],
+            "theme": week_plan["theme"],
+            "mission_key": mission["id"],
+            "title": mission["title"],
+            "is_completed": bool(mission.get("is_completed", False)),
+        }
+        for week_plan in curriculum
+        for mission in week_plan["missions"]
+    ]
+
+def insert_missions(db: Session, roadmap_id: int, curriculum: Iterable[dict]) -> List[int]:
+    """
+    커리큘럼의 모든 미션을 추가하고 추가된 미션 ID 목록을 반환합니다. (커밋하지 않음)
+    insertmanyvalues로 MISSION_BATCH_SIZE 행씩 여러 행 INSERT ... RETURNING 문을 보냅니다.
+    ID의 순서는 보장하지 않습니다. (순서를 요구하면 SQLite에서는 한 행씩 INSERT로 바뀜)
+    ORM 객체를 만들지 않으므로 unit-of-work 오버헤드가 없습니다.
+    """
+    rows = _mission_rows(roadmap_id, curriculum)
+    if not rows:
+        return []
+    return list(db.execute(
+        insert(models.Mission).returning(models.Mission.id),
+        rows,
+        execution_options={"insertmanyvalues_page_size": MISSION_BATCH_SIZE},
+    ).scalars())
+
+def save_roadmap(db: Session, goal: str, level: str, duration: int, frequency: str, roadmap_data: dict) -> int:
+    """
+    생성된 로드맵과 미션들을 하나의 트랜잭션으로 저장하고 로드맵 ID를 반환합니다.
+    실패하면 전체를 롤백하므로 미션 없는 로드맵이 남지 않습니다.
+    """
+    try:
+        roadmap_id = insert_roadmap(
+            db, goal, level, duration, frequency, roadmap_data["project_title"],
+            progress=progress_from_curriculum(roadmap_data["curriculum"]),
+        )
+        insert_missions(db, roadmap_id, roadmap_data["curriculum"])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return roadmap_id
+
+class IncrementalRoadmapWriter:
+    """
+    스트리밍 생성 중 완성된 주차를 바로 저장합니다.
+    첫 주차가 도착하면 로드맵 행을 만들고, 이후 주차마다 짧은 트랜잭션으로 미션을 추가합니다.
+    (생성 중 SQLite 쓰기 잠금을 오래 잡지 않으며, 생성이 중간에 끊겨도 완성된 주차는 남습니다.)
+    roadmap_id를 넘기면 (중단된 작업의 재실행) 새 로드맵을 만들지 않고 그 로드맵의 미션을 비운 뒤 다시 채웁니다.
+    """
+    def __init__(self, goal: str, level: str, duration: int, frequency: str, roadmap_id: Optional[int] = None):
+        self.goal = goal
+        self.level = level
+        self.duration = duration
+        self.frequency = frequency
+        self.roadmap_id: Optional[int] = roadmap_id
+        self.weeks_written = 0
+        self._reset_pending = roadmap_id is not None
+
+    def _reset_existing(self, db: Session):
+        """
+        이전 실행이 남긴 미션과 진행률 카운터를 비웁니다. 로드맵이 없어졌으면 새로 만들도록 roadmap_id를 지웁니다. (커밋하지 않음)
+        """
+        db.query(models.Mission).filter(models.Mission.roadmap_id == self.roadmap_id).delete(synchronize_session=False)
+        updated = db.execute(
+            update(models.Roadmap)
+            .where(models.Roadmap.id == self.roadmap_id)
+            .values(total_missions=0, completed_missions=0, week_progress=Progress().week_progress_json())
+        ).rowcount
+        if not updated:
+            self.roadmap_id = None
+
+    def add_week(self, db: Session, week_plan: dict, project_title: Optional[str]) -> int:
+        progress = progress_from_curriculum([week_plan])
+        roadmap_id = self.roadmap_id
+        try:
+            if self._reset_pending:
+                self._reset_existing(db)
+            if self.roadmap_id is None:
+                self.roadmap_id = insert_roadmap(
+                    db, self.goal, self.level, self.duration, self.frequency, project_title or self.goal,
+                    progress=progress,
+                )
+            else:
+                add_progress(db, self.roadmap_id, progress)
+            insert_missions(db, self.roadmap_id, [week_plan])
+            db.commit()
+        except Exception:
+            db.rollback()
+            self.roadmap_id = roadmap_id
+            raise
+        self._reset_pending = False
+        self.weeks_written += 1
+        return self.roadmap_id
+
+    def save_all(self, db: Session, roadmap_data: dict) -> int:
+        """
+        스트리밍 중 저장된 주차가 없을 때 (캐시 적중, 전체 파싱 대체) 전체 커리큘럼을 한 트랜잭션으로 저장합니다.
+        """
+        if not self._reset_pending:
+            self.roadmap_id = save_roadmap(db, self.goal, self.level, self.duration, self.frequency, roadmap_data)
+            return self.roadmap_id
+
+        roadmap_id = self.roadmap_id
+        progress = progress_from_curriculum(roadmap_data["curriculum"])
+        try:
+            self._reset_existing(db)
+            if self.roadmap_id is None:
+                self.roadmap_id = insert_roadmap(
+                    db, self.goal, self.level, self.duration, self.frequency, roadmap_data["project_title"],
+                    progress=progress,
+                )
+            else:
+                db.execute(
+                    update(models.Roadmap)
+                    .where(models.Roadmap.id == self.roadmap_id)
+                    .values(project_title=roadmap_data["project_title"])
+                )
+                add_progress(db, self.roadmap_id, progress)
+            insert_missions(db, self.roadmap_id, roadmap_data["curriculum"])
+            db.commit()
+        except Exception:
+            db.rollback()
+            self.roadmap_id = roadmap_id
+            raise
+        self._reset_pending = False
+        return self.roadmap_id
+
+    def finish(self, db: Session, project_title: str):
+        # 제목은 커리큘럼보다 먼저 오는 것이 보통이지만, 늦게 도착한 경우를 위해 마지막에 한 번 더 반영합니다.
+        db.execute(
+            update(models.Roadmap)
+            .where(models.Roadmap.id == self.roadmap_id)
+            .values(project_title=project_title)
+        )
+        touch_roadmap(db, self.roadmap_id)
+        db.commit()
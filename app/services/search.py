@@ -0,0 +1,450 @@
+import logging
+import re
+from itertools import islice
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy import and_, bindparam, inspect, or_, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app.schemas.search import SearchHit
+from app.services.chat_archive import decode_segment
+from app import models
+
+logger = logging.getLogger(__name__)
+
+SEARCH_KINDS = ("chat", "mission")
+
+# 일치한 단어 표시 (프론트엔드는 채팅 텍스트를 Markdown으로 렌더링합니다)
+SNIPPET_OPEN = "**"
+SNIPPET_CLOSE = "**"
+SNIPPET_ELLIPSIS = "…"
+# FTS5 snippet의 최대 토큰 수 / LIKE 대체 경로의 일치 위치 앞뒤 문자 수
+SNIPPET_TOKENS = 16
+SNIPPET_CONTEXT_CHARS = 60
+# 한 검색어에서 사용하는 최대 단어 수
+MAX_QUERY_TERMS = 8
+
+# bm25 가중치: 미션 제목 일치를 주차 테마 일치보다 높게 평가합니다.
+MISSION_TITLE_WEIGHT = 2.0
+MISSION_THEME_WEIGHT = 1.0
+
+# FTS5 external content 테이블 (본문은 원본 테이블에서 읽고 역색인만 저장)과 동기화 트리거
+# unicode61 토크나이저는 공백/구두점으로 단어를 나누므로, 검색어는 접두어 검색("단어"*)으로 조사가 붙은 단어도 찾습니다.
+SEARCH_INDEX_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS chat_history_fts USING fts5(
+        text, content='chat_history', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS chat_history_fts_ai AFTER INSERT ON chat_history BEGIN
+        INSERT INTO chat_history_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS chat_history_fts_ad AFTER DELETE ON chat_history BEGIN
+        INSERT INTO chat_history_fts(chat_history_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS chat_history_fts_au AFTER UPDATE OF text ON chat_history BEGIN
+        INSERT INTO chat_history_fts(chat_history_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        INSERT INTO chat_history_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS missions_fts USING fts5(
+        title, theme, content='missions', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS missions_fts_ai AFTER INSERT ON missions BEGIN
+        INSERT INTO missions_fts(rowid, title, theme) VALUES (new.id, new.title, new.theme);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS missions_fts_ad AFTER DELETE ON missions BEGIN
+        INSERT INTO missions_fts(missions_fts, rowid, title, theme) VALUES ('delete', old.id, old.title, old.theme);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS missions_fts_au AFTER UPDATE OF title, theme ON missions BEGIN
+        INSERT INTO missions_fts(missions_fts, rowid, title, theme) VALUES ('delete', old.id, old.title, old.theme);
+        INSERT INTO missions_fts(rowid, title, theme) VALUES (new.id, new.title, new.theme);
+    END
+    """,
+    # 보관된 대화: chat_archives 세그먼트마다 한 행 (rowid = chat_archives.id)
+    # 본문은 압축된 세그먼트에만 두고 역색인만 저장합니다. (contentless, 보관 시 index_archive_segment로 추가)
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS chat_archives_fts USING fts5(
+        text, content='', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+]
+
+# PostgreSQL 전문 검색: to_tsvector 식에 대한 GIN 색인 (검색 쿼리의 WHERE 식과 같아야 색인을 사용함)
+# 'simple' 구성은 어간 추출 없이 공백/구두점으로 단어를 나누므로 FTS5 unicode61과 같은 방식으로 일치합니다.
+PG_CHAT_TSVECTOR = "to_tsvector('simple', coalesce(text, ''))"
+PG_MISSION_TSVECTOR = "to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(theme, ''))"
+PG_SEARCH_INDEX_DDL = [
+    f"CREATE INDEX IF NOT EXISTS ix_chat_history_text_tsv ON chat_history USING gin (({PG_CHAT_TSVECTOR}))",
+    f"CREATE INDEX IF NOT EXISTS ix_missions_title_theme_tsv ON missions USING gin (({PG_MISSION_TSVECTOR}))",
+]
+# ts_rank 가중치 {D, C, B, A}: 채팅 본문(D)과 미션 테마(B)를 1, 미션 제목(A)을 MISSION_TITLE_WEIGHT 비율로 둡니다.
+PG_RANK_WEIGHTS = "'{%s, 0, %s, 1}'::float4[]" % (
+    1 / MISSION_TITLE_WEIGHT, MISSION_THEME_WEIGHT / MISSION_TITLE_WEIGHT,
+)
+
+# 원본 테이블을 content로 쓰는 색인 ('rebuild' 명령으로 다시 만들 수 있음)
+FTS_TABLES = ("chat_history_fts", "missions_fts")
+ARCHIVE_FTS_TABLE = "chat_archives_fts"
+
+def ensure_search_index(engine: Engine):
+    """
+    SQLite에 FTS5 검색 색인과 동기화 트리거를 만듭니다. (이미 있으면 그대로 둠)
+    색인을 새로 만든 경우 기존 행으로 채웁니다.
+    PostgreSQL에는 to_tsvector GIN 색인을 만듭니다. (색인은 PostgreSQL이 행과 함께 갱신함)
+    그 밖의 DB는 LIKE 검색을 사용하므로 아무것도 하지 않습니다.
+    """
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            for statement in PG_SEARCH_INDEX_DDL:
+                conn.execute(text(statement))
+        return
+    if engine.dialect.name != "sqlite":
+        return
+    created = not {*FTS_TABLES, ARCHIVE_FTS_TABLE} <= set(inspect(engine).get_table_names())
+    try:
+        with engine.begin() as conn:
+            for statement in SEARCH_INDEX_DDL:
+                conn.execute(text(statement))
+    except Exception as e:
+        # FTS5 없이 빌드된 SQLite에서는 LIKE 검색으로 대체됩니다.
+        logger.warning(f"Full-text search index unavailable, falling back to LIKE search: {e}")
+        return
+    if created:
+        rebuild_search_index(engine)
+
+def rebuild_search_index(engine: Engine) -> bool:
+    """
+    FTS5 색인을 원본 테이블(chat_history, missions)과 보관 세그먼트(chat_archives)에서 다시 만듭니다.
+    FTS5를 사용하지 않으면 (PostgreSQL은 색인을 자체 갱신) False를 반환합니다.
+    """
+    if engine.dialect.name != "sqlite":
+        return False
+    with Session(engine) as db:
+        for table in FTS_TABLES:
+            db.execute(text(f"INSERT INTO {table}({table}) VALUES ('rebuild')"))
+        db.execute(text(f"INSERT INTO {ARCHIVE_FTS_TABLE}({ARCHIVE_FTS_TABLE}) VALUES ('delete-all')"))
+        archives = db.query(models.ChatArchive).order_by(models.ChatArchive.id).yield_per(100)
+        for archive in archives:
+            index_archive_segment(db, archive.id, decode_segment(archive))
+        db.commit()
+    logger.info("Rebuilt full-text search index")
+    return True
+
+def index_archive_segment(db: Session, archive_id: int, messages: List[dict]):
+    """
+    보관 세그먼트의 메시지 본문을 검색 색인에 추가합니다. FTS5를 사용하지 않으면 아무것도 하지 않습니다. (커밋하지 않음)
+    """
+    if not _has_fts_index(db):
+        return
+    db.execute(
+        text(f"INSERT INTO {ARCHIVE_FTS_TABLE}(rowid, text) VALUES (:id, :text)"),
+        {"id": archive_id, "text": "\n".join(m["text"] or "" for m in messages)},
+    )
+
+def _query_terms(query: str) -> List[str]:
+    return re.findall(r"\w+", query)[:MAX_QUERY_TERMS]
+
+def build_match_query(terms: List[str]) -> str:
+    # 각 단어를 따옴표로 감싸 FTS5 연산자로 해석되지 않게 하고, 접두어 검색으로 AND 결합합니다.
+    return " ".join(f'"{term}"*' for term in terms)
+
+_fts_ready = False
+
+def _has_fts_index(db: Session) -> bool:
+    global _fts_ready
+    if not _fts_ready and db.get_bind().dialect.name == "sqlite":
+        found = db.execute(
+            text("SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name IN :names")
+            .bindparams(bindparam("names", expanding=True)),
+            {"names": [*FTS_TABLES, ARCHIVE_FTS_TABLE]},
+        ).scalar()
+        _fts_ready = found == len(FTS_TABLES) + 1
+    return _fts_ready
+
+def search(db: Session, query: str, roadmap_id: Optional[int] = None, kind: Optional[str] = None,
+           limit: int = 20) -> Optional[List[SearchHit]]:
+    """
+    채팅 내역(보관된 대화 포함)과 미션(제목/테마)을 검색하여 관련도순으로 반환합니다.
+    검색할 단어가 없으면 None을 반환합니다.
+    """
+    terms = _query_terms(query)
+    if not terms:
+        return None
+    if _has_fts_index(db):
+        return _search_fts(db, terms, roadmap_id, kind, limit)
+    if db.get_bind().dialect.name == "postgresql":
+        return _search_pg(db, terms, roadmap_id, kind, limit)
+    return _search_like(db, terms, roadmap_id, kind, limit)
+
+def _search_fts(db: Session, terms: List[str], roadmap_id: Optional[int], kind: Optional[str],
+                limit: int) -> List[SearchHit]:
+    roadmap_filter = "AND r.id = :roadmap_id" if roadmap_id is not None else ""
+    selects = []
+    if kind in (None, "chat"):
+        selects.append(f"""
+            SELECT 'chat' AS kind, c.id AS id, c.roadmap_id AS roadmap_id, r.project_title AS roadmap_title,
+                   snippet(chat_history_fts, 0, :open, :close, :ellipsis, :tokens) AS snippet,
+                   -bm25(chat_history_fts) AS score,
+                   c.role AS role, c.created_at AS created_at,
+                   NULL AS mission_key, NULL AS week, NULL AS title, NULL AS is_completed
+            FROM chat_history_fts
+            JOIN chat_history c ON c.id = chat_history_fts.rowid
+            JOIN roadmaps r ON r.id = c.roadmap_id
+            WHERE chat_history_fts MATCH :match {roadmap_filter}
+        """)
+    if kind in (None, "mission"):
+        selects.append(f"""
+            SELECT 'mission' AS kind, m.id AS id, m.roadmap_id AS roadmap_id, r.project_title AS roadmap_title,
+                   snippet(missions_fts, -1, :open, :close, :ellipsis, :tokens) AS snippet,
+                   -bm25(missions_fts, {MISSION_TITLE_WEIGHT}, {MISSION_THEME_WEIGHT}) AS score,
+                   NULL AS role, NULL AS created_at,
+                   m.mission_key AS mission_key, m.week AS week, m.title AS title, m.is_completed AS is_completed
+            FROM missions_fts
+            JOIN missions m ON m.id = missions_fts.rowid
+            JOIN roadmaps r ON r.id = m.roadmap_id
+            WHERE missions_fts MATCH :match {roadmap_filter}
+        """)
+    sql = " UNION ALL ".join(selects) + " ORDER BY score DESC LIMIT :limit"
+    hits = [SearchHit(**row) for row in db.execute(text(sql), {
+        "match": build_match_query(terms),
+        "roadmap_id": roadmap_id,
+        "open": SNIPPET_OPEN,
+        "close": SNIPPET_CLOSE,
+        "ellipsis": SNIPPET_ELLIPSIS,
+        "tokens": SNIPPET_TOKENS,
+        "limit": limit,
+    }).mappings()]
+    if kind in (None, "chat"):
+        hits.extend(_search_archives_fts(db, terms, roadmap_id, limit))
+        hits.sort(key=lambda hit: hit.score, reverse=True)
+    return hits[:limit]
+
+def _archived_messages(archive: models.ChatArchive, terms: List[str], word_prefix: bool = False) -> Iterator[dict]:
+    """
+    보관 세그먼트의 압축을 풀어 모든 단어를 포함하는 메시지를 최신순으로 반환합니다.
+    word_prefix이면 FTS5 접두어 검색처럼 단어의 시작 부분만 일치로 봅니다. (아니면 LIKE처럼 부분 일치)
+    """
+    boundary = r"(?<!\w)" if word_prefix else ""
+    patterns = [re.compile(boundary + re.escape(term), re.IGNORECASE) for term in terms]
+    for message in reversed(decode_segment(archive)):
+        if all(pattern.search(message["text"] or "") for pattern in patterns):
+            yield message
+
+def _archived_hit(archive: models.ChatArchive, roadmap_title: Optional[str], message: dict, terms: List[str],
+                  score: float) -> SearchHit:
+    return SearchHit(
+        kind="chat", id=message["id"], roadmap_id=archive.roadmap_id, roadmap_title=roadmap_title,
+        snippet=make_snippet(message["text"], terms), score=score, role=message["role"],
+        created_at=message["created_at"],
+    )
+
+def _search_archives_fts(db: Session, terms: List[str], roadmap_id: Optional[int], limit: int) -> List[SearchHit]:
+    # 색인은 세그먼트 단위이므로 일치한 세그먼트만 관련도순으로 풀어 메시지 단위로 다시 확인합니다.
+    roadmap_filter = "AND a.roadmap_id = :roadmap_id" if roadmap_id is not None else ""
+    rows = db.execute(text(f"""
+        SELECT a.id AS id, r.project_title AS roadmap_title, -bm25({ARCHIVE_FTS_TABLE}) AS score
+        FROM {ARCHIVE_FTS_TABLE}
+        JOIN chat_archives a ON a.id = {ARCHIVE_FTS_TABLE}.rowid
+        JOIN roadmaps r ON r.id = a.roadmap_id
+        WHERE {ARCHIVE_FTS_TABLE} MATCH :match {roadmap_filter}
+        ORDER BY score DESC LIMIT :limit
+    """), {"match": build_match_query(terms), "roadmap_id": roadmap_id, "limit": limit}).all()
+
+    hits: List[SearchHit] = []
+    for row in rows:
+        archive = db.get(models.ChatArchive, row.id)
+        messages = islice(_archived_messages(archive, terms, word_prefix=True), limit - len(hits))
+        hits.extend(_archived_hit(archive, row.roadmap_title, message, terms, row.score) for message in messages)
+        if len(hits) >= limit:
+            break
+    return hits
+
+def make_snippet(value: Optional[str], terms: List[str]) -> str:
+    """
+    첫 번째로 일치한 단어 주변만 잘라 일치한 단어를 강조합니다. (LIKE 대체 경로)
+    """
+    value = value or ""
+    pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
+    match = pattern.search(value)
+    if not match:
+        return value[:SNIPPET_CONTEXT_CHARS * 2]
+    start = max(0, match.start() - SNIPPET_CONTEXT_CHARS)
+    end = min(len(value), match.end() + SNIPPET_CONTEXT_CHARS)
+    excerpt = pattern.sub(lambda m: f"{SNIPPET_OPEN}{m.group(0)}{SNIPPET_CLOSE}", value[start:end])
+    return f"{SNIPPET_ELLIPSIS if start > 0 else ''}{excerpt}{SNIPPET_ELLIPSIS if end < len(value) else ''}"
+
+def like_score(value: Optional[str], terms: List[str], weight: float = 1.0) -> float:
+    """
+    LIKE 대체 경로의 관련도: 본문 단어 수 대비 검색어 등장 횟수 (짧은 본문에서 여러 번 일치할수록 높음)
+    """
+    value = value or ""
+    words = max(1, len(re.findall(r"\w+", value)))
+    occurrences = sum(len(re.findall(re.escape(term), value, re.IGNORECASE)) for term in terms)
+    return weight * occurrences / words
+
+def _mission_hit(mission: models.Mission, roadmap_title: Optional[str], terms: List[str], score: float) -> SearchHit:
+    return SearchHit(
+        kind="mission", id=mission.id, roadmap_id=mission.roadmap_id, roadmap_title=roadmap_title,
+        snippet=make_snippet(f"{mission.title} · {mission.theme}", terms), score=score,
+        mission_key=mission.mission_key, week=mission.week, title=mission.title,
+        is_completed=mission.is_completed,
+    )
+
+def _recent_archived_messages(db: Session, terms: List[str], roadmap_id: Optional[int], limit: int,
+                              word_prefix: bool = False) -> List[Tuple[models.ChatArchive, Optional[str], dict]]:
+    # 보관 세그먼트는 색인이 없으므로 최신 세그먼트부터 풀어 limit개가 찰 때까지 확인합니다.
+    Roadmap = models.Roadmap
+    archives = (
+        db.query(models.ChatArchive, Roadmap.project_title)
+        .join(Roadmap, Roadmap.id == models.ChatArchive.roadmap_id)
+    )
+    if roadmap_id is not None:
+        archives = archives.filter(models.ChatArchive.roadmap_id == roadmap_id)
+    found = []
+    for archive, roadmap_title in archives.order_by(models.ChatArchive.last_chat_id.desc()).yield_per(10):
+        if len(found) >= limit:
+            break
+        messages = islice(_archived_messages(archive, terms, word_prefix), limit - len(found))
+        found.extend((archive, roadmap_title, message) for message in messages)
+    return found
+
+def _top_hits(hits: List[SearchHit], limit: int) -> List[SearchHit]:
+    # 출처(대화/미션)별 후보를 합쳐 관련도순(같으면 최신순)으로 자릅니다.
+    hits.sort(key=lambda hit: (hit.score, hit.id), reverse=True)
+    return hits[:limit]
+
+def _search_like(db: Session, terms: List[str], roadmap_id: Optional[int], kind: Optional[str],
+                 limit: int) -> List[SearchHit]:
+    # FTS 색인이 없는 백엔드에서는 출처마다 모든 단어를 포함하는 최신 행을 limit개까지 후보로 모아
+    # like_score(미션 제목은 MISSION_TITLE_WEIGHT, 테마는 MISSION_THEME_WEIGHT 가중)로 정렬합니다.
+    hits: List[SearchHit] = []
+    Roadmap, ChatHistory, Mission = models.Roadmap, models.ChatHistory, models.Mission
+
+    if kind in (None, "chat"):
+        query = (
+            db.query(ChatHistory, Roadmap.project_title)
+            .join(Roadmap, Roadmap.id == ChatHistory.roadmap_id)
+            .filter(and_(*[ChatHistory.text.ilike(f"%{term}%") for term in terms]))
+        )
+        if roadmap_id is not None:
+            query = query.filter(ChatHistory.roadmap_id == roadmap_id)
+        chat_hits = [
+            SearchHit(
+                kind="chat", id=chat.id, roadmap_id=chat.roadmap_id, roadmap_title=roadmap_title,
+                snippet=make_snippet(chat.text, terms), score=like_score(chat.text, terms),
+                role=chat.role, created_at=chat.created_at,
+            )
+            for chat, roadmap_title in query.order_by(ChatHistory.id.desc()).limit(limit)
+        ]
+        # 보관된 대화는 남은 대화보다 오래되었으므로, 부족한 만큼만 확인합니다.
+        if len(chat_hits) < limit:
+            chat_hits.extend(
+                _archived_hit(archive, roadmap_title, message, terms, like_score(message["text"], terms))
+                for archive, roadmap_title, message in _recent_archived_messages(
+                    db, terms, roadmap_id, limit - len(chat_hits)
+                )
+            )
+        hits.extend(chat_hits)
+
+    if kind in (None, "mission"):
+        query = (
+            db.query(Mission, Roadmap.project_title)
+            .join(Roadmap, Roadmap.id == Mission.roadmap_id)
+            .filter(and_(*[
+                or_(Mission.title.ilike(f"%{term}%"), Mission.theme.ilike(f"%{term}%")) for term in terms
+            ]))
+        )
+        if roadmap_id is not None:
+            query = query.filter(Mission.roadmap_id == roadmap_id)
+        for mission, roadmap_title in query.order_by(Mission.id.desc()).limit(limit):
+            score = (
+                like_score(mission.title, terms, MISSION_TITLE_WEIGHT)
+                + like_score(mission.theme, terms, MISSION_THEME_WEIGHT)
+            )
+            hits.append(_mission_hit(mission, roadmap_title, terms, score))
+    return _top_hits(hits, limit)
+
+def build_tsquery(terms: List[str]) -> str:
+    # 각 단어를 따옴표로 감싼 접두어 검색(:*)을 AND로 결합합니다. (FTS5 build_match_query와 같은 의미)
+    return " & ".join(f"'{term}':*" for term in terms)
+
+def _search_pg(db: Session, terms: List[str], roadmap_id: Optional[int], kind: Optional[str],
+               limit: int) -> List[SearchHit]:
+    # PostgreSQL: to_tsvector GIN 색인으로 일치하는 행을 찾고 ts_rank로 정렬합니다.
+    # 대화와 미션은 각각 limit개까지 후보를 가져와 합친 뒤 관련도순으로 자릅니다.
+    params = {"tsquery": build_tsquery(terms), "roadmap_id": roadmap_id, "limit": limit}
+    hits: List[SearchHit] = []
+
+    if kind in (None, "chat"):
+        roadmap_filter = "AND c.roadmap_id = :roadmap_id" if roadmap_id is not None else ""
+        rows = db.execute(text(f"""
+            SELECT c.id AS id, c.roadmap_id AS roadmap_id, r.project_title AS roadmap_title,
+                   c.role AS role, c.created_at AS created_at, c.text AS text,
+                   ts_rank({PG_RANK_WEIGHTS}, {PG_CHAT_TSVECTOR}, q) AS score
+            FROM chat_history c
+            JOIN roadmaps r ON r.id = c.roadmap_id
+            CROSS JOIN to_tsquery('simple', :tsquery) q
+            WHERE {PG_CHAT_TSVECTOR} @@ q {roadmap_filter}
+            ORDER BY score DESC, c.id DESC LIMIT :limit
+        """), params).all()
+        chat_hits = [
+            SearchHit(
+                kind="chat", id=row.id, roadmap_id=row.roadmap_id, roadmap_title=row.roadmap_title,
+                snippet=make_snippet(row.text, terms), score=row.score, role=row.role, created_at=row.created_at,
+            )
+            for row in rows
+        ]
+        if len(chat_hits) < limit:
+            archived = _recent_archived_messages(db, terms, roadmap_id, limit - len(chat_hits), word_prefix=True)
+            scores = _rank_texts_pg(db, [message["text"] for _, _, message in archived], params["tsquery"])
+            chat_hits.extend(
+                _archived_hit(archive, roadmap_title, message, terms, score)
+                for (archive, roadmap_title, message), score in zip(archived, scores)
+            )
+        hits.extend(chat_hits)
+
+    if kind in (None, "mission"):
+        roadmap_filter = "AND roadmap_id = :roadmap_id" if roadmap_id is not None else ""
+        rows = db.execute(text(f"""
+            SELECT id, ts_rank(
+                       {PG_RANK_WEIGHTS},
+                       setweight(to_tsvector('simple', coalesce(title, '')), 'A')
+                       || setweight(to_tsvector('simple', coalesce(theme, '')), 'B'),
+                       q
+                   ) AS score
+            FROM missions
+            CROSS JOIN to_tsquery('simple', :tsquery) q
+            WHERE {PG_MISSION_TSVECTOR} @@ q {roadmap_filter}
+            ORDER BY score DESC, id DESC LIMIT :limit
+        """), params).all()
+        scores = {row.id: row.score for row in rows}
+        missions = (
+            db.query(models.Mission, models.Roadmap.project_title)
+            .join(models.Roadmap, models.Roadmap.id == models.Mission.roadmap_id)
+            .filter(models.Mission.id.in_(scores))
+        )
+        for mission, roadmap_title in missions:
+            hits.append(_mission_hit(mission, roadmap_title, terms, scores[mission.id]))
+    return _top_hits(hits, limit)
+
+def _rank_texts_pg(db: Session, texts: List[Optional[str]], tsquery: str) -> List[float]:
+    # 보관된 메시지도 같은 ts_rank로 점수를 매겨 남은 대화와 비교할 수 있게 합니다. (한 번의 쿼리)
+    if not texts:
+        return []
+    return db.execute(text(f"""
+        SELECT ts_rank({PG_RANK_WEIGHTS}, to_tsvector('simple', coalesce(u.body, '')), to_tsquery('simple', :tsquery))
+        FROM unnest(CAST(:texts AS text[])) WITH ORDINALITY AS u(body, position)
+        ORDER BY u.position
+    """), {"texts": texts, "tsquery": tsquery}).scalars().all()
@@ -0,0 +1,223 @@
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import BinaryIO, Dict, Optional, Tuple
+from app.core.config import settings
+from app.core.executor import run_upload
+from app.core.llm import get_genai
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+# 메모리에 보관할 최대 크기. 이보다 큰 업로드는 자동으로 디스크 임시 파일로 넘어갑니다.
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+# 원격 파일 만료 직전에는 재사용하지 않도록 두는 여유 시간
+EXPIRATION_MARGIN_SECONDS = 10 * 60
+
+@dataclass
+class ReferenceFile:
+    """
+    로드맵 생성에 사용할 참고 자료 파일입니다. 내용의 SHA-256 해시로 식별합니다.
+    """
+    fileobj: BinaryIO
+    sha256: str
+    size: int
+    mime_type: str
+    display_name: str
+
+    def close(self):
+        self.fileobj.close()
+
+def _guess_mime_type(filename: str, content_type: Optional[str] = None) -> str:
+    if content_type and content_type != "application/octet-stream":
+        return content_type
+    return mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+def spool_upload(source: BinaryIO, filename: str, content_type: Optional[str] = None) -> ReferenceFile:
+    """
+    업로드 스트림을 SpooledTemporaryFile로 복사하면서 동시에 SHA-256을 계산합니다.
+    작업 디렉토리에 임시 파일을 만들지 않고, 큰 파일만 OS 임시 디렉토리로 넘어갑니다.
+    """
+    digest = hashlib.sha256()
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    size = 0
+    while True:
+        chunk = source.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        digest.update(chunk)
+        spooled.write(chunk)
+        size += len(chunk)
+    spooled.seek(0)
+    return ReferenceFile(
+        fileobj=spooled,
+        sha256=digest.hexdigest(),
+        size=size,
+        mime_type=_guess_mime_type(filename, content_type),
+        display_name=filename,
+    )
+
+def open_reference_file(path: str) -> ReferenceFile:
+    """
+    디스크에 보관된 업로드 파일(예: 작업 큐 파일)을 해시와 함께 엽니다.
+    """
+    with open(path, "rb") as source:
+        return spool_upload(source, os.path.basename(path))
+
+def _remote_expires_at(remote_file) -> Optional[float]:
+    expiration = getattr(remote_file, "expiration_time", None)
+    if not isinstance(expiration, datetime):
+        return None
+    if expiration.tzinfo is None:
+        expiration = expiration.replace(tzinfo=timezone.utc)
+    # time.monotonic() 기준으로 변환
+    return time.monotonic() + (expiration - datetime.now(timezone.utc)).total_seconds() - EXPIRATION_MARGIN_SECONDS
+
+def _upload_file(fileobj: BinaryIO, **kwargs):
+    return get_genai().upload_file(fileobj, **kwargs)
+
+async def upload_reference(reference: ReferenceFile):
+    """
+    참고 자료 파일을 Gemini에 업로드합니다. (캐시를 거치지 않음)
+    """
+    logger.info(f"Uploading file to Gemini: {reference.display_name} ({reference.size} bytes)")
+    reference.fileobj.seek(0)
+    return await run_upload(
+        _upload_file,
+        reference.fileobj,
+        mime_type=reference.mime_type,
+        display_name=reference.display_name,
+    )
+
+def delete_remote_file(remote_file):
+    try:
+        remote_file.delete()
+        logger.info(f"Deleted file from Gemini: {getattr(remote_file, 'name', '')}")
+    except Exception as e:
+        logger.error(f"Failed to delete file from Gemini: {e}")
+
+@dataclass
+class _UploadEntry:
+    expires_at: float
+    remote_file: object
+    # 원격 파일을 사용 중인 생성 요청 수와 캐시에서 빠졌는지 여부 (빠진 뒤 마지막 요청이 끝나면 삭제)
+    users: int = 0
+    retired: bool = False
+
+class UploadLease:
+    """
+    캐시된 원격 파일의 사용권입니다. 생성 요청이 파일을 다 쓰면 release()를 호출합니다. (여러 번 호출해도 안전)
+    """
+    def __init__(self, cache: "UploadCache", entry: _UploadEntry):
+        self.remote_file = entry.remote_file
+        self._cache = cache
+        self._entry = entry
+        self._released = False
+
+    async def release(self):
+        if not self._released:
+            self._released = True
+            await self._cache._release_lease(self._entry)
+
+class UploadCache:
+    """
+    내용 해시(SHA-256) → Gemini 업로드 파일 핸들 캐시입니다.
+    같은 교재를 다시 제출하면 업로드를 생략하고 아직 유효한 원격 파일을 재사용합니다.
+    TTL(및 원격 파일 만료 시각)이 지나거나 LRU로 밀려난 항목은 캐시에서 빼고,
+    그 파일을 쓰던 마지막 요청이 사용권을 반납할 때 원격 파일을 삭제합니다.
+    """
+    def __init__(self, maxsize: int, ttl_seconds: int):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, _UploadEntry]" = OrderedDict()
+        # 해시별 업로드 잠금과 대기 중인 요청 수 (기다리는 요청이 없으면 제거)
+        self._locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl_seconds > 0
+
+    @asynccontextmanager
+    async def _hash_lock(self, sha256: str):
+        lock, waiters = self._locks.get(sha256, (None, 0))
+        lock = lock or asyncio.Lock()
+        self._locks[sha256] = (lock, waiters + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, waiters = self._locks[sha256]
+            if waiters == 1:
+                del self._locks[sha256]
+            else:
+                self._locks[sha256] = (lock, waiters - 1)
+
+    def _retire(self, sha256: str) -> Optional[object]:
+        """
+        항목을 캐시에서 빼고, 사용 중인 요청이 없으면 삭제할 원격 파일을 반환합니다.
+        """
+        entry = self._entries.pop(sha256, None)
+        if entry is None:
+            return None
+        entry.retired = True
+        return entry.remote_file if entry.users == 0 else None
+
+    async def _delete(self, remote_files):
+        for remote_file in remote_files:
+            if remote_file is not None:
+                await run_upload(delete_remote_file, remote_file)
+
+    async def _release_lease(self, entry: _UploadEntry):
+        entry.users -= 1
+        if entry.retired and entry.users == 0:
+            await run_upload(delete_remote_file, entry.remote_file)
+
+    def _lease(self, entry: _UploadEntry) -> UploadLease:
+        entry.users += 1
+        return UploadLease(self, entry)
+
+    async def acquire(self, reference: ReferenceFile) -> UploadLease:
+        """
+        캐시에 유효한 원격 파일이 있으면 재사용하고, 없으면 업로드한 뒤 캐시에 등록합니다.
+        반환된 사용권은 생성이 끝난 뒤 release()로 반납해야 합니다.
+        """
+        async with self._hash_lock(reference.sha256):
+            entry = self._entries.get(reference.sha256)
+            if entry and time.monotonic() < entry.expires_at:
+                self._entries.move_to_end(reference.sha256)
+                logger.info(f"Reusing uploaded file for sha256={reference.sha256[:12]}")
+                return self._lease(entry)
+            await self._delete([self._retire(reference.sha256)])
+
+            remote_file = await upload_reference(reference)
+            expires_at = time.monotonic() + self.ttl_seconds
+            remote_expires_at = _remote_expires_at(remote_file)
+            if remote_expires_at is not None:
+                expires_at = min(expires_at, remote_expires_at)
+
+            entry = self._entries[reference.sha256] = _UploadEntry(expires_at, remote_file)
+            lease = self._lease(entry)
+            evicted = []
+            while len(self._entries) > self.maxsize:
+                evicted.append(self._retire(next(iter(self._entries))))
+        await self._delete(evicted)
+        return lease
+
+    async def discard(self, sha256: str):
+        """
+        원격 파일이 더 이상 유효하지 않은 것으로 보일 때 (예: 생성 실패) 캐시에서 제거합니다.
+        """
+        await self._delete([self._retire(sha256)])
+
+    async def clear(self):
+        await self._delete([self._retire(sha256) for sha256 in list(self._entries)])
+
+upload_cache = UploadCache(maxsize=settings.UPLOAD_CACHE_SIZE, ttl_seconds=settings.UPLOAD_CACHE_TTL_SECONDS)
@@ -1,6 +1,6 @@
 import React, { useState, useRef, useEffect } from 'react';
 import { Roadmap, ChatMessage } from '../types.ts';
-import { getChatResponse, reviewImage } from '../hooks/useGemini.ts';
+import { getChatHistory, getChatResponse, reviewImage } from '../hooks/useGemini.ts';
 import { PaperAirplaneIcon, PaperClipIcon, XMarkIcon, SparklesIcon } from './Icons.tsx';
 import ReactMarkdown from 'react-markdown';
 import remarkGfm from 'remark-gfm';
@@ -21,6 +21,27 @@ const Chat: React.FC<ChatProps> = ({ roadmap, messages, setMessages, onMissionCo
     const fileInputRef = useRef<HTMLInputElement>(null);
     const messagesEndRef = useRef<HTMLDivElement>(null);
     const textareaRef = useRef<HTMLTextAreaElement>(null);
+    // 이전 대화 페이지 커서 (상세 조회에는 최근 대화만 포함됨)
+    const [olderCursor, setOlderCursor] = useState<number | null>(roadmap.chat_cursor ?? null);
+    const [isLoadingOlder, setIsLoadingOlder] = useState(false);
+
+    useEffect(() => {
+        setOlderCursor(roadmap.chat_cursor ?? null);
+    }, [roadmap.id]);
+
+    const loadOlderMessages = async () => {
+        if (!roadmap.id || olderCursor === null) return;
+        setIsLoadingOlder(true);
+        try {
+            const page = await getChatHistory(roadmap.id, olderCursor);
+            setMessages(prev => [...page.messages, ...prev]);
+            setOlderCursor(page.next_before);
+        } catch (error) {
+            console.error("Failed to load older messages:", error);
+        } finally {
+            setIsLoadingOlder(false);
+        }
+    };
 
     // 자동 진행 트리거 감지
     useEffect(() => {
@@ -78,7 +99,7 @@ const Chat: React.FC<ChatProps> = ({ roadmap, messages, setMessages, onMissionCo
 
     useEffect(() => {
         messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
-    }, [messages]);
+    }, [messages[messages.length - 1]]); // 이전 대화를 앞에 붙일 때는 스크롤하지 않음
 
     // AI 응답 완료 후 입력창에 포커스
     useEffect(() => {
@@ -109,15 +130,6 @@ const Chat: React.FC<ChatProps> = ({ roadmap, messages, setMessages, onMissionCo
         }
     };
 
-    const fileToBase64 = (file: File): Promise<string> => {
-        return new Promise((resolve, reject) => {
-            const reader = new FileReader();
-            reader.readAsDataURL(file);
-            reader.onload = () => resolve((reader.result as string).split(',')[1]);
-            reader.onerror = error => reject(error);
-        });
-    };
-
     const handleSubmit = async (e: React.FormEvent) => {
         e.preventDefault();
         if (!input.trim() && !imageFile) return;
@@ -145,8 +157,7 @@ const Chat: React.FC<ChatProps> = ({ roadmap, messages, setMessages, onMissionCo
 
         try {
             if (imageFile) {
-                const base64Image = await fileToBase64(imageFile);
-                const result = await reviewImage(base64Image, imageFile.type, input);
+                const result = await reviewImage(imageFile, input);
                 setMessages(prev => prev.map(msg => msg.id === modelMessageId ? { ...msg, text: result.text, modelImage: result.modelImage } : msg));
             } else {
                 const currentWeek = roadmap.curriculum.find(w => w.missions.some(m => !m.is_completed)) || roadmap.curriculum[roadmap.curriculum.length - 1];
@@ -181,6 +192,13 @@ const Chat: React.FC<ChatProps> = ({ roadmap, messages, setMessages, onMissionCo
         <div className="flex flex-col h-full bg-gray-800/50">
             <div className="flex-grow p-4 overflow-y-auto">
                 <div className="space-y-6 max-w-4xl mx-auto">
+                    {olderCursor !== null && (
+                        <div className="flex justify-center">
+                            <button onClick={loadOlderMessages} disabled={isLoadingOlder} className="text-sm text-gray-400 hover:text-gray-200 disabled:opacity-50">
+                                {isLoadingOlder ? '불러오는 중...' : '이전 대화 더 보기'}
+                            </button>
+                        </div>
+                    )}
                     {messages.map((msg) => {
                         // 빈 메시지(로딩 중인 상태)는 렌더링하지 않음 (별도 로딩 UI가 처리)
                         if (msg.role === 'model' && !msg.text && !msg.modelImage) return null;
@@ -189,11 +207,11 @@ const Chat: React.FC<ChatProps> = ({ roadmap, messages, setMessages, onMissionCo
                             <div key={msg.id} className={`flex items-end gap-3 ${msg.role === 'user' ? 'justify-end' : 'justify-start'}`}>
                                 {msg.role === 'model' && <div className="w-8 h-8 rounded-full bg-purple-500 flex items-center justify-center flex-shrink-0"><SparklesIcon className="w-5 h-5 text-white"/></div>}
                                 <div className={`max-w-xl p-4 rounded-2xl ${msg.role === 'user' ? 'bg-blue-600 text-white rounded-br-lg' : 'bg-gray-700 text-gray-200 rounded-bl-lg'}`}>
-                                    {msg.image && <img src={msg.image} alt="사용자 업로드" className="rounded-lg mb-2 max-h-60" />}
+                                    {msg.image && <img src={msg.image} alt="사용자 업로드" loading="lazy" className="rounded-lg mb-2 max-h-60" />}
                                     <div className="prose prose-invert prose-sm max-w-none">
                                         <ReactMarkdown remarkPlugins={[remarkGfm]}>{msg.text}</ReactMarkdown>
                                     </div>
-                                    {msg.modelImage && <img src={msg.modelImage} alt="모델 생성 이미지" className="rounded-lg mt-2 max-h-60" />}
+                                    {msg.modelImage && <img src={msg.modelImage} alt="모델 생성 이미지" loading="lazy" className="rounded-lg mt-2 max-h-60" />}
                                 </div>
                             </div>
                         );
@@ -1,18 +1,21 @@
 
-import { Roadmap, ChatMessage, RoadmapWithHistory, RoadmapSummary } from '../types.ts';
+import { Roadmap, ChatMessage, RoadmapWithHistory, RoadmapSummary, ChatHistoryPage, SearchResponse } from '../types.ts';
 
 // FastAPI 백엔드 서버의 주소
 // 배포 환경에서는 같은 도메인에서 서빙되므로 상대 경로 사용
 // 로컬 개발 환경에서는 Vite 프록시 설정을 사용하거나 환경 변수로 설정 가능
 const BASE_URL = import.meta.env.VITE_API_BASE_URL || '/api/v1';
 
+// 로드맵 목록 한 번에 받아올 개수 (서버 최대값)
+const ROADMAP_PAGE_SIZE = 200;
+
 /**
- * API 요청을 위한 헬퍼 함수
+ * API 요청을 위한 헬퍼 함수 (응답 헤더가 필요한 경우)
  * @param endpoint API 엔드포인트 경로
  * @param options fetch 요청 옵션
- * @returns Promise<T>
+ * @returns Promise<{ data: T, headers: Headers }>
  */
-async function fetchAPI<T>(endpoint: string, options: RequestInit = {}): Promise<T> {
+async function fetchAPIWithHeaders<T>(endpoint: string, options: RequestInit = {}): Promise<{ data: T, headers: Headers }> {
     try {
         const headers: HeadersInit = {
             ...options.headers,
@@ -32,7 +35,7 @@ async function fetchAPI<T>(endpoint: string, options: RequestInit = {}): Promise
             const errorData = await response.json().catch(() => ({ message: response.statusText }));
             throw new Error(errorData.detail || errorData.message || 'API 요청에 실패했습니다.');
         }
-        return await response.json();
+        return { data: await response.json(), headers: response.headers };
     } catch (error) {
         console.error(`API Error at ${endpoint}:`, error);
         if (error instanceof Error) {
@@ -42,6 +45,17 @@ async function fetchAPI<T>(endpoint: string, options: RequestInit = {}): Promise
     }
 }
 
+/**
+ * API 요청을 위한 헬퍼 함수
+ * @param endpoint API 엔드포인트 경로
+ * @param options fetch 요청 옵션
+ * @returns Promise<T>
+ */
+async function fetchAPI<T>(endpoint: string, options: RequestInit = {}): Promise<T> {
+    const { data } = await fetchAPIWithHeaders<T>(endpoint, options);
+    return data;
+}
+
 export const generateRoadmap = async (goal: string, level: string, duration: number, frequency: string, file?: File | null): Promise<Roadmap> => {
     const formData = new FormData();
     formData.append('goal', goal);
@@ -60,13 +74,34 @@ export const generateRoadmap = async (goal: string, level: string, duration: num
 };
 
 export const getAllRoadmaps = async (): Promise<RoadmapSummary[]> => {
-    return fetchAPI<RoadmapSummary[]>('/roadmaps', { method: 'GET' });
+    // 목록은 페이지 단위로 내려오므로 X-Next-Cursor 헤더가 없을 때까지 이어서 조회합니다.
+    const roadmaps: RoadmapSummary[] = [];
+    let cursor: string | null = null;
+    do {
+        const params = new URLSearchParams({ limit: String(ROADMAP_PAGE_SIZE) });
+        if (cursor) params.append('cursor', cursor);
+        const { data, headers } = await fetchAPIWithHeaders<RoadmapSummary[]>(`/roadmaps?${params.toString()}`, { method: 'GET' });
+        roadmaps.push(...data);
+        cursor = headers.get('X-Next-Cursor');
+    } while (cursor);
+    return roadmaps;
 };
 
 export const getRoadmapDetail = async (id: number): Promise<RoadmapWithHistory> => {
     return fetchAPI<RoadmapWithHistory>(`/roadmap/${id}`, { method: 'GET' });
 };
 
+export const getChatHistory = async (roadmapId: number, before: number): Promise<ChatHistoryPage> => {
+    return fetchAPI<ChatHistoryPage>(`/roadmap/${roadmapId}/chats?before=${before}`, { method: 'GET' });
+};
+
+export const searchHistory = async (query: string, roadmapId?: number): Promise<SearchResponse> => {
+    // 지난 대화와 미션을 서버에서 검색합니다. (roadmapId가 있으면 해당 로드맵만)
+    const params = new URLSearchParams({ q: query });
+    if (roadmapId !== undefined) params.append('roadmap_id', String(roadmapId));
+    return fetchAPI<SearchResponse>(`/search?${params.toString()}`, { method: 'GET' });
+};
+
 export const completeMission = async (roadmapId: number, missionKey: string): Promise<{ status: string, roadmap_id: number, mission_key: string }> => {
     return fetchAPI<{ status: string, roadmap_id: number, mission_key: string }>(`/roadmap/${roadmapId}/mission/${missionKey}/complete`, {
         method: 'PUT',
@@ -83,8 +118,8 @@ export const getChatResponse = async (history: ChatMessage[], currentContext: st
 
     return fetchAPI<ChatMessage>('/chat', {
         method: 'POST',
+        // 대화 내역은 서버가 roadmap_id 기준으로 재구성하므로 현재 메시지만 전송합니다.
         body: JSON.stringify({
-            history: history,
             context: currentContext,
             message: lastUserMessage.text,
             roadmap_id: roadmapId
@@ -92,9 +127,14 @@ export const getChatResponse = async (history: ChatMessage[], currentContext: st
     });
 };
 
-export const reviewImage = async (base64Image: string, mimeType: string, prompt: string): Promise<{ text: string; modelImage?: string }> => {
-    return fetchAPI<{ text: string; modelImage?: string }>('/review', {
+export const reviewImage = async (image: File, prompt: string): Promise<{ text: string; modelImage?: string }> => {
+    // 이미지 원본을 multipart로 전송합니다. (Base64 인코딩 없이 전송, 서버에서 축소/재인코딩)
+    const formData = new FormData();
+    formData.append('image', image);
+    formData.append('prompt', prompt);
+
+    return fetchAPI<{ text: string; modelImage?: string }>('/review/upload', {
         method: 'POST',
-        body: JSON.stringify({ base64Image, mimeType, prompt }),
+        body: formData,
     });
-};
+};
\ No newline at end of file
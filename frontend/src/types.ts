@@ -15,11 +15,17 @@ export interface Roadmap {
     id?: number;
     project_title: string;
     curriculum: Curriculum[];
+    chat_cursor?: number | null; // 상세 조회 시 이전 대화 페이지 커서
 }
 
 export interface RoadmapWithHistory extends Roadmap {
     id: number;
-    chat_history: ChatMessage[];
+    chat_history: ChatMessage[]; // 최근 대화만 포함
+}
+
+export interface ChatHistoryPage {
+    messages: ChatMessage[];
+    next_before: number | null; // 더 오래된 대화가 있으면 다음 요청의 before 값
 }
 
 export interface RoadmapSummary {
@@ -30,12 +36,33 @@ export interface RoadmapSummary {
     created_at: string;
     total_missions: number;
     completed_missions: number;
+    week_progress?: Record<string, { completed: number; total: number }>;
 }
 
 export interface ChatMessage {
     id: string;
     role: 'user' | 'model';
     text: string;
-    image?: string; // base64 data URL for display
-    modelImage?: string; // base64 data URL from model
+    image?: string; // image URL (/api/v1/blobs/...) or local data URL preview
+    modelImage?: string; // image URL from model
+}
+
+export interface SearchHit {
+    kind: 'chat' | 'mission';
+    id: number;
+    roadmap_id: number;
+    roadmap_title?: string | null;
+    snippet: string; // 일치한 단어를 **로 강조한 본문 일부 (Markdown)
+    score: number;
+    role?: 'user' | 'model' | null;
+    created_at?: string | null;
+    mission_key?: string | null;
+    week?: number | null;
+    title?: string | null;
+    is_completed?: boolean | null;
+}
+
+export interface SearchResponse {
+    query: string;
+    results: SearchHit[];
 }
@@ -1,15 +1,16 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
+from contextlib import asynccontextmanager
+import asyncio
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
 import os
 import logging
 from logging.handlers import RotatingFileHandler
-from app.core.database import engine, Base
-from app import models
-
-# DB 테이블 생성 (존재하지 않을 경우)
-Base.metadata.create_all(bind=engine)
+from app.core.database import dispose_engines, engine
+from app.core.llm import warm_up_llm
+from app.core.config import settings
+from app.core.metrics import MetricsMiddleware
+from app.core.migrations import upgrade_schema
+from app.core.static_site import static_site
 
 # --- Logging Configuration ---
 handlers = [logging.StreamHandler()] # 기본적으로 콘솔 출력은 항상 활성화
@@ -36,8 +37,30 @@ logging.getLogger("watchfiles").setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 logger.info("Initializing AI Coach Server...")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 시작 시: DB 테이블 생성 및 새로 추가된 컬럼 반영 (스키마 지문이 같으면 건너뜀)
+    upgrade_schema(engine)
+    # 로드맵 생성 작업 워커 시작 (중단되었던 작업 복구 포함)
+    from app.services.plan_jobs import plan_job_queue
+    from app.services.chat_log import chat_log_writer
+    await chat_log_writer.start()
+    await plan_job_queue.start()
+    # 프론트엔드 빌드 매니페스트 (파일 목록, ETag, 압축본을 한 번만 만듦)
+    static_site.load()
+    # Gemini SDK 임포트/설정은 요청을 받기 시작한 뒤 백그라운드에서 진행합니다.
+    warm_up = asyncio.create_task(warm_up_llm())
+    yield
+    warm_up.cancel()
+    # 종료 시: 워커 정리, 쓰기 큐에 남은 채팅 기록 커밋
+    await plan_job_queue.stop()
+    await chat_log_writer.stop()
+    from app.services.blob_store import blob_store
+    blob_store.close()
+    await dispose_engines()
+
 # FastAPI 앱 인스턴스 생성
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # CORS 미들웨어 설정
 origins = [
@@ -50,26 +73,37 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # 목록 API의 다음 페이지 커서를 브라우저에서 읽을 수 있도록 노출합니다.
+    expose_headers=["X-Next-Cursor"],
 )
 
+# 요청/단계별 지연, 진행 중 요청 수, 오류 수 기록 (/metrics로 노출)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # app/api 폴더의 라우터들을 포함합니다.
-from app.api import plan, chat, review, roadmap
+from app.api import plan, chat, review, roadmap, blobs, search, metrics
 
 # 각 라우터를 "/api/v1" 접두사와 함께 앱에 추가합니다.
 app.include_router(plan.router, prefix="/api/v1", tags=["Plan"])
 app.include_router(chat.router, prefix="/api/v1", tags=["Chat"])
 app.include_router(review.router, prefix="/api/v1", tags=["Review"])
 app.include_router(roadmap.router, prefix="/api/v1", tags=["Roadmap"])
+app.include_router(blobs.router, prefix="/api/v1", tags=["Blobs"])
+app.include_router(search.router, prefix="/api/v1", tags=["Search"])
 
-# --- Frontend Serving ---
+# Prometheus 스크레이프 엔드포인트 (SPA catch-all보다 먼저 등록)
+if settings.METRICS_ENABLED:
+    app.include_router(metrics.router)
 
-# 1. Static Assets (JS, CSS, Images from Vite build)
-if os.path.isdir("static/assets"):
-    app.mount("/assets", StaticFiles(directory="static/assets"), name="assets")
+# --- Frontend Serving ---
+# 시작 시 만든 static/ 매니페스트에서 응답합니다. (요청마다 파일 시스템을 확인하지 않음)
+# - 해시가 붙은 Vite 빌드 파일(assets/*)은 immutable로 영구 캐시
+# - index.html 등은 ETag로 재검증 (304)
+# - 압축본(br/gzip)은 Accept-Encoding에 따라 선택
 
-# 2. SPA Catch-all Route
-@app.get("/{full_path:path}")
-async def serve_react_app(full_path: str):
+@app.api_route("/{full_path:path}", methods=["GET", "HEAD"])
+async def serve_react_app(full_path: str, request: Request):
     """
     Serve the React application.
     Any path not handled by API routers above will fall through to here.
@@ -79,16 +113,14 @@ async def serve_react_app(full_path: str):
     if full_path.startswith("api/"):
         return {"error": "API endpoint not found"}
 
-    # 실제 파일이 존재하는지 확인 (예: favicon.ico, metadata.json 등)
-    file_path = os.path.join("static", full_path)
-    if os.path.isfile(file_path):
-        return FileResponse(file_path)
-    
-    # 루트 경로("/")이거나 존재하지 않는 경로인 경우 index.html 반환 (SPA)
-    index_path = "static/index.html"
-    if os.path.exists(index_path):
-        return FileResponse(index_path)
-    
+    # 실제 파일(favicon.ico, metadata.json, assets/* 등)이 있으면 그 파일을,
+    # 루트 경로("/")이거나 존재하지 않는 경로이면 index.html을 반환 (SPA)
+    asset = static_site.lookup(full_path)
+    if asset is not None:
+        return static_site.response(request, asset)
+    if full_path.startswith("assets/"):
+        raise HTTPException(status_code=404, detail="Not Found")
+
     return {"message": "Frontend build not found. Please run 'npm run build' in 'frontend' directory."}
 
 if __name__ == "__main__":
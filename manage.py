@@ -0,0 +1,130 @@
+"""
+운영용 관리 명령어.
+
+사용법:
+    python manage.py migrate
+    python manage.py migrate-images [--batch-size 100]
+    python manage.py check-progress [--fix]
+    python manage.py rebuild-search
+    python manage.py compact-chats [--max-age-days 30] [--keep-recent 200] [--vacuum]
+    python manage.py compress-static [--root static]
+"""
+import argparse
+import logging
+
+from app.core.database import SessionLocal, engine
+from app.core.migrations import upgrade_schema
+
+logger = logging.getLogger(__name__)
+
+def migrate(args):
+    """스키마 지문과 관계없이 DB 스키마 확인/갱신을 실행합니다."""
+    upgrade_schema(engine, force=True)
+    print("Database schema is up to date.")
+
+def migrate_images(args):
+    """chat_history의 Base64 이미지를 블롭 저장소로 옮기고 URL로 바꿉니다."""
+    from app.services.blob_store import migrate_chat_images
+
+    db = SessionLocal()
+    try:
+        converted = migrate_chat_images(db, batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(f"Migrated images of {converted} chat messages.")
+
+def check_progress(args):
+    """로드맵 진행률 카운터를 미션 행과 비교하고, --fix이면 다시 계산합니다."""
+    from app.services.progress import check_progress as check
+
+    db = SessionLocal()
+    try:
+        mismatched = check(db, fix=args.fix)
+    finally:
+        db.close()
+    if not mismatched:
+        print("All progress counters are consistent.")
+        return
+    action = "Rebuilt" if args.fix else "Inconsistent"
+    print(f"{action} progress counters for {len(mismatched)} roadmaps: {mismatched}")
+    if not args.fix:
+        raise SystemExit(1)
+
+def rebuild_search(args):
+    """채팅 내역과 미션의 전문 검색 색인(FTS5)을 다시 만듭니다."""
+    from app.services.search import rebuild_search_index
+
+    if rebuild_search_index(engine):
+        print("Rebuilt full-text search index.")
+    else:
+        print("Full-text search index does not need rebuilding on this database (PostgreSQL GIN or LIKE search).")
+
+def compact_chats(args):
+    """요약에 반영된 오래된 채팅 메시지를 압축하여 보관 테이블(chat_archives)로 옮깁니다."""
+    from app.services.chat_archive import compact_chat_history
+
+    db = SessionLocal()
+    try:
+        roadmaps, messages = compact_chat_history(
+            db, max_age_days=args.max_age_days, keep_recent=args.keep_recent, segment_size=args.segment_size
+        )
+    finally:
+        db.close()
+    print(f"Archived {messages} chat messages of {roadmaps} roadmaps.")
+
+    if args.vacuum:
+        if engine.dialect.name != "sqlite":
+            print("--vacuum is only needed on SQLite (PostgreSQL reuses the space via autovacuum).")
+            return
+        # 삭제된 행의 빈 페이지는 이후 쓰기에 재사용되지만, 파일 크기를 줄이려면 VACUUM이 필요합니다.
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql("VACUUM")
+        print("Vacuumed the database file.")
+
+def compress_static(args):
+    """프론트엔드 빌드 파일의 gzip/brotli 압축본(.gz/.br)을 미리 만듭니다. (Docker 빌드 단계용)"""
+    from app.core.static_site import brotli, precompress_static
+
+    written = precompress_static(args.root)
+    print(f"Wrote {written} precompressed files under {args.root}.")
+    if brotli is None:
+        print("brotli is not installed; only gzip files were written.")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help=migrate.__doc__)
+    migrate_parser.set_defaults(func=migrate, upgrade_schema=False)
+
+    images = subparsers.add_parser("migrate-images", help=migrate_images.__doc__)
+    images.add_argument("--batch-size", type=int, default=100)
+    images.set_defaults(func=migrate_images)
+
+    progress = subparsers.add_parser("check-progress", help=check_progress.__doc__)
+    progress.add_argument("--fix", action="store_true", help="불일치한 카운터를 다시 계산합니다.")
+    progress.set_defaults(func=check_progress)
+
+    search = subparsers.add_parser("rebuild-search", help=rebuild_search.__doc__)
+    search.set_defaults(func=rebuild_search)
+
+    compact = subparsers.add_parser("compact-chats", help=compact_chats.__doc__)
+    compact.add_argument("--max-age-days", type=int, default=None, help="기본값: CHAT_ARCHIVE_AFTER_DAYS")
+    compact.add_argument("--keep-recent", type=int, default=None, help="기본값: CHAT_HOT_MAX_MESSAGES")
+    compact.add_argument("--segment-size", type=int, default=None, help="기본값: CHAT_ARCHIVE_SEGMENT_SIZE")
+    compact.add_argument("--vacuum", action="store_true", help="SQLite 파일에서 빈 페이지를 반환합니다.")
+    compact.set_defaults(func=compact_chats)
+
+    static = subparsers.add_parser("compress-static", help=compress_static.__doc__)
+    static.add_argument("--root", default="static")
+    # 빌드 단계에서 실행되므로 DB에 접속하지 않습니다.
+    static.set_defaults(func=compress_static, upgrade_schema=False)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    if getattr(args, "upgrade_schema", True):
+        upgrade_schema(engine)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
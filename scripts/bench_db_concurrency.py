@@ -0,0 +1,128 @@
+"""
+DB 동시성 벤치마크: 채팅 메시지 저장(쓰기)과 로드맵 상세 조회(읽기)를 동시에 실행하여 처리량을 비교합니다.
+- baseline: 기존 설정 (기본 rollback journal, PRAGMA 없음, 스레드)
+- tuned:    WAL 등 PRAGMA 적용 동기 엔진 (스레드)
+- async:    PRAGMA 적용 aiosqlite 엔진 + AsyncSession.run_sync (asyncio 태스크)
+
+사용법:
+    python scripts/bench_db_concurrency.py [--writers 4] [--readers 8] [--ops 200] [--modes baseline,tuned,async]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from app.core.database import Base, _set_sqlite_pragmas  # noqa: E402
+from app.api.roadmap import _build_roadmap_detail  # noqa: E402
+from app.services.chat_log import add_chat_message  # noqa: E402
+from app.services.roadmap_cache import touch_roadmap  # noqa: E402
+from app.services.roadmap_store import save_roadmap  # noqa: E402
+
+ROADMAP_DATA = {
+    "project_title": "Benchmark",
+    "curriculum": [
+        {
+            "week": week,
+            "theme": f"Week {week} theme",
+            "missions": [
+                {"id": f"w{week}_m{m}", "title": f"Mission {m} of week {week}", "is_completed": False}
+                for m in range(1, 6)
+            ],
+        }
+        for week in range(1, 9)
+    ],
+}
+
+def write_op(db, roadmap_id: int, i: int):
+    # 메시지 한 건마다 커밋 (쓰기 큐 없이 저장하는 경우)
+    add_chat_message(db, roadmap_id, "user", f"benchmark message {i}")
+    touch_roadmap(db, roadmap_id)
+    db.commit()
+
+def read_op(db, roadmap_id: int, i: int):
+    _build_roadmap_detail(db, roadmap_id, 30)
+
+def setup(url: str, tuned: bool):
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    if tuned:
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = session_factory()
+    try:
+        roadmap_id = save_roadmap(db, "goal", "level", 8, "daily", ROADMAP_DATA)
+    finally:
+        db.close()
+    return engine, session_factory, roadmap_id
+
+def run_threads(session_factory, roadmap_id: int, writers: int, readers: int, ops: int) -> float:
+    def worker(op):
+        db = session_factory()
+        try:
+            for i in range(ops):
+                op(db, roadmap_id, i)
+        finally:
+            db.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=writers + readers) as pool:
+        futures = [pool.submit(worker, write_op) for _ in range(writers)]
+        futures += [pool.submit(worker, read_op) for _ in range(readers)]
+        for future in futures:
+            future.result()
+    return time.perf_counter() - started
+
+async def run_async(url: str, roadmap_id: int, writers: int, readers: int, ops: int) -> float:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://", 1))
+    event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    session_factory = async_sessionmaker(engine, autoflush=False)
+
+    async def worker(op):
+        async with session_factory() as db:
+            for i in range(ops):
+                await db.run_sync(op, roadmap_id, i)
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *[worker(write_op) for _ in range(writers)],
+        *[worker(read_op) for _ in range(readers)],
+    )
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=200, help="작업자당 실행 횟수")
+    parser.add_argument("--modes", default="baseline,tuned,async")
+    args = parser.parse_args()
+
+    print(f"{'mode':>8} | {'writes/s':>10} | {'reads/s':>10} | {'total ops/s':>11}")
+    print("-" * 50)
+    for mode in args.modes.split(","):
+        with tempfile.TemporaryDirectory() as tmp:
+            url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            engine, session_factory, roadmap_id = setup(url, tuned=mode != "baseline")
+            if mode == "async":
+                engine.dispose()
+                elapsed = asyncio.run(run_async(url, roadmap_id, args.writers, args.readers, args.ops))
+            else:
+                elapsed = run_threads(session_factory, roadmap_id, args.writers, args.readers, args.ops)
+                engine.dispose()
+        writes = args.writers * args.ops / elapsed
+        reads = args.readers * args.ops / elapsed
+        print(f"{mode:>8} | {writes:>10,.0f} | {reads:>10,.0f} | {writes + reads:>11,.0f}")
+
+if __name__ == "__main__":
+    main()
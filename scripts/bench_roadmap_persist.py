@@ -0,0 +1,100 @@
+"""
+로드맵 저장 경로 벤치마크: 기존 ORM 방식(두 번 커밋 + 미션별 add) vs 단일 트랜잭션 bulk insert.
+
+사용법:
+    python scripts/bench_roadmap_persist.py [--repeat 20] [--sizes 50,100,250,500]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from app.core.database import Base  # noqa: E402
+from app import models  # noqa: E402
+from app.services.roadmap_store import save_roadmap  # noqa: E402
+
+MISSIONS_PER_WEEK = 5
+
+def make_roadmap_data(mission_count: int) -> dict:
+    weeks = (mission_count + MISSIONS_PER_WEEK - 1) // MISSIONS_PER_WEEK
+    curriculum = []
+    remaining = mission_count
+    for week in range(1, weeks + 1):
+        count = min(MISSIONS_PER_WEEK, remaining)
+        remaining -= count
+        curriculum.append({
+            "week": week,
+            "theme": f"Week {week} theme",
+            "missions": [
+                {"id": f"w{week}_m{m}", "title": f"Mission {m} of week {week}", "is_completed": False}
+                for m in range(1, count + 1)
+            ],
+        })
+    return {"project_title": f"Benchmark {mission_count}", "curriculum": curriculum}
+
+def save_roadmap_orm(db, goal, level, duration, frequency, roadmap_data) -> int:
+    # 변경 전 plan.py의 저장 방식
+    db_roadmap = models.Roadmap(
+        project_title=roadmap_data["project_title"],
+        goal=goal,
+        level=level,
+        duration=duration,
+        frequency=frequency
+    )
+    db.add(db_roadmap)
+    db.commit()
+    db.refresh(db_roadmap)
+
+    for week_plan in roadmap_data["curriculum"]:
+        for mission in week_plan["missions"]:
+            db.add(models.Mission(
+                roadmap_id=db_roadmap.id,
+                week=week_plan["week"],
+                theme=week_plan["theme"],
+                mission_key=mission["id"],
+                title=mission["title"],
+                is_completed=mission["is_completed"]
+            ))
+    db.commit()
+    return db_roadmap.id
+
+def run(save, session_factory, roadmap_data, repeat: int) -> float:
+    mission_count = sum(len(w["missions"]) for w in roadmap_data["curriculum"])
+    started = time.perf_counter()
+    for _ in range(repeat):
+        db = session_factory()
+        try:
+            save(db, "goal", "level", len(roadmap_data["curriculum"]), "daily", roadmap_data)
+        finally:
+            db.close()
+    elapsed = time.perf_counter() - started
+    # 로드맵 행 + 미션 행
+    return (mission_count + 1) * repeat / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--sizes", default="50,100,250,500")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        print(f"{'missions':>8} | {'orm rows/s':>12} | {'bulk rows/s':>12} | {'speedup':>7}")
+        print("-" * 50)
+        for size in (int(s) for s in args.sizes.split(",")):
+            roadmap_data = make_roadmap_data(size)
+            orm = run(save_roadmap_orm, session_factory, roadmap_data, args.repeat)
+            bulk = run(save_roadmap, session_factory, roadmap_data, args.repeat)
+            print(f"{size:>8} | {orm:>12,.0f} | {bulk:>12,.0f} | {bulk / orm:>6.1f}x")
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+시작 시간 벤치마크: 새 프로세스에서 서버 모듈 임포트 시간과 첫 200 응답까지의 시간을 측정합니다.
+- import:       python -c "import main" 의 임포트 시간
+- first 200:    uvicorn 프로세스를 띄운 시점부터 GET /api/v1/roadmaps가 200을 반환할 때까지의 시간
+- cold DB:      빈 DB 파일 (스키마 생성)
+- warm DB:      이미 스키마가 만들어진 DB 파일 (재시작/콜드 스타트)
+
+사용법:
+    python scripts/bench_startup.py [--runs 5] [--port 8765]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEALTH_PATH = "/api/v1/roadmaps"
+TIMEOUT_SECONDS = 60
+
+def _env(workdir: str) -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    env["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'app.db')}"
+    env["BLOB_DIR"] = os.path.join(workdir, "blobs")
+    env["PLAN_JOB_DIR"] = os.path.join(workdir, "plan_jobs")
+    return env
+
+def measure_import(workdir: str) -> float:
+    code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=workdir, env=_env(workdir),
+        capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+def measure_first_200(workdir: str, port: int) -> float:
+    url = f"http://127.0.0.1:{port}{HEALTH_PATH}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=_env(workdir), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < TIMEOUT_SECONDS:
+            if server.poll() is not None:
+                raise RuntimeError("Server exited before responding")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        raise RuntimeError(f"No 200 response within {TIMEOUT_SECONDS}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+def _summary(samples: list) -> str:
+    return f"{statistics.median(samples) * 1000:>8.0f} ms (min {min(samples) * 1000:.0f}, max {max(samples) * 1000:.0f})"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    imports, cold, warm = [], [], []
+    for _ in range(args.runs):
+        workdir = tempfile.mkdtemp(prefix="bench_startup_")
+        try:
+            imports.append(measure_import(workdir))
+            # 임포트 측정이 만든 DB를 지우고 빈 DB에서 시작합니다.
+            for name in os.listdir(workdir):
+                if name.startswith("app.db"):
+                    os.remove(os.path.join(workdir, name))
+            cold.append(measure_first_200(workdir, args.port))
+            warm.append(measure_first_200(workdir, args.port))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'import':>19} | {_summary(imports)}")
+    print(f"{'first 200 (cold DB)':>19} | {_summary(cold)}")
+    print(f"{'first 200 (warm DB)':>19} | {_summary(warm)}")
+
+if __name__ == "__main__":
+    main()